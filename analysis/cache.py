@@ -0,0 +1,368 @@
+"""
+Cache module for Financial Analysis Co-Pilot
+Two-tier caching (in-process LRU + persistent on-disk store) for analyses and extracted text
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from analysis.metrics import CACHE_LOOKUPS
+
+# Default locations and limits (override with environment variables)
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join('cache', 'results'))
+RESULT_CACHE_MEMORY_ITEMS = int(os.environ.get('RESULT_CACHE_MEMORY_ITEMS', 128))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 7 * 24 * 3600))
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', os.path.join('cache', 'extractions'))
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Retrieval indexes stored next to the extracted text (see analysis.retrieval)
+EXTRACTION_INDEX_MAX_BYTES = int(os.environ.get('EXTRACTION_INDEX_MAX_BYTES', 256 * 1024 * 1024))
+# Text of individual PDF pages keyed on page content, reused by amended and re-issued filings
+PDF_PAGE_CACHE_DIR = os.environ.get('PDF_PAGE_CACHE_DIR', os.path.join('cache', 'pdf_pages'))
+PDF_PAGE_CACHE_MAX_BYTES = int(os.environ.get('PDF_PAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# How often expired entries are swept from TTL-bound stores
+CACHE_SWEEP_INTERVAL = int(os.environ.get('CACHE_SWEEP_INTERVAL', 600))
+# A store over max_bytes is evicted down to this share of it, so scans stay rare
+CACHE_EVICT_LOW_WATER = 0.9
+
+
+def content_digest(data):
+    """Return the SHA-256 hex digest of raw file bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_digest(stream, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest and size of a seekable binary stream, rewinding it afterwards"""
+    digest = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+
+def make_cache_key(*parts):
+    """Combine several key components into a single fixed-length cache key"""
+    joined = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha256(joined.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache bounded by item count"""
+
+    def __init__(self, max_items=128):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    """
+    Persistent byte store with one file per key.
+    Entries older than ttl_seconds are dropped; when the directory grows past
+    max_bytes the least recently used files (by mtime) are evicted first.
+
+    Writes only update a running size total. The directory scans that evict
+    (once the total passes max_bytes, and every sweep_interval for TTL expiry)
+    run on a background thread, never inline in the caller's request.
+    """
+
+    def __init__(self, directory, max_bytes, ttl_seconds, suffix='.bin', sweep_interval=CACHE_SWEEP_INTERVAL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.suffix = suffix
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._total = None  # bytes stored, known after the first scan
+        self._scan_delta = 0  # bytes written during the running scan, which it may not have seen
+        self._last_sweep = time.monotonic()
+        self._evicting = False
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            mtime = os.path.getmtime(path)
+            if self.ttl_seconds and time.time() - mtime > self.ttl_seconds:
+                self._discard(path)
+                return None
+            with open(path, 'rb') as file:
+                data = file.read()
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path, None)
+            return data
+        except OSError:
+            return None
+
+    def set(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        self._adjust_total(len(data) - replaced)
+        self._schedule_eviction()
+
+    def delete(self, key):
+        self._discard(self._path(key))
+
+    def _discard(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self._adjust_total(-size)
+
+    def _adjust_total(self, delta):
+        with self._lock:
+            if self._total is not None:
+                self._total += delta
+            self._scan_delta += delta
+
+    def _schedule_eviction(self):
+        """Start a background evict() when the store is over max_bytes or a TTL sweep is due"""
+        with self._lock:
+            over_limit = self.max_bytes and (self._total is None or self._total > self.max_bytes)
+            sweep_due = self.ttl_seconds and time.monotonic() - self._last_sweep >= self.sweep_interval
+            if self._evicting or not (over_limit or sweep_due):
+                return
+            self._evicting = True
+        threading.Thread(target=self._evict_in_background, name='cache-evict', daemon=True).start()
+
+    def _evict_in_background(self):
+        try:
+            self.evict()
+        except Exception as e:
+            print(f"⚠️ Cache eviction in {self.directory} failed: {e}")
+        finally:
+            with self._lock:
+                self._evicting = False
+
+    def evict(self):
+        """
+        Remove expired entries, then the oldest ones until under CACHE_EVICT_LOW_WATER
+        of max_bytes, and recount the running size total. Scans the whole directory.
+        """
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            self._scan_delta = 0
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.ttl_seconds and now - stat.st_mtime > self.ttl_seconds:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if self.max_bytes and total > self.max_bytes:
+            entries.sort()
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes * CACHE_EVICT_LOW_WATER:
+                    break
+                self._remove(path)
+                total -= size
+        with self._lock:
+            # Writes during the scan may be counted twice; overestimating only evicts a little early
+            self._total = total + max(self._scan_delta, 0)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ResultCache:
+    """
+    Cache of finished analyses keyed on file content, analysis type,
+    prompt template version and model name.
+    Values are JSON-serialisable dicts.
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, memory_items=RESULT_CACHE_MEMORY_ITEMS,
+                 max_bytes=RESULT_CACHE_MAX_BYTES, ttl_seconds=RESULT_CACHE_TTL):
+        self.memory = LRUCache(memory_items)
+        self.disk = DiskCache(directory, max_bytes, ttl_seconds, suffix='.json')
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(file_digest, analysis_type, prompt_version, model_name, reader_version):
+        return make_cache_key(file_digest, analysis_type, prompt_version, model_name, reader_version)
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is not None and self.ttl_seconds and time.time() - entry['stored_at'] > self.ttl_seconds:
+            self.memory.delete(key)
+            entry = None
+
+        if entry is None:
+            raw = self.disk.get(key)
+            if raw is not None:
+                try:
+                    entry = json.loads(raw.decode('utf-8'))
+                    self.memory.set(key, entry)
+                except ValueError:
+                    self.disk.delete(key)
+                    entry = None
+
+        if entry is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache='result', result='miss')
+            return None
+        self.hits += 1
+        CACHE_LOOKUPS.inc(cache='result', result='hit')
+        return entry['value']
+
+    def set(self, key, value):
+        entry = {'stored_at': time.time(), 'value': value}
+        self.memory.set(key, entry)
+        try:
+            self.disk.set(key, json.dumps(entry).encode('utf-8'))
+        except OSError as e:
+            print(f"⚠️ Could not persist cache entry {key[:12]}: {e}")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'memory_items': len(self.memory)}
+
+
+class ExtractionCache:
+    """
+    Persistent cache of extracted report text keyed on file content and reader version.
+    Text is stored zlib-compressed; the store is bounded by size with LRU eviction.
+    Each document's retrieval index is kept under the same key, bounded separately.
+    Extracted PDF pages are kept per page content in their own store (see file_reader.read_pdf_file).
+    """
+
+    def __init__(self, directory=EXTRACTION_CACHE_DIR, max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+                 index_max_bytes=EXTRACTION_INDEX_MAX_BYTES, page_directory=PDF_PAGE_CACHE_DIR,
+                 page_max_bytes=PDF_PAGE_CACHE_MAX_BYTES):
+        self.disk = DiskCache(directory, max_bytes, ttl_seconds=0, suffix='.z')
+        self.indexes = DiskCache(directory, index_max_bytes, ttl_seconds=0, suffix='.idx')
+        self.pages = DiskCache(page_directory, page_max_bytes, ttl_seconds=0, suffix='.pz')
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(file_digest, reader_version, file_extension, reader_settings=''):
+        return make_cache_key(file_digest, reader_version, file_extension, reader_settings)
+
+    def get(self, key):
+        raw = self.disk.get(key)
+        if raw is not None:
+            try:
+                text = zlib.decompress(raw).decode('utf-8')
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache='extraction', result='hit')
+                return text
+            except (zlib.error, UnicodeDecodeError):
+                self.disk.delete(key)
+        self.misses += 1
+        CACHE_LOOKUPS.inc(cache='extraction', result='miss')
+        return None
+
+    def set(self, key, text):
+        try:
+            self.disk.set(key, zlib.compress(text.encode('utf-8'), 6))
+        except OSError as e:
+            print(f"⚠️ Could not persist extraction cache entry {key[:12]}: {e}")
+
+    def get_index(self, key):
+        """Serialized retrieval index of a document, or None"""
+        return self.indexes.get(key)
+
+    def set_index(self, key, data):
+        try:
+            self.indexes.set(key, data)
+        except OSError as e:
+            print(f"⚠️ Could not persist retrieval index {key[:12]}: {e}")
+
+    def get_pages(self, keys):
+        """
+        Cached (content, tables_skipped) of PDF pages, in the order of keys.
+        None for pages that are not cached or have no key.
+        """
+        pages = []
+        for key in keys:
+            raw = self.pages.get(key) if key else None
+            page = None
+            if raw is not None:
+                try:
+                    content, tables_skipped = json.loads(zlib.decompress(raw).decode('utf-8'))
+                    page = (content, bool(tables_skipped))
+                except (zlib.error, UnicodeDecodeError, ValueError):
+                    self.pages.delete(key)
+            pages.append(page)
+        hits = sum(page is not None for page in pages)
+        if hits:
+            CACHE_LOOKUPS.inc(hits, cache='pdf_page', result='hit')
+        if len(pages) - hits:
+            CACHE_LOOKUPS.inc(len(pages) - hits, cache='pdf_page', result='miss')
+        return pages
+
+    def set_pages(self, pages):
+        """Store extracted PDF pages given as {key: (content, tables_skipped)}"""
+        try:
+            for key, page in pages.items():
+                self.pages.set(key, zlib.compress(json.dumps(list(page)).encode('utf-8'), 6))
+        except OSError as e:
+            print(f"⚠️ Could not persist extracted PDF pages: {e}")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
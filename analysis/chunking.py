@@ -0,0 +1,71 @@
+"""
+Chunking module for Financial Analysis Co-Pilot
+Splits long reports on section, paragraph or line boundaries into pieces
+that fit a token budget, for map-reduce analysis.
+"""
+
+import os
+import re
+
+# Rough characters-per-token ratio for English financial text
+CHARS_PER_TOKEN = 4
+
+# Reports up to this size are analyzed in one prompt; longer ones are chunked
+SINGLE_PASS_TOKEN_LIMIT = int(os.environ.get('SINGLE_PASS_TOKEN_LIMIT', 37500))
+# Target size of each chunk and how many chunk summaries run at once
+CHUNK_TOKEN_BUDGET = int(os.environ.get('CHUNK_TOKEN_BUDGET', 25000))
+CHUNK_CONCURRENCY = int(os.environ.get('CHUNK_CONCURRENCY', 4))
+
+# Boundaries to split on, strongest first. All are zero-width so that joining
+# the chunks gives back the original text.
+SECTION_BOUNDARY_RE = re.compile(
+    r"^(?=[ \t]*(?:item\s+\d+[a-z]?\b|part\s+[ivx]+\b|note\s+\d+\b|--- sheet:|=== table \d+ data ===))",
+    re.IGNORECASE | re.MULTILINE)
+PARAGRAPH_BOUNDARY_RE = re.compile(r"(?<=\n\n)")
+LINE_BOUNDARY_RE = re.compile(r"(?<=\n)")
+BOUNDARIES = [SECTION_BOUNDARY_RE, PARAGRAPH_BOUNDARY_RE, LINE_BOUNDARY_RE]
+
+
+def estimate_tokens(text):
+    """Approximate the number of model tokens in a piece of text"""
+    return len(text) // CHARS_PER_TOKEN if text else 0
+
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKEN_BUDGET):
+    """
+    Split text into chunks of at most max_tokens (estimated), preferring to cut
+    at section headings, then blank lines, then line breaks.
+
+    Returns:
+        list: Chunks in document order; "".join(chunks) == text
+    """
+    if not text:
+        return []
+    return _pack(text, max_tokens * CHARS_PER_TOKEN, 0)
+
+
+def _pack(text, max_chars, level):
+    """Greedily pack the pieces between boundaries at this level into chunks"""
+    if len(text) <= max_chars:
+        return [text]
+    if level >= len(BOUNDARIES):
+        # No boundary left to respect: hard cut
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    chunks = []
+    current = ""
+    for piece in BOUNDARIES[level].split(text):
+        if not piece:
+            continue
+        if len(piece) > max_chars:
+            # Carry any pending text (e.g. a section heading) into the oversized piece
+            chunks.extend(_pack(current + piece, max_chars, level + 1))
+            current = ""
+        elif len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
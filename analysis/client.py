@@ -0,0 +1,294 @@
+"""
+Gemini client module for Financial Analysis Co-Pilot
+Thread-safe wrapper around the Gemini model with per-call deadlines,
+quota-aware scheduling of outbound calls (see analysis.scheduler), retries
+of quota and server errors, and call timing statistics.
+"""
+
+import os
+import random
+import threading
+import time
+
+from analysis.chunking import estimate_tokens
+from analysis.metrics import (GEMINI_CALL_SECONDS, GEMINI_CALLS, GEMINI_RETRIES, PROMPT_CHARS, PROMPT_TOKENS,
+                              RESPONSE_CHARS, RESPONSE_TOKENS, record_timing)
+from analysis.scheduler import OutboundScheduler, PRIORITY_NORMAL
+
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 4))
+GEMINI_DEFAULT_TIMEOUT = int(os.environ.get('GEMINI_DEFAULT_TIMEOUT', 120))
+# Attempts per call for quota and server errors, with jittered exponential backoff between them
+GEMINI_MAX_ATTEMPTS = int(os.environ.get('GEMINI_MAX_ATTEMPTS', 4))
+GEMINI_RETRY_BASE_SECONDS = float(os.environ.get('GEMINI_RETRY_BASE_SECONDS', 2))
+GEMINI_RETRY_MAX_SECONDS = 30
+
+# HTTP statuses of transient server errors
+RETRYABLE_SERVER_CODES = {500, 502, 503}
+
+DEFAULT_GENERATION_CONFIG = {
+    'temperature': 0.3,
+    'top_p': 0.9,
+    'top_k': 20,
+    'max_output_tokens': 8000,
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call runs past its deadline"""
+
+
+class GeminiClient:
+    """
+    Calls the model from any thread. Timeouts are deadlines passed to the SDK
+    transport (and checked between streamed chunks) rather than SIGALRM, so
+    calls work off the main thread and several can be in flight at once.
+    The single model instance, and the SDK transport behind it, is reused
+    for every call. Pass model_factory instead of model to defer creating
+    the model (and importing its SDK) until it is first needed.
+    Calls are admitted by an OutboundScheduler, which replaces a fixed cap on
+    concurrent calls with rate limits, priorities and an adaptive limit.
+    """
+
+    def __init__(self, model=None, max_concurrency=GEMINI_MAX_CONCURRENCY,
+                 default_timeout=GEMINI_DEFAULT_TIMEOUT, generation_config=None, model_factory=None, name='gemini'):
+        self._model = model
+        self._model_factory = model_factory
+        self._initialized = model is not None or model_factory is None
+        self._init_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.generation_config = dict(generation_config or DEFAULT_GENERATION_CONFIG)
+        self.name = name
+        self.scheduler = OutboundScheduler(max_concurrency, name=name)
+        self._stats_lock = threading.Lock()
+        self._stats = {'calls': 0, 'errors': 0, 'timeouts': 0, 'in_flight': 0,
+                       'total_seconds': 0.0, 'max_seconds': 0.0, 'last_seconds': 0.0}
+        self._profile_stats = {}
+
+    @property
+    def model(self):
+        """The model instance, created by model_factory on first access (None if that failed)"""
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._model = self._model_factory()
+                    self._initialized = True
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        with self._init_lock:
+            self._model = model
+            self._initialized = True
+
+    @property
+    def initialized(self):
+        """Whether the model has been created yet (checking doesn't create it)"""
+        return self._initialized
+
+    @property
+    def available(self):
+        return self.model is not None
+
+    def generate(self, prompt, label='gemini', timeout_seconds=None, on_chunk=None, generation_config=None,
+                 priority=PRIORITY_NORMAL, profile='standard'):
+        """
+        Generate a response for prompt within timeout_seconds.
+        If on_chunk is given the response is streamed and each text chunk is passed to it.
+        profile names the model profile the call was routed to, for per-profile statistics.
+        Quota and server errors are retried with jittered backoff while the deadline
+        allows; a streamed call is only retried if nothing has reached on_chunk yet.
+
+        Returns:
+            tuple: (response text, None) on success or (None, error message) on failure
+        """
+        model = self.model
+        if model is None:
+            print(f"[{label}] Gemini model not initialized")
+            return None, "Gemini model not initialized. Check API key."
+
+        timeout_seconds = timeout_seconds or self.default_timeout
+        deadline = time.monotonic() + timeout_seconds
+        streamed = []
+        stream_chunk = None
+        if on_chunk is not None:
+            def stream_chunk(text):
+                streamed.append(len(text))
+                on_chunk(text)
+
+        attempt = 1
+        while True:
+            response_text, error, retry_reason = self._attempt(
+                model, prompt, label, timeout_seconds, deadline, stream_chunk,
+                generation_config or self.generation_config, priority, profile)
+            if retry_reason is None or streamed:
+                return response_text, error
+            # Equal jitter: half the exponential delay plus a random part, so retries spread out
+            backoff = min(GEMINI_RETRY_MAX_SECONDS, GEMINI_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            if attempt >= GEMINI_MAX_ATTEMPTS or time.monotonic() + delay >= deadline:
+                return None, error
+            GEMINI_RETRIES.inc(reason=retry_reason)
+            print(f"[{label}] {retry_reason.capitalize()} error, retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{GEMINI_MAX_ATTEMPTS})")
+            time.sleep(delay)
+            attempt += 1
+
+    def _attempt(self, model, prompt, label, timeout_seconds, deadline, on_chunk, generation_config, priority,
+                 profile):
+        """One scheduled call; returns (response text, error message, retry reason or None)"""
+        # Wait for rate limit budget and a free slot, but never past the call's own deadline
+        if self.scheduler.acquire(priority, estimate_tokens(prompt), deadline) is None:
+            self._record(0.0, error=True, timed_out=True)
+            message = f"API call timed out after {timeout_seconds} seconds waiting in the model call queue"
+            print(f"[{label}] {message}")
+            return None, message, None
+
+        print(f"[{label}] Calling Gemini API... (prompt length: {len(prompt)} chars)")
+        start_time = time.monotonic()
+        outcome = 'error'
+        response_tokens = 0
+        with self._stats_lock:
+            self._stats['in_flight'] += 1
+        try:
+            response_text, usage = self._generate(model, prompt, deadline, on_chunk, generation_config)
+            api_time = time.monotonic() - start_time
+            self._record(api_time)
+            outcome = 'ok' if response_text else 'error'
+            response_tokens = usage[1] if usage else estimate_tokens(response_text)
+            self._observe(profile, outcome, api_time, prompt, response_text, usage)
+            print(f"[{label}] API response time: {api_time:.2f}s")
+
+            if response_text:
+                return response_text, None, None
+            error_message = "API returned an empty response. The model may be unable to process the request."
+            print(f"[{label}] {error_message}")
+            return None, error_message, None
+
+        except Exception as api_error:
+            api_time = time.monotonic() - start_time
+            error_str = str(api_error)
+            timed_out = isinstance(api_error, TimeoutError) or "deadline" in error_str.lower()
+            self._record(api_time, error=True, timed_out=timed_out)
+            retry_reason = None if timed_out else _retry_reason(api_error)
+            if retry_reason:
+                outcome = 'throttled'
+            self._observe(profile, 'timeout' if timed_out else ('quota' if retry_reason == 'quota' else 'error'),
+                          api_time, prompt)
+            if timed_out:
+                message = f"API call timed out after {timeout_seconds} seconds"
+                print(f"[{label}] {message}")
+                return None, message, None
+            print(f"[{label}] API error: {api_error}")
+            if retry_reason == 'quota':
+                return None, "Analysis temporarily unavailable due to API quota limits.", retry_reason
+            return None, f"API error: {error_str[:150]}", retry_reason
+        finally:
+            with self._stats_lock:
+                self._stats['in_flight'] -= 1
+            self.scheduler.release(outcome, response_tokens)
+
+    def _generate(self, model, prompt, deadline, on_chunk, generation_config):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("deadline passed before the call started")
+
+        response = model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options={'timeout': remaining},
+            stream=on_chunk is not None
+        )
+        if on_chunk is None:
+            return response.text, _usage_tokens(response)
+
+        chunks = []
+        usage = None
+        for chunk in response:
+            if time.monotonic() > deadline:
+                raise DeadlineExceeded("deadline passed while streaming the response")
+            # Usage metadata arrives with the final chunk
+            usage = _usage_tokens(chunk) or usage
+            try:
+                chunk_text = chunk.text
+            except ValueError:
+                # Final chunks may carry only finish metadata and no text parts
+                continue
+            if chunk_text:
+                chunks.append(chunk_text)
+                on_chunk(chunk_text)
+        return "".join(chunks), usage
+
+    def _observe(self, profile, outcome, seconds, prompt, response_text=None, usage=None):
+        """Export the call to the Prometheus metrics, per-profile stats and the current request's Server-Timing"""
+        prompt_tokens, response_tokens = usage or (estimate_tokens(prompt), estimate_tokens(response_text))
+        if not response_text:
+            response_tokens = 0
+        GEMINI_CALLS.inc(profile=profile, outcome=outcome)
+        GEMINI_CALL_SECONDS.observe(seconds, profile=profile, outcome=outcome)
+        PROMPT_CHARS.inc(len(prompt))
+        PROMPT_TOKENS.inc(prompt_tokens, profile=profile)
+        if response_text:
+            RESPONSE_CHARS.inc(len(response_text))
+            RESPONSE_TOKENS.inc(response_tokens, profile=profile)
+        record_timing('gemini', seconds)
+
+        with self._stats_lock:
+            stats = self._profile_stats.setdefault(profile, {
+                'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'prompt_tokens': 0, 'response_tokens': 0})
+            stats['calls'] += 1
+            stats['errors'] += int(outcome != 'ok')
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['prompt_tokens'] += prompt_tokens
+            stats['response_tokens'] += response_tokens
+
+    def _record(self, seconds, error=False, timed_out=False):
+        with self._stats_lock:
+            self._stats['calls'] += 1
+            self._stats['errors'] += int(error)
+            self._stats['timeouts'] += int(timed_out)
+            self._stats['total_seconds'] += seconds
+            self._stats['max_seconds'] = max(self._stats['max_seconds'], seconds)
+            self._stats['last_seconds'] = seconds
+
+    def stats(self):
+        """Snapshot of call counts and timing"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['avg_seconds'] = stats['total_seconds'] / stats['calls'] if stats['calls'] else 0.0
+        stats['max_concurrency'] = self.max_concurrency
+        stats['scheduler'] = self.scheduler.stats()
+        return stats
+
+    def profile_stats(self):
+        """Call count, latency and token totals per model profile served by this client"""
+        with self._stats_lock:
+            profiles = {name: dict(stats) for name, stats in self._profile_stats.items()}
+        for stats in profiles.values():
+            stats['avg_seconds'] = stats['total_seconds'] / stats['calls'] if stats['calls'] else 0.0
+        return profiles
+
+
+def _retry_reason(error):
+    """'quota' or 'server' for errors worth retrying, None for any other error"""
+    try:
+        code = int(getattr(error, 'code', None))
+    except (TypeError, ValueError):
+        code = None
+    message = str(error).lower()
+    if code == 429 or "quota" in message or "resource has been exhausted" in message:
+        return 'quota'
+    if code in RETRYABLE_SERVER_CODES or "service unavailable" in message:
+        return 'server'
+    return None
+
+
+def _usage_tokens(response):
+    """(prompt tokens, response tokens) from a response's usage metadata, or None if absent"""
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None)
+    if not prompt_tokens:
+        return None
+    return prompt_tokens, getattr(usage, 'candidates_token_count', 0) or 0
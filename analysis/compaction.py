@@ -0,0 +1,123 @@
+"""
+Compaction module for Financial Analysis Co-Pilot
+Shrinks extracted report text before it is sent to the model: removes table
+rows that duplicate the page text, the DOCX row flags, running headers and
+footers, page numbers and redundant whitespace.
+"""
+
+import os
+import re
+from collections import Counter
+
+from analysis.chunking import estimate_tokens
+
+COMPACTION_ENABLED = os.environ.get('COMPACTION_ENABLED', 'true').lower() == 'true'
+# A short line seen this many times is treated as a running header or footer
+REPEATED_LINE_MIN_COUNT = int(os.environ.get('REPEATED_LINE_MIN_COUNT', 4))
+REPEATED_LINE_MAX_LENGTH = 80
+# Bare numbers at least this many lines apart and counting up by one are page numbers
+PAGE_MIN_LINES = 5
+
+# read_docx_file repeats table rows under these flags
+DOCX_ROW_FLAG_RE = re.compile(r"^\[(?:FINANCIAL|DOLLAR|NUMBER)_ROW\]: ")
+PAGE_NUMBER_RE = re.compile(r"^\s*(?:page\s+\d{1,4}(?:\s+of\s+\d{1,4})?|-\s*\d{1,4}\s*-|F-\d{1,3})\s*$",
+                            re.IGNORECASE)
+BARE_NUMBER_RE = re.compile(r"^\s*(\d{1,3})\s*$")
+DIGITS_RE = re.compile(r"\d+")
+# Currency, percentages, decimals, grouped thousands and negatives in parentheses mark financial figures
+FIGURE_RE = re.compile(r"[$€£%]|\d\.\d|\d,\d{3}|\(\s*\d")
+RUNNING_LINE_MAX_DIGIT_SHARE = 0.25
+SPACES_RE = re.compile(r"[ \t]+")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _normalize(line):
+    return SPACES_RE.sub(" ", line).strip()
+
+
+def _table_row_text(line):
+    """The non-empty cells of a ' | '-separated table row, joined as prose would show them"""
+    return " ".join(cell.strip() for cell in line.split("|") if cell.strip())
+
+
+def _is_table_row(line):
+    return " | " in line or line.strip() == "|" or line.rstrip().endswith(" |")
+
+
+def _may_be_running_line(line):
+    """
+    Whether a short line may be a running header or footer: mostly words, with no
+    financial figures. Statement rows such as "Net income $ 120 $ 100" repeat with
+    different figures and must never be collapsed.
+    """
+    if len(line) > REPEATED_LINE_MAX_LENGTH or _is_table_row(line) or FIGURE_RE.search(line):
+        return False
+    characters = line.replace(" ", "")
+    return sum(char.isdigit() for char in characters) <= RUNNING_LINE_MAX_DIGIT_SHARE * len(characters)
+
+
+def _page_number_lines(lines):
+    """
+    Indexes of bare-number lines that are page numbers: consecutive values a page
+    apart. Other lone numbers, such as single-column sheet cells, are kept.
+    """
+    numbers = [(index, int(match.group(1))) for index, line in enumerate(lines)
+               for match in [BARE_NUMBER_RE.match(line)] if match]
+    page_lines = set()
+    for (index, value), (next_index, next_value) in zip(numbers, numbers[1:]):
+        if next_value == value + 1 and next_index - index >= PAGE_MIN_LINES:
+            page_lines.update((index, next_index))
+    return page_lines
+
+
+def compact_report_text(text):
+    """
+    Compact extracted report text for prompting.
+
+    Returns:
+        tuple: (compacted text, stats dict with before/after chars and tokens)
+    """
+    stats = {'chars_before': len(text or ""), 'tokens_before': estimate_tokens(text)}
+    if not text or not COMPACTION_ENABLED:
+        stats.update(chars_after=stats['chars_before'], tokens_after=stats['tokens_before'])
+        return text, stats
+
+    lines = text.split("\n")
+
+    # Prose lines and DOCX table rows already present in the text
+    seen_text = {_normalize(line) for line in lines if line.strip() and not _is_table_row(line)}
+    seen_rows = {_normalize(line) for line in lines if _is_table_row(line)}
+
+    # Running headers/footers repeat on every page, usually with a changing page number
+    repeat_counts = Counter(DIGITS_RE.sub("#", _normalize(line)) for line in lines
+                            if line.strip() and _may_be_running_line(_normalize(line)))
+    running_lines = {key for key, count in repeat_counts.items() if count >= REPEATED_LINE_MIN_COUNT}
+    seen_running = set()
+    page_number_lines = _page_number_lines(lines)
+
+    kept = []
+    for index, line in enumerate(lines):
+        normalized = _normalize(line)
+        if not normalized:
+            kept.append("")
+            continue
+        if DOCX_ROW_FLAG_RE.match(normalized) and _normalize(DOCX_ROW_FLAG_RE.sub("", normalized)) in seen_rows:
+            continue
+        if PAGE_NUMBER_RE.match(normalized) or index in page_number_lines:
+            continue
+        if _is_table_row(line):
+            row_text = _table_row_text(line)
+            # Empty separator rows and rows pdfplumber's text pass already emitted
+            if not row_text or row_text in seen_text:
+                continue
+        elif _may_be_running_line(normalized):
+            running_key = DIGITS_RE.sub("#", normalized)
+            if running_key in running_lines:
+                if running_key in seen_running:
+                    continue
+                seen_running.add(running_key)
+        kept.append(normalized)
+
+    compacted = BLANK_LINES_RE.sub("\n\n", "\n".join(kept)).strip() + "\n"
+    stats.update(chars_after=len(compacted), tokens_after=estimate_tokens(compacted))
+    return compacted, stats
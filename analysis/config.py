@@ -1,18 +1,44 @@
 """
 Configuration module for Financial Analysis Co-Pilot
-Handles Google Gemini API setup and initialization
+Handles Google Gemini API setup and initialization, selects the model
+backend (the real Gemini API, a local fake, or Gemini with response recording)
+and defines the model profiles each pipeline stage is routed to.
 """
 
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+from analysis.client import GeminiClient, DEFAULT_GENERATION_CONFIG
+from analysis.fake_model import FakeModel, RecordingModel
+from analysis.models import ModelRegistry, parse_profiles, parse_routes
+
 # Load environment variables from .env file
 load_dotenv()
 
-def configure_gemini():
+# Model of the 'standard' profile, used for every stage unless routed otherwise.
+# Part of the result cache key, so changing it invalidates previously cached analyses.
+GEMINI_MODEL_NAME = 'gemini-2.5-flash'
+
+# Model backend: 'gemini' (default), 'fake' (offline, see analysis.fake_model)
+# or 'record' (Gemini, with every response saved for replay by the fake)
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'gemini').lower()
+
+# Named model profiles. 'fast' suits the cheap stages (10-K statement location,
+# section summaries). MODEL_PROFILES, a JSON object of the same shape, adds or
+# replaces profiles.
+DEFAULT_MODEL_PROFILES = {
+    'standard': {'model': GEMINI_MODEL_NAME, 'generation_config': DEFAULT_GENERATION_CONFIG},
+    'fast': {'model': 'gemini-2.5-flash-lite', 'generation_config': {
+        'temperature': 0.1, 'top_p': 0.9, 'top_k': 20, 'max_output_tokens': 4000}},
+}
+MODEL_PROFILES = {**DEFAULT_MODEL_PROFILES, **parse_profiles(os.environ.get('MODEL_PROFILES'))}
+# Stage routing, e.g. "locate=fast,summarize=fast" or "10k.analyze=standard"
+# (stages: locate, analyze, summarize, reduce); unrouted stages use 'standard'
+MODEL_ROUTES = parse_routes(os.environ.get('MODEL_ROUTES'))
+
+def configure_gemini(model_name=GEMINI_MODEL_NAME):
     """
-    Configure and initialize the Google Gemini 2.5 Flash model as per user request
+    Configure and initialize a Google Gemini model (Gemini 2.5 Flash by default)
     Returns the configured model instance
     """
     # Get API key from environment variables
@@ -21,18 +47,50 @@ def configure_gemini():
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables. Please check your .env file.")
     
+    # Imported here: the SDK takes about half a second to import, which would
+    # otherwise be paid at app startup before /health can answer
+    import google.generativeai as genai
+
     # Configure the Gemini API
     genai.configure(api_key=api_key)
     
-    # Initialize and return the Gemini 2.5 Flash model
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    print("✅ Using Gemini 2.5 Flash model as requested.")
+    # Initialize and return the model
+    model = genai.GenerativeModel(model_name)
+    print(f"✅ Using {model_name} model.")
+    return model
+
+def create_model(backend=MODEL_BACKEND, model_name=GEMINI_MODEL_NAME):
+    """
+    Create the model instance for the selected backend
+    Returns None if the Gemini model can't be initialized
+    """
+    if backend == 'fake':
+        model = FakeModel.from_env()
+        print(f"🧪 Using the fake model backend for {model_name} ({len(model.recordings)} recorded responses)")
+        return model
+    if backend not in ('gemini', 'record'):
+        print(f"⚠️ Unknown MODEL_BACKEND '{backend}', using gemini")
+
+    try:
+        model = configure_gemini(model_name)
+        print(f"✅ Google Gemini model {model_name} initialized successfully")
+    except Exception as e:
+        print(f"❌ Error initializing Gemini model {model_name}: {e}")
+        return None
+
+    if backend == 'record':
+        model = RecordingModel(model)
+        print(f"⏺️ Recording Gemini responses to {model.recordings_path}")
     return model
 
-# Initialize the model instance for import
-try:
-    gemini_model = configure_gemini()
-    print("✅ Google Gemini 2.5 Flash model initialized successfully")
-except Exception as e:
-    print(f"❌ Error initializing Gemini model: {e}")
-    gemini_model = None 
\ No newline at end of file
+# One thread-safe client per model, shared by every analysis (works off the main
+# thread). Models are created on first use, not at import, to keep cold starts fast.
+model_registry = ModelRegistry(MODEL_PROFILES, MODEL_ROUTES, client_factory=lambda model_name: GeminiClient(
+    model_factory=lambda: create_model(MODEL_BACKEND, model_name), name=model_name))
+# Client of the 'standard' profile
+gemini_client = model_registry.client(MODEL_PROFILES['standard']['model'])
+
+# Name used in result cache keys: changes with the stage routing, and fake
+# analyses never mix with real ones
+_ROUTING_NAME = model_registry.fingerprint(GEMINI_MODEL_NAME, DEFAULT_MODEL_PROFILES['standard'])
+MODEL_NAME = f"fake:{_ROUTING_NAME}" if MODEL_BACKEND == 'fake' else _ROUTING_NAME
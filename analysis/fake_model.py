@@ -0,0 +1,209 @@
+"""
+Fake model module for Financial Analysis Co-Pilot
+Local stand-ins for the Gemini model: FakeModel replays recorded responses
+with configurable latency, output token rate and injected quota errors, and
+RecordingModel wraps the real model to capture responses for later replay.
+Both expose the generate_content() interface GeminiClient calls.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+MODEL_RECORDINGS_PATH = os.environ.get('MODEL_RECORDINGS_PATH', os.path.join('recordings', 'gemini.jsonl'))
+# Seconds before the first token; unset means "use the recorded time" for replayed prompts, else 0
+FAKE_MODEL_LATENCY = os.environ.get('FAKE_MODEL_LATENCY')
+FAKE_MODEL_TOKENS_PER_SECOND = float(os.environ.get('FAKE_MODEL_TOKENS_PER_SECOND', 0))
+FAKE_MODEL_QUOTA_ERROR_RATE = float(os.environ.get('FAKE_MODEL_QUOTA_ERROR_RATE', 0))
+FAKE_MODEL_SEED = os.environ.get('FAKE_MODEL_SEED')
+
+# Characters per streamed chunk (about 20 tokens, close to what the API sends)
+STREAM_CHUNK_CHARS = 80
+
+DEFAULT_FAKE_RESPONSE = (
+    "<div class='analysis-section'><h3>Executive Summary</h3>"
+    "<p>This is a locally generated placeholder analysis produced by the fake model backend. "
+    "No request was sent to the Gemini API.</p></div>"
+    "<div class='analysis-section'><h3>Key Financial Metrics</h3>"
+    "<ul><li>Revenue, margins and cash flow figures are not evaluated in fake mode.</li></ul></div>"
+)
+
+
+def prompt_digest(prompt):
+    """Key recordings by prompt content"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def load_recordings(path):
+    """
+    Load recorded responses from a JSONL file.
+
+    Returns:
+        dict: prompt digest -> recording (the last recording of a prompt wins)
+    """
+    recordings = {}
+    if not path or not os.path.exists(path):
+        return recordings
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                recording = json.loads(line)
+            except ValueError:
+                continue
+            recordings[recording['prompt_sha256']] = recording
+    return recordings
+
+
+def _quota_error():
+    message = "429 Resource has been exhausted (e.g. check quota)."
+    try:
+        from google.api_core.exceptions import ResourceExhausted
+    except ImportError:  # google-generativeai not installed
+        return RuntimeError(message)
+    return ResourceExhausted(message)
+
+
+def _deadline_error(timeout):
+    message = f"504 Deadline Exceeded after {timeout:.1f}s"
+    try:
+        from google.api_core.exceptions import DeadlineExceeded
+    except ImportError:
+        return TimeoutError(message)
+    return DeadlineExceeded(message)
+
+
+class FakeResponse:
+    """Mimics a generate_content response: .text, and iteration over streamed chunks"""
+
+    def __init__(self, text, chunks=None):
+        self._text = text
+        self._chunks = chunks
+
+    @property
+    def text(self):
+        return self._text
+
+    def __iter__(self):
+        return iter(self._chunks if self._chunks is not None else [self])
+
+
+class FakeModel:
+    """
+    Offline stand-in for genai.GenerativeModel.
+    Prompts found in the recordings get their recorded response; any other
+    prompt gets default_response. Thread-safe.
+    """
+
+    def __init__(self, recordings_path=None, latency=None, tokens_per_second=0.0,
+                 quota_error_rate=0.0, default_response=DEFAULT_FAKE_RESPONSE, seed=None):
+        self.recordings = load_recordings(recordings_path)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.quota_error_rate = quota_error_rate
+        self.default_response = default_response
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.replayed = 0
+        self.quota_errors = 0
+        self.prompt_chars = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a fake model from the FAKE_MODEL_* environment variables"""
+        return cls(
+            recordings_path=MODEL_RECORDINGS_PATH,
+            latency=float(FAKE_MODEL_LATENCY) if FAKE_MODEL_LATENCY else None,
+            tokens_per_second=FAKE_MODEL_TOKENS_PER_SECOND,
+            quota_error_rate=FAKE_MODEL_QUOTA_ERROR_RATE,
+            seed=int(FAKE_MODEL_SEED) if FAKE_MODEL_SEED else None,
+        )
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        recording = self.recordings.get(prompt_digest(prompt))
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.replayed += int(recording is not None)
+            inject_quota_error = self._random.random() < self.quota_error_rate
+            self.quota_errors += int(inject_quota_error)
+
+        text = recording['response'] if recording else self.default_response
+        latency = self.latency
+        if latency is None:
+            latency = recording.get('seconds', 0.0) if recording else 0.0
+        timeout = (request_options or {}).get('timeout')
+
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise _deadline_error(timeout)
+        time.sleep(latency)
+        if inject_quota_error:
+            raise _quota_error()
+
+        if not stream:
+            self._sleep_for_tokens(text)
+            return FakeResponse(text)
+        return FakeResponse(text, self._stream_chunks(text))
+
+    def _sleep_for_tokens(self, text):
+        if self.tokens_per_second > 0:
+            time.sleep(len(text) / 4 / self.tokens_per_second)
+
+    def _stream_chunks(self, text):
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            chunk = text[start:start + STREAM_CHUNK_CHARS]
+            self._sleep_for_tokens(chunk)
+            yield FakeResponse(chunk)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'replayed': self.replayed, 'quota_errors': self.quota_errors,
+                    'prompt_chars': self.prompt_chars, 'recordings': len(self.recordings)}
+
+
+class RecordingModel:
+    """Wraps a real model and appends every successful response to a JSONL recordings file"""
+
+    def __init__(self, model, recordings_path=MODEL_RECORDINGS_PATH):
+        self.model = model
+        self.recordings_path = recordings_path
+        directory = os.path.dirname(recordings_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        start_time = time.monotonic()
+        response = self.model.generate_content(prompt, generation_config=generation_config,
+                                               request_options=request_options, stream=stream)
+        if not stream:
+            self._record(prompt, response.text, time.monotonic() - start_time)
+            return response
+        return FakeResponse(None, self._recording_stream(prompt, response, start_time))
+
+    def _recording_stream(self, prompt, response, start_time):
+        chunks = []
+        for chunk in response:
+            try:
+                chunks.append(chunk.text)
+            except ValueError:
+                pass
+            yield chunk
+        self._record(prompt, "".join(chunks), time.monotonic() - start_time)
+
+    def _record(self, prompt, text, seconds):
+        recording = {
+            'prompt_sha256': prompt_digest(prompt),
+            'prompt_chars': len(prompt),
+            'response': text,
+            'seconds': round(seconds, 3),
+            'recorded_at': datetime.now().isoformat(),
+        }
+        with self._lock:
+            with open(self.recordings_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(recording) + "\n")
@@ -1,66 +1,318 @@
 """
 File reader module for Financial Statement Analysis Co-Pilot
 Handles reading various file formats: TXT, PDF, DOCX, XLSX, CSV
+
+Format libraries (pdfplumber, python-docx, openpyxl, pandas) are imported
+by the reader that needs them, so importing this module stays cheap.
+
+Every reader accepts either a file path or the file's contents as bytes, so
+uploads can be parsed straight from memory.
 """
 
+import hashlib
+import io
 import os
-import pandas as pd
+import re
+import time
+from datetime import datetime, time as dt_time
 from pathlib import Path
 
-# Import libraries for different file formats
-try:
-    import PyPDF2
-    import docx
-    from openpyxl import load_workbook
-except ImportError as e:
-    print(f"⚠️ Some file format libraries are missing: {e}")
+from analysis.cache import ExtractionCache, content_digest, make_cache_key
+from analysis.locator import STATEMENT_HEADER_RE
+from analysis.chunking import SINGLE_PASS_TOKEN_LIMIT, CHARS_PER_TOKEN
+from analysis.metrics import READ_REPORT_SECONDS, record_timing
+
+# Bump whenever extraction output changes so stale cached text is not reused
+READER_VERSION = "5"
+
+# Parallel PDF extraction: worker processes (1 = serial) and when it kicks in
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 40))
+PDF_MIN_SHARD_PAGES = 8
+
+# Page triage: only run pdfplumber's table extraction on pages that look tabular
+PDF_TABLE_TRIAGE = os.environ.get('PDF_TABLE_TRIAGE', 'true').lower() == 'true'
+PDF_TABLE_SCORE_THRESHOLD = float(os.environ.get('PDF_TABLE_SCORE_THRESHOLD', 0.25))
+# Reuse the extracted text of PDF pages whose content is unchanged (e.g. in amended filings)
+PDF_PAGE_CACHE = os.environ.get('PDF_PAGE_CACHE', 'true').lower() == 'true'
+NUMERIC_TOKEN_RE = re.compile(r"\(?-?\$?\d[\d,]*(?:\.\d+)?\)?%?")
+STATEMENT_CAPTION_RE = re.compile(r"\bin (?:millions|thousands|billions)\b", re.IGNORECASE)
+
+# Streaming CSV ingestion limits
+CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', 50000))
+CSV_DTYPE_SAMPLE_ROWS = 1000
+CSV_DISTINCT_LIMIT = 10000
+# Accounting formats in numeric CSV columns: "$1,234" -> "1234", "(500)" -> "-500"
+CSV_NUMBER_NOISE_RE = r"[$,\s]"
+CSV_NEGATIVE_RE = r"^\((.*)\)$"
+CSV_TEXT_BUDGET = SINGLE_PASS_TOKEN_LIMIT * CHARS_PER_TOKEN
+
+_extraction_cache = None
+_index_store = None
+_pdf_pool = None
+_pdf_pool_workers = 0
+
+
+def get_extraction_cache():
+    """Return the shared extraction cache, creating it on first use"""
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache()
+    return _extraction_cache
+
+
+def get_index_store():
+    """Return the shared retrieval index store (kept in the extraction cache), creating it on first use"""
+    global _index_store
+    if _index_store is None:
+        from analysis.retrieval import DocumentIndexStore
+        _index_store = DocumentIndexStore(get_extraction_cache())
+    return _index_store
 
-def read_txt_file(filepath):
+
+def _reader_settings():
+    """Settings that change extraction output without a READER_VERSION bump"""
+    return f"triage={PDF_TABLE_TRIAGE}:{PDF_TABLE_SCORE_THRESHOLD}"
+
+def extraction_key(file_digest, file_extension):
+    """Extraction cache key of a file, also the key of its retrieval index"""
+    return ExtractionCache.make_key(file_digest, READER_VERSION, file_extension.lower(), _reader_settings())
+
+def warmup():
+    """Import the format libraries ahead of the first upload (e.g. from a background thread)"""
+    for module in ('pdfplumber', 'docx', 'openpyxl', 'pandas'):
+        try:
+            __import__(module)
+        except ImportError as e:
+            print(f"⚠️ Some file format libraries are missing: {e}")
+
+def _open_source(source):
+    """A path stays a path; bytes become a fresh binary stream (libraries accept either)"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+def read_txt_file(source):
     """Read content from a TXT file"""
-    with open(filepath, 'r', encoding='utf-8') as file:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source).decode('utf-8')
+    with open(source, 'r', encoding='utf-8') as file:
         return file.read()
 
-def read_pdf_file(filepath):
-    """Read content from a PDF file using advanced extraction"""
+def _looks_like_table_row(line):
+    """A short label followed by two or more numeric columns, e.g. 'Net income 33,916 29,998'"""
+    tokens = line.split()
+    if len(tokens) < 2 or not NUMERIC_TOKEN_RE.fullmatch(tokens[-1]):
+        return False
+    numbers = sum(1 for token in tokens if NUMERIC_TOKEN_RE.fullmatch(token))
+    return numbers >= 2 and len(tokens) - numbers <= 8
+
+def table_likelihood(text, ruling_lines=0):
+    """
+    Cheaply score how likely a page is to contain financial tables (0.0 - 1.0)
+    
+    Looks at table-like rows (a short label followed by a column of numbers),
+    numeric token density, dollar signs, statement headers / unit captions and
+    ruling lines.
+    """
+    lines = [line for line in text.splitlines() if line.strip()] if text else []
+    if not lines:
+        return 0.0
+    
+    tokens = text.split()
+    numeric_tokens = NUMERIC_TOKEN_RE.findall(text)
+    table_rows = sum(1 for line in lines if _looks_like_table_row(line))
+    
+    score = 0.4 * (table_rows / len(lines))
+    score += 0.3 * min(1.0, 2 * len(numeric_tokens) / max(len(tokens), 1))
+    score += 0.15 * min(1.0, text.count('$') / len(lines))
+    if STATEMENT_HEADER_RE.search(text) or STATEMENT_CAPTION_RE.search(text):
+        score += 0.15
+    if ruling_lines >= 4:
+        score += 0.2
+    return min(score, 1.0)
+
+def _extract_pdf_page(page):
+    """
+    Extract the text and tables of one pdfplumber page as report text
+    Returns (content, tables_skipped); table extraction only runs on pages
+    that score above PDF_TABLE_SCORE_THRESHOLD.
+    """
+    content = ""
+    # Extract text
+    text = page.extract_text()
+    if text:
+        content += text + "\n"
+    
+    # Skip the expensive table pass on prose-only pages
+    if PDF_TABLE_TRIAGE:
+        ruling_lines = len(page.lines) + len(page.rects)
+        if table_likelihood(text, ruling_lines) < PDF_TABLE_SCORE_THRESHOLD:
+            return content, True
+    
+    # Extract tables separately
+    tables = page.extract_tables()
+    for table in tables:
+        if table:
+            # Convert table to readable text
+            for row in table:
+                if row:
+                    content += " | ".join([str(cell) if cell else "" for cell in row]) + "\n"
+            content += "\n"
+    return content, False
+
+def _pdf_object_digest(obj, memo):
+    """
+    Digest of a PDF object with everything it references (fonts, form XObjects, images).
+    Streams are hashed undecoded; memo holds the digests of indirect objects already seen.
+    """
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+    from pdfminer.psparser import PSLiteral, PSKeyword
+
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in memo:
+            memo[obj.objid] = b"cycle"
+            memo[obj.objid] = _pdf_object_digest(obj.resolve(), memo)
+        return memo[obj.objid]
+
+    digest = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        digest.update(b"stream" + _pdf_object_digest(obj.attrs, memo))
+        digest.update(obj.rawdata if obj.rawdata is not None else obj.data or b"")
+    elif isinstance(obj, dict):
+        digest.update(b"dict")
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode('utf-8') + _pdf_object_digest(obj[key], memo))
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"list")
+        for item in obj:
+            digest.update(_pdf_object_digest(item, memo))
+    elif isinstance(obj, (PSLiteral, PSKeyword)):
+        digest.update(b"name" + str(obj.name).encode('utf-8'))
+    elif isinstance(obj, bytes):
+        digest.update(b"bytes" + obj)
+    else:
+        digest.update(repr(obj).encode('utf-8'))
+    return digest.digest()
+
+def _pdf_page_cache_key(page, memo):
+    """
+    Page cache key: a hash of the page's content streams, resources and geometry
+    plus the extraction settings. None if the page can't be fingerprinted.
+    """
+    page_obj = page.page_obj
+    try:
+        fingerprint = _pdf_object_digest([page_obj.contents, page_obj.resources, page_obj.mediabox,
+                                          page_obj.cropbox, page_obj.rotate], memo).hex()
+    except Exception as e:
+        print(f"⚠️ Could not fingerprint PDF page {page.page_number}: {e}")
+        return None
+    return make_cache_key(fingerprint, READER_VERSION, _reader_settings())
+
+def _extract_pdf_page_list(source, page_numbers):
+    """
+    Extract the given pages (0-based) of a PDF, one (content, tables_skipped) per page.
+    Runs in worker processes for parallel extraction.
+    """
+    import pdfplumber
+    with pdfplumber.open(_open_source(source)) as pdf:
+        return [_extract_pdf_page(pdf.pages[number]) for number in page_numbers]
+
+def _get_pdf_pool(workers):
+    """Return the shared PDF extraction process pool, creating it on first use"""
+    global _pdf_pool
+    if _pdf_pool is None or _pdf_pool_workers != workers:
+        _create_pdf_pool(workers)
+    return _pdf_pool
+
+def _create_pdf_pool(workers):
+    global _pdf_pool, _pdf_pool_workers
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False)
+    # spawn avoids forking a process that already runs request and job threads
+    _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    _pdf_pool_workers = workers
+
+def _read_pdf_parallel(source, page_numbers, workers):
+    """Extract shards of the given pages in the process pool; returns their results in page order"""
+    from concurrent.futures.process import BrokenProcessPool
+    shard_size = max(PDF_MIN_SHARD_PAGES, -(-len(page_numbers) // (workers * 2)))
+    shards = [page_numbers[start:start + shard_size] for start in range(0, len(page_numbers), shard_size)]
+    try:
+        pool = _get_pdf_pool(workers)
+        futures = [pool.submit(_extract_pdf_page_list, source, shard) for shard in shards]
+        return [page for future in futures for page in future.result()]
+    except BrokenProcessPool as e:
+        print(f"⚠️ PDF worker pool failed ({e}), falling back to serial extraction")
+        _create_pdf_pool(workers)
+        return None
+
+def read_pdf_file(source, workers=None, use_cache=False):
+    """
+    Read content from a PDF file using advanced extraction
+    
+    Large PDFs are split into page-range shards and extracted in a process pool
+    when workers > 1 (default: PDF_WORKERS). Output is identical to the serial path.
+    Table extraction is skipped on pages that don't look tabular (see table_likelihood).
+    With use_cache (and PDF_PAGE_CACHE), pages whose content streams and resources
+    were extracted before, e.g. the unchanged pages of an amended filing, come
+    from the extraction cache and only the other pages are parsed.
+    """
+    workers = PDF_WORKERS if workers is None else workers
     try:
         # Try pdfplumber first (better for tables)
         try:
             import pdfplumber
-            content = ""
-            with pdfplumber.open(filepath) as pdf:
-                for page in pdf.pages:
-                    # Extract text
-                    text = page.extract_text()
-                    if text:
-                        content += text + "\n"
-                    
-                    # Extract tables separately
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table:
-                            # Convert table to readable text
-                            for row in table:
-                                if row:
-                                    content += " | ".join([str(cell) if cell else "" for cell in row]) + "\n"
-                            content += "\n"
+            page_cache = get_extraction_cache() if use_cache and PDF_PAGE_CACHE else None
+            with pdfplumber.open(_open_source(source)) as pdf:
+                page_count = len(pdf.pages)
+                keys = [None] * page_count
+                if page_cache is not None:
+                    memo = {}
+                    keys = [_pdf_page_cache_key(page, memo) for page in pdf.pages]
+                    pages = page_cache.get_pages(keys)
+                else:
+                    pages = [None] * page_count
+                missing = [number for number, page in enumerate(pages) if page is None]
+                serial = workers <= 1 or len(missing) < PDF_PARALLEL_MIN_PAGES
+                if serial:
+                    for number in missing:
+                        pages[number] = _extract_pdf_page(pdf.pages[number])
+            
+            if missing and not serial:
+                results = _read_pdf_parallel(source, missing, workers)
+                if results is None:
+                    results = _extract_pdf_page_list(source, missing)
+                for number, page in zip(missing, results):
+                    pages[number] = page
+            
+            if page_cache is not None:
+                page_cache.set_pages({keys[number]: pages[number] for number in missing if keys[number]})
+                print(f"📑 Reused {page_count - len(missing)}/{page_count} PDF pages from the page cache")
+            
+            content = "".join(page_content for page_content, _ in pages)
+            skipped = sum(tables_skipped for _, tables_skipped in pages)
+            if PDF_TABLE_TRIAGE:
+                print(f"🗂️ Table extraction skipped on {skipped}/{page_count} non-tabular pages")
             return content
         except ImportError:
             # Fallback to PyPDF2
             import PyPDF2
             content = ""
-            with open(filepath, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    content += page.extract_text() + "\n"
+            pdf_reader = PyPDF2.PdfReader(_open_source(source))
+            for page in pdf_reader.pages:
+                content += page.extract_text() + "\n"
             return content
     except ImportError:
         raise ImportError("pdfplumber or PyPDF2 is required for PDF files. Install with: pip install pdfplumber PyPDF2")
 
-def read_docx_file(filepath):
+def read_docx_file(source):
     """Read content from a Word document including tables"""
     try:
         import docx
-        doc = docx.Document(filepath)
+        doc = docx.Document(_open_source(source))
         content = ""
         
         # Simple debug info first
@@ -129,66 +381,247 @@ def read_docx_file(filepath):
         # Add error handling to prevent 500 errors
         return f"ERROR reading DOCX file: {str(e)}\n\nPartial content may be missing."
 
-def read_excel_file(filepath):
-    """Read content from an Excel file"""
+def _format_cell(value):
+    """Render a spreadsheet cell compactly: 1234.0 -> '1234', dates without midnight times"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == dt_time() else value.isoformat(sep=' ')
+    return str(value).strip()
+
+def _render_sheet(sheet_name, rows):
+    """
+    Render one sheet as ' | '-delimited rows, skipping empty rows and columns
+    rows yields sequences of cell values and is consumed once.
+    """
+    kept_rows = []
+    used_columns = set()
+    for row in rows:
+        cells = [_format_cell(value) for value in row]
+        while cells and not cells[-1]:
+            cells.pop()
+        if not cells:
+            continue
+        used_columns.update(index for index, cell in enumerate(cells) if cell)
+        kept_rows.append(cells)
+    
+    columns = sorted(used_columns)
+    lines = [f"\n--- SHEET: {sheet_name} ---"]
+    for cells in kept_rows:
+        lines.append(" | ".join(cells[index] if index < len(cells) else "" for index in columns))
+    return "\n".join(lines) + "\n"
+
+def read_excel_file(source, file_extension=None):
+    """
+    Read content from an Excel file
+    
+    The workbook is parsed once; .xlsx sheets are streamed row by row with
+    openpyxl in read-only mode and rendered as compact ' | '-delimited rows.
+    file_extension ('.xlsx' or '.xls') is required when source is bytes.
+    """
     try:
-        # Read all sheets and combine content
-        excel_file = pd.ExcelFile(filepath)
-        content = ""
-        
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(filepath, sheet_name=sheet_name)
-            content += f"\n--- SHEET: {sheet_name} ---\n"
-            content += df.to_string(index=False) + "\n"
+        file_extension = file_extension or Path(source).suffix.lower()
+        if file_extension == '.xlsx':
+            from openpyxl import load_workbook
+            workbook = load_workbook(_open_source(source), read_only=True, data_only=True)
+            try:
+                return "".join(_render_sheet(sheet.title, sheet.iter_rows(values_only=True))
+                               for sheet in workbook.worksheets)
+            finally:
+                workbook.close()
         
-        return content
+        # Legacy .xls: parse every sheet from one open handle
+        import pandas as pd
+        with pd.ExcelFile(_open_source(source)) as excel_file:
+            content = ""
+            for sheet_name in excel_file.sheet_names:
+                df = excel_file.parse(sheet_name, header=None)
+                content += _render_sheet(sheet_name, df.itertuples(index=False, name=None))
+            return content
     except ImportError:
         raise ImportError("pandas and openpyxl are required for Excel files. Install with: pip install pandas openpyxl")
 
-def read_csv_file(filepath):
-    """Read content from a CSV file"""
+class _ColumnSummary:
+    """Incrementally maintained statistics for one CSV column"""
+    
+    def __init__(self, name, numeric):
+        self.name = name
+        self.numeric = numeric
+        self.count = 0
+        self.missing = 0
+        self.unparsed = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.distinct = set()
+        self.distinct_capped = False
+    
+    def update(self, series, numbers=None):
+        """series: the column's cells as read; numbers: their parsed values, for numeric columns"""
+        self.missing += int(series.isna().sum())
+        values = series.dropna()
+        self.count += len(values)
+        if numbers is not None:
+            # Cells that don't parse ("N/A", footnotes) stay out of the totals but are counted
+            parsed = numbers.dropna()
+            self.unparsed += len(values) - len(parsed)
+            values = parsed
+        if self.numeric and len(values):
+            self.total += float(values.sum())
+            self.minimum = float(values.min()) if self.minimum is None else min(self.minimum, float(values.min()))
+            self.maximum = float(values.max()) if self.maximum is None else max(self.maximum, float(values.max()))
+        if not self.distinct_capped:
+            self.distinct.update(values.unique().tolist())
+            if len(self.distinct) > CSV_DISTINCT_LIMIT:
+                # Stop tracking exact distinct values to keep memory bounded
+                self.distinct = set()
+                self.distinct_capped = True
+    
+    def describe(self):
+        distinct = f">{CSV_DISTINCT_LIMIT}" if self.distinct_capped else str(len(self.distinct))
+        text = f"{self.name}: {'numeric' if self.numeric else 'text'}, {self.count} values, {self.missing} missing, {distinct} distinct"
+        if self.numeric and self.minimum is not None:
+            text += f", total {_format_cell(self.total)}, min {_format_cell(self.minimum)}, max {_format_cell(self.maximum)}"
+        if self.unparsed:
+            text += f", {self.unparsed} not numeric (excluded from totals)"
+        return text
+
+def _parse_csv_numbers(cells):
+    """Parse a column of CSV text as numbers, accepting "$1,234" and "(500)"; anything else becomes NaN"""
+    import pandas as pd
+    cleaned = cells.str.replace(CSV_NUMBER_NOISE_RE, "", regex=True).str.replace(CSV_NEGATIVE_RE, r"-\1", regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+def read_csv_file(source):
+    """
+    Read content from a CSV file
+    
+    The file is streamed in chunks of CSV_CHUNK_ROWS rows so memory stays flat
+    regardless of file size. Column types are inferred once from a sample,
+    per-column summaries (totals, min/max, distinct counts) are computed
+    incrementally, and rows are rendered only until CSV_TEXT_BUDGET characters.
+    Cells in numeric columns that don't parse are shown as written and counted.
+    """
     try:
-        df = pd.read_csv(filepath)
-        return df.to_string(index=False)
+        import pandas as pd
+        sample = pd.read_csv(_open_source(source), nrows=CSV_DTYPE_SAMPLE_ROWS)
+        numeric_columns = {column for column in sample.columns if pd.api.types.is_numeric_dtype(sample[column])}
+        summaries = [_ColumnSummary(column, column in numeric_columns) for column in sample.columns]
+        
+        header = " | ".join(str(column) for column in sample.columns)
+        row_lines = []
+        text_size = len(header)
+        total_rows = 0
+        
+        # Everything is read as text once and numeric columns are parsed explicitly,
+        # so chunks don't each re-run type inference. Rows are rendered from the text
+        # as written; the parsed values only feed the summaries.
+        # Only empty cells count as missing; "N/A" and the like are kept as written
+        for chunk in pd.read_csv(_open_source(source), dtype=str, keep_default_na=False, na_values=[""],
+                                 chunksize=CSV_CHUNK_ROWS):
+            total_rows += len(chunk)
+            for summary in summaries:
+                cells = chunk[summary.name]
+                summary.update(cells, _parse_csv_numbers(cells) if summary.numeric else None)
+            
+            if text_size < CSV_TEXT_BUDGET:
+                for row in chunk.itertuples(index=False, name=None):
+                    line = " | ".join(_format_cell(value) for value in row)
+                    text_size += len(line) + 1
+                    if text_size > CSV_TEXT_BUDGET:
+                        break
+                    row_lines.append(line)
+        
+        content = f"=== CSV SUMMARY: {total_rows} rows, {len(summaries)} columns ===\n"
+        content += "\n".join(summary.describe() for summary in summaries) + "\n\n"
+        content += f"=== CSV ROWS ({len(row_lines)} of {total_rows} shown) ===\n"
+        content += header + "\n" + "\n".join(row_lines) + "\n"
+        return content
     except ImportError:
         raise ImportError("pandas is required for CSV files. Install with: pip install pandas")
 
-def read_report(filepath):
+def read_report(source, use_cache=True, filename=None):
     """
     Read financial report content from various file formats
     Supports: TXT, PDF, DOCX, XLSX, CSV
     
+    Extracted text is cached on disk by file content hash, so re-reading the
+    same document (another analysis type, a retry) skips parsing entirely.
+    Newly cached text is also indexed for follow-up questions (analysis.retrieval).
+    
     Args:
-        filepath (str): Path to the financial report file
+        source: Path to the financial report file, or its contents as bytes
+            or a binary file-like object
+        use_cache (bool): Look up and store the extracted text in the extraction cache
+        filename (str): Original file name; gives the format when source isn't a path
         
     Returns:
         str: Content of the financial report or None if error
     """
     try:
-        # Check if file exists
-        if not os.path.exists(filepath):
-            print(f"❌ Error: File not found at {filepath}")
-            return None
+        if hasattr(source, 'read'):
+            source = source.read()
         
-        # Get file extension
-        file_extension = Path(filepath).suffix.lower()
+        if isinstance(source, (bytes, bytearray)):
+            display_name = filename or "uploaded file"
+            file_extension = Path(filename or "").suffix.lower()
+        else:
+            # Check if file exists
+            if not os.path.exists(source):
+                print(f"❌ Error: File not found at {source}")
+                return None
+            display_name = source
+            file_extension = Path(source).suffix.lower()
+        
+        cache_key = None
+        if use_cache:
+            if isinstance(source, (bytes, bytearray)):
+                digest = content_digest(source)
+            else:
+                with open(source, 'rb') as file:
+                    digest = content_digest(file.read())
+            cache_key = extraction_key(digest, file_extension)
+            cached_content = get_extraction_cache().get(cache_key)
+            if cached_content is not None:
+                print(f"⚡ Extraction cache hit for {display_name} ({len(cached_content)} characters)")
+                return cached_content
         
         # Read based on file type
+        read_start = time.perf_counter()
         if file_extension == '.txt':
-            content = read_txt_file(filepath)
+            content = read_txt_file(source)
         elif file_extension == '.pdf':
-            content = read_pdf_file(filepath)
+            content = read_pdf_file(source, use_cache=use_cache)
         elif file_extension == '.docx':
-            content = read_docx_file(filepath)
+            content = read_docx_file(source)
         elif file_extension in ['.xlsx', '.xls']:
-            content = read_excel_file(filepath)
+            content = read_excel_file(source, file_extension)
         elif file_extension == '.csv':
-            content = read_csv_file(filepath)
+            content = read_csv_file(source)
         else:
             print(f"❌ Unsupported file format: {file_extension}")
             return None
+        read_seconds = time.perf_counter() - read_start
+        READ_REPORT_SECONDS.observe(read_seconds, format=file_extension.lstrip('.'))
+        record_timing('read', read_seconds)
+        
+        # Don't cache partial extractions reported by the readers
+        if cache_key is not None and content and not content.startswith("ERROR reading"):
+            get_extraction_cache().set(cache_key, content)
+            # Index the text for follow-up questions (/ask) while it is at hand
+            index_start = time.perf_counter()
+            try:
+                index = get_index_store().build(cache_key, content)
+                print(f"🔎 Indexed {len(index.chunks)} chunks for follow-up questions")
+            except Exception as e:
+                print(f"⚠️ Could not build the retrieval index: {e}")
+            record_timing('index', time.perf_counter() - index_start)
         
-        print(f"✅ Successfully loaded {file_extension.upper()} report from: {filepath}")
+        print(f"✅ Successfully loaded {file_extension.upper()} report from: {display_name}")
         print(f"📄 Content length: {len(content)} characters")
         return content
         
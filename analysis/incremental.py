@@ -0,0 +1,123 @@
+"""
+Incremental analysis module for Financial Analysis Co-Pilot
+Compares a company's new filing with the one behind an earlier analysis:
+sections are aligned by heading, unchanged sections are dropped, and changed
+ones are reduced to the paragraphs that differ. The model then updates the
+earlier analysis from these changes instead of reading the whole filing.
+"""
+
+import difflib
+import hashlib
+import os
+import re
+
+from analysis.chunking import SECTION_BOUNDARY_RE, estimate_tokens
+
+# Above this share of changed text an incremental update saves little; run a full analysis instead
+INCREMENTAL_MAX_CHANGED_RATIO = float(os.environ.get('INCREMENTAL_MAX_CHANGED_RATIO', 0.5))
+# Longest excerpt of an old (replaced or removed) paragraph quoted back to the model
+REMOVED_PARAGRAPH_CHARS = 300
+
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+SPACES_RE = re.compile(r"\s+")
+YEAR_RE = re.compile(r"\b(?:19|20)\d\d\b")
+
+
+def _normalize(text):
+    return SPACES_RE.sub(" ", text).strip().lower()
+
+
+def _title_key(title):
+    # Headings such as "Fiscal 2024 Highlights" should still align with next year's
+    return YEAR_RE.sub("<year>", _normalize(title))
+
+
+def _fingerprint(text):
+    return hashlib.sha1(_normalize(text).encode('utf-8')).hexdigest()
+
+
+def _strip_heading(body):
+    return body.strip().split("\n", 1)[1] if "\n" in body.strip() else ""
+
+
+def split_sections(text):
+    """
+    Split report text at section headings (Item, Part, Note, sheet and table markers).
+
+    Returns:
+        list: (title, body) pairs in document order; text before the first heading is titled "Preamble"
+    """
+    starts = [match.start() for match in SECTION_BOUNDARY_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        body = text[start:end]
+        if not body.strip():
+            continue
+        first_line = body.strip().split("\n", 1)[0].strip()
+        title = first_line[:120] if SECTION_BOUNDARY_RE.match(body) else "Preamble"
+        sections.append((title, body))
+    return sections
+
+
+def _paragraph_changes(old_body, new_body):
+    """Describe how a section's paragraphs changed, as text for the prompt"""
+    old_paragraphs = [p.strip() for p in PARAGRAPH_SPLIT_RE.split(old_body) if p.strip()]
+    new_paragraphs = [p.strip() for p in PARAGRAPH_SPLIT_RE.split(new_body) if p.strip()]
+    matcher = difflib.SequenceMatcher(None, [_fingerprint(p) for p in old_paragraphs],
+                                      [_fingerprint(p) for p in new_paragraphs], autojunk=False)
+    lines = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        for paragraph in old_paragraphs[old_start:old_end]:
+            label = "PREVIOUSLY" if tag == 'replace' else "REMOVED"
+            excerpt = paragraph[:REMOVED_PARAGRAPH_CHARS] + (" ..." if len(paragraph) > REMOVED_PARAGRAPH_CHARS else "")
+            lines.append(f"{label}: {excerpt}")
+        for paragraph in new_paragraphs[new_start:new_end]:
+            lines.append(f"{'NOW' if tag == 'replace' else 'ADDED'}: {paragraph}")
+    return "\n\n".join(lines)
+
+
+def diff_reports(old_text, new_text):
+    """
+    Align the sections of two filings and collect what changed.
+
+    Returns:
+        dict: 'changes' (text for the prompt), 'changed_ratio' (its size relative to the
+        new text), 'change_tokens' and section counts: unchanged, changed, added, removed
+    """
+    old_sections = split_sections(old_text)
+    new_sections = split_sections(new_text)
+    matcher = difflib.SequenceMatcher(None, [_title_key(title) for title, _ in old_sections],
+                                      [_title_key(title) for title, _ in new_sections], autojunk=False)
+    parts = []
+    counts = {'unchanged': 0, 'changed': 0, 'added': 0, 'removed': 0}
+
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            for (_, old_body), (title, new_body) in zip(old_sections[old_start:old_end],
+                                                        new_sections[new_start:new_end]):
+                # The headings already match (up to the year), so compare what follows them
+                old_body, new_body = _strip_heading(old_body), _strip_heading(new_body)
+                if _fingerprint(old_body) == _fingerprint(new_body):
+                    counts['unchanged'] += 1
+                    continue
+                counts['changed'] += 1
+                parts.append(f"### CHANGED SECTION: {title}\n{_paragraph_changes(old_body, new_body)}")
+            continue
+        for title, body in new_sections[new_start:new_end]:
+            counts['added'] += 1
+            parts.append(f"### NEW SECTION: {title}\n{body.strip()}")
+        for title, _body in old_sections[old_start:old_end]:
+            counts['removed'] += 1
+            parts.append(f"### REMOVED SECTION: {title}")
+
+    changes = "\n\n".join(parts)
+    return {
+        'changes': changes,
+        'changed_ratio': len(changes) / len(new_text) if new_text else 0.0,
+        'change_tokens': estimate_tokens(changes),
+        **counts,
+    }
@@ -0,0 +1,297 @@
+"""
+Job queue module for Financial Analysis Co-Pilot
+Runs analyses on a bounded background worker pool and persists job state
+in a local SQLite database so queued work survives a restart.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Default locations and limits (override with environment variables)
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join('jobs', 'jobs.sqlite3'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 50))
+# How long a finished job's event log stays available to late stream subscribers
+JOB_EVENTS_RETENTION = int(os.environ.get('JOB_EVENTS_RETENTION', 300))
+# How long (seconds) completed and failed job records are kept; 0 keeps them forever
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+
+# Job lifecycle states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting to run"""
+
+
+class JobStore:
+    """SQLite-backed persistence for job records"""
+
+    def __init__(self, db_path=JOB_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+    def insert(self, job):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, progress, payload, result, error, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job['id'], job['status'], job['stage'], json.dumps(job['progress']),
+                 json.dumps(job['payload']), json.dumps(job['result']), job['error'],
+                 job['created_at'], job['updated_at']))
+
+    def update(self, job_id, **fields):
+        if not fields:
+            return
+        fields['updated_at'] = datetime.now().isoformat()
+        for key in ('progress', 'payload', 'result'):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def incomplete(self):
+        """Jobs that were queued or running when the process last stopped"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def purge_finished(self, older_than_seconds):
+        """Delete completed and failed jobs last updated more than older_than_seconds ago"""
+        cutoff = datetime.fromtimestamp(time.time() - older_than_seconds).isoformat()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (COMPLETED, FAILED, cutoff))
+        return cursor.rowcount
+
+    @staticmethod
+    def _row_to_job(row):
+        job = dict(row)
+        for key in ('progress', 'payload', 'result'):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+
+class JobEvents:
+    """
+    Replayable in-memory event log for one job.
+    Stream subscribers read from any index and block until new events arrive.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.closed_at = None
+        self._condition = threading.Condition()
+
+    def publish(self, event, data):
+        with self._condition:
+            self.events.append((event, data))
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self.closed_at = time.time()
+            self._condition.notify_all()
+
+    def wait(self, index, timeout):
+        """Return (events after index, closed) waiting up to timeout seconds for new ones"""
+        with self._condition:
+            if index >= len(self.events) and self.closed_at is None:
+                self._condition.wait(timeout)
+            return self.events[index:], self.closed_at is not None
+
+
+class JobManager:
+    """
+    Bounded background worker pool for analysis jobs.
+
+    handler(job_id, payload, report_stage, report_chunk) runs one job and returns
+    a (result, error) tuple. report_stage(stage) records per-stage progress and
+    report_chunk(text) publishes partial output to stream subscribers.
+
+    coalesce_key(payload), if given, names the work a job does; submit_or_join()
+    hands out the queued or running job with the same key instead of starting
+    an identical one (single-flight).
+    """
+
+    def __init__(self, handler, store=None, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING,
+                 coalesce_key=None, retention_seconds=JOB_RETENTION_SECONDS):
+        self.handler = handler
+        self.store = store or JobStore()
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.coalesce_key = coalesce_key
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._events = {}
+        self._inflight = {}
+
+    def submit(self, payload):
+        """Persist a new job and schedule it. Raises QueueFullError when saturated."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"{self._pending} jobs are already waiting")
+            self._pending += 1
+
+        now = datetime.now().isoformat()
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'status': QUEUED,
+            'stage': QUEUED,
+            'progress': [{'stage': QUEUED, 'at': now}],
+            'payload': payload,
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self.store.insert(job)
+        self._open_events(job['id'])
+        self._track_inflight(job['id'], payload)
+        self._executor.submit(self._run, job['id'], payload, job['progress'])
+        return job
+
+    def submit_or_join(self, payload):
+        """
+        Join the in-flight job doing the same work as payload, or submit a new one.
+        Joining never counts against max_pending.
+
+        Returns:
+            tuple: (job, joined) where joined is True for an existing job
+        """
+        key = self.coalesce_key(payload) if self.coalesce_key else None
+        with self._submit_lock:
+            with self._lock:
+                job_id = self._inflight.get(key) if key is not None else None
+            job = self.store.get(job_id) if job_id else None
+            if job is not None:
+                return job, True
+            return self.submit(payload), False
+
+    def inflight_count(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def events(self, job_id):
+        """Event log of a running or recently finished job, or None"""
+        with self._lock:
+            return self._events.get(job_id)
+
+    def _open_events(self, job_id):
+        with self._lock:
+            # Drop event logs of jobs that finished a while ago
+            cutoff = time.time() - JOB_EVENTS_RETENTION
+            for stale_id in [key for key, events in self._events.items()
+                             if events.closed_at is not None and events.closed_at < cutoff]:
+                del self._events[stale_id]
+            self._events[job_id] = JobEvents()
+
+    def pending_count(self):
+        return self._pending
+
+    def recover(self):
+        """Re-schedule jobs left queued or running by a previous process and drop expired finished ones"""
+        if self.retention_seconds:
+            purged = self.store.purge_finished(self.retention_seconds)
+            if purged:
+                print(f"🧹 Removed {purged} finished jobs older than {self.retention_seconds}s")
+        recovered = 0
+        for job in self.store.incomplete():
+            with self._lock:
+                self._pending += 1
+            progress = job['progress'] + [{'stage': 'recovered', 'at': datetime.now().isoformat()}]
+            self.store.update(job['id'], status=QUEUED, stage=QUEUED, progress=progress)
+            self._open_events(job['id'])
+            self._track_inflight(job['id'], job['payload'])
+            self._executor.submit(self._run, job['id'], job['payload'], progress)
+            recovered += 1
+        if recovered:
+            print(f"♻️ Recovered {recovered} unfinished analysis jobs")
+        return recovered
+
+    def _track_inflight(self, job_id, payload):
+        key = self.coalesce_key(payload) if self.coalesce_key else None
+        if key is not None:
+            with self._lock:
+                self._inflight.setdefault(key, job_id)
+
+    def _run(self, job_id, payload, progress):
+        progress = list(progress)
+        events = self.events(job_id) or JobEvents()
+
+        def report_stage(stage):
+            progress.append({'stage': stage, 'at': datetime.now().isoformat()})
+            self.store.update(job_id, stage=stage, progress=progress)
+            events.publish('stage', {'stage': stage})
+
+        def report_chunk(text):
+            events.publish('chunk', {'text': text})
+
+        try:
+            self.store.update(job_id, status=RUNNING)
+            report_stage(RUNNING)
+            result, error = self.handler(job_id, payload, report_stage, report_chunk)
+            if error is not None:
+                report_stage(FAILED)
+                self.store.update(job_id, status=FAILED, error=error)
+                events.publish('error', {'error': error})
+            else:
+                report_stage(COMPLETED)
+                self.store.update(job_id, status=COMPLETED, result=result)
+                events.publish('done', {'data': result})
+        except Exception as e:
+            print(f"[{job_id}] Job crashed: {e}")
+            error = f"An unexpected error occurred: {str(e)[:150]}"
+            report_stage(FAILED)
+            self.store.update(job_id, status=FAILED, error=error)
+            events.publish('error', {'error': error})
+        finally:
+            events.close()
+            key = self.coalesce_key(payload) if self.coalesce_key else None
+            with self._lock:
+                self._pending -= 1
+                if key is not None and self._inflight.get(key) == job_id:
+                    del self._inflight[key]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
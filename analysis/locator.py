@@ -0,0 +1,153 @@
+"""
+Financial statement locator for Financial Analysis Co-Pilot
+Finds where the core financial statements begin in a 10-K using the same
+header heuristics as the Step 1 prompt, without a model round-trip.
+"""
+
+import re
+
+# Primary headers: the core statements almost always start with one of these
+STATEMENT_HEADERS = [
+    r"consolidated\s+balance\s+sheets?",
+    r"consolidated\s+statements?\s+of\s+financial\s+position",
+    r"consolidated\s+statements?\s+of\s+income",
+    r"consolidated\s+statements?\s+of\s+earnings",
+    r"consolidated\s+statements?\s+of\s+operations",
+    r"consolidated\s+statements?\s+of\s+comprehensive\s+income",
+    r"consolidated\s+statements?\s+of\s+cash\s+flows?",
+]
+
+STATEMENT_HEADER_RE = re.compile("|".join(f"(?:{pattern})" for pattern in STATEMENT_HEADERS), re.IGNORECASE)
+STATEMENT_INDEX_RE = re.compile(r"index\s+to\s+(?:condensed\s+)?consolidated\s+financial\s+statements", re.IGNORECASE)
+AUDITOR_REPORT_RE = re.compile(r"report\s+of\s+independent\s+registered\s+public\s+accounting\s+firm", re.IGNORECASE)
+
+# Index / table-of-contents entries end in a page number, often after dot leaders
+INDEX_ENTRY_RE = re.compile(r"(?:\.{3,}|\s)\s*(?:F-)?\d{1,3}\s*$")
+# ...but "Balance Sheets as of December 31" is a heading, not an index entry
+DATE_SUFFIX_RE = re.compile(
+    r"(?:january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}\s*$",
+    re.IGNORECASE)
+
+# A heading line is short; prose that merely mentions a statement is not
+MAX_HEADING_LINE_LENGTH = 120
+# ...and is set in title or upper case, not as a sentence
+PARENTHETICAL_RE = re.compile(r"\([^)]*\)")
+# Full stops end sentences, except after company abbreviations ("Apple Inc.")
+SENTENCE_PUNCTUATION_RE = re.compile(r"(?:[;!?]|(?<!\bInc)(?<!\bCorp)(?<!\bCo)(?<!\bLtd)\.)(?:\s|$)",
+                                     re.IGNORECASE)
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z'&-]*")
+MINOR_WORDS = frozenset("a an and as at by for from in of on or the to".split())
+
+NOT_FOUND_MARKER = "FINANCIAL_STATEMENTS_NOT_FOUND"
+
+
+def _line_bounds(text, position):
+    """Return the (start, end) offsets of the line containing position"""
+    start = text.rfind("\n", 0, position) + 1
+    end = text.find("\n", position)
+    return start, len(text) if end == -1 else end
+
+
+def _is_capitalized(text):
+    """True if the text is in title or upper case (short function words aside)"""
+    words = [word for word in WORD_RE.findall(text) if word.lower() not in MINOR_WORDS]
+    return bool(words) and all(word[0].isupper() for word in words)
+
+
+def _is_heading(text, match):
+    """
+    True if a header match is a heading line: short, not an index entry, and in
+    title or upper case without sentence punctuation. pdfplumber wraps prose into
+    short lines too, so "net in the consolidated statements of operations." must not count.
+    """
+    start, end = _line_bounds(text, match.start())
+    line = text[start:end].strip()
+    if len(line) > MAX_HEADING_LINE_LENGTH:
+        return False
+    if INDEX_ENTRY_RE.search(line) and not DATE_SUFFIX_RE.search(line):
+        return False
+    # Captions such as "(In millions, except per share amounts)" don't count against the header
+    bare_line = " ".join(PARENTHETICAL_RE.sub(" ", line).split())
+    return not SENTENCE_PUNCTUATION_RE.search(bare_line) and _is_capitalized(bare_line)
+
+
+def _first_heading(text, start=0):
+    """Offset of the first statement header after start that looks like a heading"""
+    for match in STATEMENT_HEADER_RE.finditer(text, start):
+        if _is_heading(text, match):
+            return _line_bounds(text, match.start())[0]
+    return None
+
+
+def locate_financial_statements(text):
+    """
+    Find the offset where the financial statements begin.
+
+    Strategies, in order:
+    1. The first statement heading after the "Report of Independent Registered
+       Public Accounting Firm", which precedes the statements in a 10-K
+    2. The first statement header that appears as a heading line
+    3. The first statement header after the auditor report, or the report
+       itself if no header follows it
+    4. The first statement header after an "Index to Consolidated Financial Statements"
+    5. Any mention of a statement header at all
+
+    Returns:
+        tuple: (offset, strategy name) or (None, None) if nothing matched
+    """
+    if not text:
+        return None, None
+
+    auditor_match = AUDITOR_REPORT_RE.search(text)
+    if auditor_match:
+        offset = _first_heading(text, auditor_match.end())
+        if offset is not None:
+            return offset, "heading_after_auditor_report"
+
+    offset = _first_heading(text)
+    if offset is not None:
+        return offset, "statement_header"
+
+    if auditor_match:
+        header_match = STATEMENT_HEADER_RE.search(text, auditor_match.end())
+        if header_match:
+            return _line_bounds(text, header_match.start())[0], "after_auditor_report"
+        return _line_bounds(text, auditor_match.start())[0], "auditor_report"
+
+    index_match = STATEMENT_INDEX_RE.search(text)
+    if index_match:
+        header_match = STATEMENT_HEADER_RE.search(text, index_match.end())
+        if header_match:
+            return _line_bounds(text, header_match.start())[0], "after_statement_index"
+
+    header_match = STATEMENT_HEADER_RE.search(text)
+    if header_match:
+        return _line_bounds(text, header_match.start())[0], "header_mention"
+
+    return None, None
+
+
+def find_anchor(text, anchor):
+    """
+    Find an anchor phrase returned by the model in the document text.
+    Matching ignores case and differences in whitespace.
+
+    Returns:
+        int: Offset of the start of the anchor's line, or None if not found
+    """
+    if not anchor:
+        return None
+    anchor = anchor.strip().strip('"\'`').strip()
+    if not anchor or NOT_FOUND_MARKER in anchor:
+        return None
+
+    words = anchor.split()
+    # Models sometimes paraphrase the tail of a line; retry with shorter prefixes
+    for length in (len(words), 8, 5):
+        if length > len(words):
+            continue
+        pattern = r"\s+".join(re.escape(word) for word in words[:length])
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return _line_bounds(text, match.start())[0]
+    return None
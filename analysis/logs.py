@@ -0,0 +1,33 @@
+"""
+Logging module for Financial Analysis Co-Pilot
+Level-controlled logger for diagnostics that are too verbose to print on
+every request, with sampling so large payloads are only logged occasionally.
+"""
+
+import logging
+import os
+import random
+
+# DEBUG enables diagnostics; the default INFO keeps them out of the logs
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Fraction of requests whose diagnostics are logged when LOG_LEVEL allows them
+DIAGNOSTIC_SAMPLE_RATE = float(os.environ.get('DIAGNOSTIC_SAMPLE_RATE', 0.05))
+# Characters of extracted text included in a diagnostic preview
+DIAGNOSTIC_PREVIEW_CHARS = int(os.environ.get('DIAGNOSTIC_PREVIEW_CHARS', 500))
+
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger('copilot')
+logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+
+
+def diagnostics_enabled():
+    """Whether this request's debug diagnostics should be logged (level check first, then sampling)"""
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < DIAGNOSTIC_SAMPLE_RATE
+
+
+def log_text_preview(analysis_id, title, text):
+    """Log a bounded preview of a large text at DEBUG level, for a sample of requests"""
+    if not diagnostics_enabled():
+        return
+    preview = text[:DIAGNOSTIC_PREVIEW_CHARS] if text else "No text was extracted."
+    logger.debug("[%s] %s (%d chars):\n%s", analysis_id, title, len(text) if text else 0, preview)
@@ -0,0 +1,248 @@
+"""
+Metrics module for Financial Analysis Co-Pilot
+Thread-safe counters and histograms rendered in the Prometheus text format
+for /metrics, plus per-request stage timings for Server-Timing headers.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds: file saves and cache lookups up to multi-minute model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, stage=None, **labels):
+        """Observe the duration of the with-block; also record it as a Server-Timing stage if named"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(elapsed, **labels)
+            if stage:
+                record_timing(stage, elapsed)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(value['counts']), value['sum'], value['count']) for key, value in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# --- Request and stage latency ---
+REQUEST_SECONDS = REGISTRY.histogram(
+    'copilot_request_seconds', 'HTTP request handling time', ('endpoint', 'method', 'status'))
+UPLOAD_SAVE_SECONDS = REGISTRY.histogram(
+    'copilot_upload_save_seconds', 'Time to store an upload for its job (in memory, or spilled to disk)')
+READ_REPORT_SECONDS = REGISTRY.histogram(
+    'copilot_read_report_seconds', 'Text extraction time per file format (cache misses only)', ('format',))
+COMPACTION_SECONDS = REGISTRY.histogram(
+    'copilot_compaction_seconds', 'Report text compaction time')
+GEMINI_CALL_SECONDS = REGISTRY.histogram(
+    'copilot_gemini_call_seconds', 'Model call time, including streaming', ('profile', 'outcome'))
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    'copilot_analysis_seconds', 'Analysis job time from upload to result', ('analysis_type', 'outcome'))
+
+# --- Model usage ---
+GEMINI_CALLS = REGISTRY.counter(
+    'copilot_gemini_calls_total', 'Model calls by profile and outcome (ok, error, timeout, quota)',
+    ('profile', 'outcome'))
+PROMPT_CHARS = REGISTRY.counter('copilot_prompt_chars_total', 'Characters sent to the model')
+PROMPT_TOKENS = REGISTRY.counter(
+    'copilot_prompt_tokens_total', 'Prompt tokens by profile (from usage metadata, else estimated)', ('profile',))
+RESPONSE_CHARS = REGISTRY.counter('copilot_response_chars_total', 'Characters received from the model')
+RESPONSE_TOKENS = REGISTRY.counter(
+    'copilot_response_tokens_total', 'Response tokens by profile (from usage metadata, else estimated)', ('profile',))
+
+# --- Outbound model call scheduling ---
+GEMINI_QUEUE_DEPTH = REGISTRY.gauge('copilot_gemini_queue_depth', 'Model calls waiting for their turn', ('model',))
+GEMINI_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    'copilot_gemini_concurrency_limit', 'Current adaptive limit on concurrent model calls', ('model',))
+GEMINI_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'copilot_gemini_queue_wait_seconds', 'Time a model call waited for rate limits and a free slot',
+    ('model', 'priority'))
+GEMINI_RETRIES = REGISTRY.counter(
+    'copilot_gemini_retries_total', 'Model calls retried after a quota or server error', ('reason',))
+
+# --- Caches ---
+CACHE_LOOKUPS = REGISTRY.counter(
+    'copilot_cache_lookups_total', 'Cache lookups by cache and result (hit, miss)', ('cache', 'result'))
+COALESCED_UPLOADS = REGISTRY.counter(
+    'copilot_coalesced_uploads_total', 'Uploads that joined an identical in-flight analysis', ('analysis_type',))
+
+
+# Stage timings of the request or job running in the current context, for Server-Timing
+_timings = contextvars.ContextVar('copilot_timings', default=None)
+_timings_lock = threading.Lock()
+SERVER_TIMING_NAME_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+@contextmanager
+def collect_timings():
+    """Collect stage timings recorded in this context; yields a dict of stage -> seconds"""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record_timing(stage, seconds):
+    """Add seconds to a stage of the current collection (no-op outside collect_timings)"""
+    timings = _timings.get()
+    if timings is not None:
+        # Worker threads of one job (chunk summaries) may add to the same stage
+        with _timings_lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def server_timing_header(timings):
+    """Format stage timings as a Server-Timing header value (durations in milliseconds)"""
+    return ", ".join(f"{SERVER_TIMING_NAME_RE.sub('_', stage)};dur={seconds * 1000:.1f}"
+                     for stage, seconds in timings.items())
@@ -0,0 +1,139 @@
+"""
+Model profiles module for Financial Analysis Co-Pilot
+A registry of named model profiles (a model plus its generation settings)
+and the routing of each pipeline stage and analysis type to a profile, so
+cheap stages such as statement location can run on a faster model while
+the final report keeps the stronger one.
+"""
+
+import hashlib
+import json
+import threading
+
+# Pipeline stages that call the model
+STAGE_LOCATE = 'locate'  # 10-K Step 1: ask for the anchor line of the statements
+STAGE_ANALYZE = 'analyze'  # final report of a 10-K or general analysis
+STAGE_SUMMARIZE = 'summarize'  # section summaries of long reports
+STAGE_REDUCE = 'reduce'  # final report written from the section summaries
+STAGE_ASK = 'ask'  # follow-up question answered from retrieved excerpts (/ask)
+STAGE_UPDATE = 'update'  # earlier analysis updated from the changes in a new filing
+
+DEFAULT_ROUTE = 'default'
+
+
+def parse_routes(spec):
+    """
+    Parse a routing spec like "locate=fast, summarize=fast, 10k.analyze=standard".
+
+    Returns:
+        dict: route key -> profile name
+    """
+    routes = {}
+    for item in (spec or "").split(','):
+        if not item.strip():
+            continue
+        key, separator, profile = item.partition('=')
+        if not separator or not key.strip() or not profile.strip():
+            print(f"⚠️ Ignoring malformed model route '{item.strip()}'")
+            continue
+        routes[key.strip()] = profile.strip()
+    return routes
+
+
+def parse_profiles(spec):
+    """
+    Parse profiles given as JSON: {"name": {"model": ..., "generation_config": {...}}}.
+
+    Returns:
+        dict: profile name -> profile (empty if spec is unset or invalid)
+    """
+    if not spec:
+        return {}
+    try:
+        profiles = json.loads(spec)
+    except ValueError as e:
+        print(f"⚠️ Ignoring invalid MODEL_PROFILES: {e}")
+        return {}
+    return {name: profile for name, profile in profiles.items()
+            if isinstance(profile, dict) and profile.get('model')}
+
+
+class ModelRegistry:
+    """
+    Resolves (stage, analysis type) to a model profile and runs the call on it.
+
+    Routes are looked up as "<analysis type>.<stage>", "<stage>", "<analysis type>"
+    and finally "default". Profiles on the same model share one client, so they
+    share its rate limits and concurrency as the API quota does.
+    client_factory(model_name) creates the GeminiClient for a model.
+    """
+
+    def __init__(self, profiles, routes, client_factory):
+        self.profiles = {name: dict(profile) for name, profile in profiles.items()}
+        self.routes = {DEFAULT_ROUTE: 'standard'}
+        for key, profile in routes.items():
+            if profile in self.profiles:
+                self.routes[key] = profile
+            else:
+                print(f"⚠️ Model route '{key}' names unknown profile '{profile}', ignoring it")
+        if self.routes[DEFAULT_ROUTE] not in self.profiles:
+            raise ValueError(f"Default model profile '{self.routes[DEFAULT_ROUTE]}' is not defined")
+        self._client_factory = client_factory
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def profile_for(self, stage, analysis_type=None):
+        """Name of the profile that serves a stage of an analysis type"""
+        for key in (f"{analysis_type}.{stage}", stage, analysis_type):
+            if key in self.routes:
+                return self.routes[key]
+        return self.routes[DEFAULT_ROUTE]
+
+    def client(self, model_name):
+        """The shared client for a model, created on first use"""
+        with self._lock:
+            client = self._clients.get(model_name)
+            if client is None:
+                client = self._clients[model_name] = self._client_factory(model_name)
+            return client
+
+    def generate(self, prompt, stage, analysis_type=None, **kwargs):
+        """
+        Run a model call on the profile routed for stage and analysis_type.
+        Keyword arguments are passed on to GeminiClient.generate().
+
+        Returns:
+            tuple: (response text, None) on success or (None, error message) on failure
+        """
+        name = self.profile_for(stage, analysis_type)
+        profile = self.profiles[name]
+        return self.client(profile['model']).generate(
+            prompt, generation_config=profile.get('generation_config'), profile=name, **kwargs)
+
+    def routed_profiles(self):
+        """Names of the profiles some route points to"""
+        return sorted(set(self.routes.values()))
+
+    def fingerprint(self, default_name, default_profile):
+        """
+        Identify the routing for result cache keys: default_name while every route
+        resolves to default_profile, else default_name plus a hash of the routes
+        """
+        resolved = {key: self.profiles[name] for key, name in sorted(self.routes.items())}
+        if all(profile == default_profile for profile in resolved.values()):
+            return default_name
+        digest = hashlib.sha256(json.dumps(resolved, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"{default_name}+routes:{digest[:12]}"
+
+    def warmup(self):
+        """Create the model of every routed profile; returns whether all are available"""
+        return all(self.client(self.profiles[name]['model']).available for name in self.routed_profiles())
+
+    def stats(self):
+        """Routes, plus latency and token statistics per profile"""
+        with self._lock:
+            clients = list(self._clients.values())
+        profiles = {}
+        for client in clients:
+            profiles.update(client.profile_stats())
+        return {'routes': dict(self.routes), 'profiles': profiles}
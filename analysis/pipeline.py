@@ -0,0 +1,254 @@
+"""
+Analysis pipeline for Financial Analysis Co-Pilot
+Turns extracted report text into an analysis: the two-step 10-K process,
+single-prompt general analysis, map-reduce analysis of long reports and
+incremental updates of an earlier analysis from a new filing's changes;
+also answers follow-up questions from a document's retrieval index.
+Shared by the web app (app.py) and the batch runner (main.py).
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis.config import model_registry
+from analysis.models import STAGE_LOCATE, STAGE_ANALYZE, STAGE_SUMMARIZE, STAGE_REDUCE, STAGE_ASK, STAGE_UPDATE
+from analysis.prompts import (FINANCIAL_ANALYSIS_PROMPT, TEN_K_ANALYSIS_PROMPT, TEN_K_METRICS_ANALYSIS_PROMPT,
+                              LOCATE_FINANCIALS_PROMPT, CHUNK_SUMMARY_PROMPT, CHUNK_REDUCE_PROMPT, ASK_PROMPT,
+                              INCREMENTAL_ANALYSIS_PROMPT)
+from analysis.locator import locate_financial_statements, find_anchor
+from analysis.compaction import compact_report_text
+from analysis.metrics import COMPACTION_SECONDS, record_timing
+from analysis.scheduler import PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK
+from analysis.logs import log_text_preview
+from analysis.retrieval import RETRIEVAL_TOP_K
+from analysis.incremental import diff_reports, INCREMENTAL_MAX_CHANGED_RATIO
+from analysis.chunking import (split_into_chunks, estimate_tokens, SINGLE_PASS_TOKEN_LIMIT,
+                               CHUNK_TOKEN_BUDGET, CHUNK_CONCURRENCY)
+
+
+def _call_gemini_api(prompt, analysis_id, timeout_seconds=180, on_chunk=None, # Increased timeout for long docs
+                     priority=PRIORITY_NORMAL, stage=STAGE_ANALYZE, analysis_type='general'):
+    """
+    A helper function to call the Gemini API with a given prompt and timeout.
+    If on_chunk is given the response is streamed and each text chunk is passed to it.
+    priority orders the call in the outbound queue when the model is busy; stage and
+    analysis_type pick the model profile (see analysis.models).
+    Safe to call from any thread; see analysis.client.GeminiClient.
+    """
+    return model_registry.generate(prompt, stage, analysis_type, label=analysis_id, timeout_seconds=timeout_seconds,
+                                   on_chunk=on_chunk, priority=priority)
+
+
+def analyze_financial_report(report_text, analysis_id, analysis_type='general'):
+    """
+    Analyze financial report using a two-step process for 10-K reports.
+    Returns the analysis text, or a user-facing error message on failure.
+    """
+    analysis_result, error = run_analysis(report_text, analysis_id, analysis_type)
+    return error if error is not None else analysis_result
+
+
+def run_analysis(report_text, analysis_id, analysis_type='general', report_stage=None, on_chunk=None):
+    """
+    Run the analysis pipeline and return an (analysis_result, error) tuple.
+    Exactly one of the two is set, so callers can tell failures apart from results.
+    report_stage, if given, is called with the name of each pipeline stage as it starts;
+    on_chunk, if given, receives the final report text incrementally as it is generated.
+    """
+    report_stage = report_stage or (lambda stage: None)
+    try:
+        # Drop duplicated table rows, running headers and whitespace before prompting
+        with COMPACTION_SECONDS.time(stage='compaction'):
+            report_text, compaction_stats = compact_report_text(report_text)
+        print(f"[{analysis_id}] Compacted report text: {compaction_stats['chars_before']} -> "
+              f"{compaction_stats['chars_after']} chars (~{compaction_stats['tokens_before']} -> "
+              f"~{compaction_stats['tokens_after']} tokens)")
+
+        if analysis_type == '10k':
+            # --- STEP 1: LOCATE AND EXTRACT FINANCIAL STATEMENTS ---
+            # The header heuristics run locally and the text is sliced here; the model is
+            # only asked for an anchor line when none of the heuristics match.
+            report_stage('locating')
+            print(f"[{analysis_id}] 10-K Analysis Step 1: Locating financials in the full document...")
+            start_offset, strategy = locate_financial_statements(report_text)
+
+            if start_offset is None:
+                print(f"[{analysis_id}] Local locator found no statement headers, asking the model for an anchor line...")
+                locate_prompt = LOCATE_FINANCIALS_PROMPT.format(report_text=report_text)
+                anchor, error = _call_gemini_api(locate_prompt, analysis_id, timeout_seconds=120,
+                                                 priority=PRIORITY_BULK, stage=STAGE_LOCATE, analysis_type='10k')
+
+                if error:
+                    return None, f"Error during financial statement location (Step 1): {error}"
+
+                start_offset = find_anchor(report_text, anchor)
+                strategy = "model_anchor"
+
+            extracted_text = report_text[start_offset:] if start_offset is not None else None
+            print(f"[{analysis_id}] Financial statements located via {strategy} at offset {start_offset}")
+
+            log_text_preview(analysis_id, "Start of extracted text from Step 1", extracted_text)
+
+            if not extracted_text or len(extracted_text) < 200:
+                print(f"[{analysis_id}] Location failed or returned minimal/no content. Unable to perform analysis.")
+                return None, ("<h3>Analysis Failed: Could Not Locate Financial Statements</h3>"
+                              "<p>The AI was unable to locate the core financial statements within the document. "
+                              "This can happen with non-standard 10-K formats or scanned documents. "
+                              "Please try a different file.</p>")
+            
+            print(f"[{analysis_id}] Successfully extracted financial data for Step 2.")
+            final_analysis_text = extracted_text
+
+            # --- STEP 2: ANALYZE THE EXTRACTED FINANCIAL DATA ---
+            # Parse the statements and compute ratios locally; the model then only sees the
+            # compact metrics. Fall back to the full statement text if parsing comes up short.
+            report_stage('calculating')
+            # Imported on first use: pulls in pandas and NumPy
+            from analysis.statements import build_financial_summary, format_financial_summary
+            financial_summary = build_financial_summary(final_analysis_text)
+            report_stage('analyzing')
+            print(f"[{analysis_id}] 10-K Analysis Step 2: Analyzing extracted financial data...")
+            if financial_summary is not None:
+                print(f"[{analysis_id}] Using {len(financial_summary['line_items'])} locally parsed line items and computed ratios.")
+                analysis_prompt = TEN_K_METRICS_ANALYSIS_PROMPT.format(
+                    financial_metrics=format_financial_summary(financial_summary))
+            else:
+                analysis_prompt = TEN_K_ANALYSIS_PROMPT.format(report_text=final_analysis_text)
+            analysis_result, error = _call_gemini_api(analysis_prompt, analysis_id, timeout_seconds=120,
+                                                      on_chunk=on_chunk, priority=PRIORITY_INTERACTIVE,
+                                                      analysis_type='10k')
+
+            if error:
+                return None, f"Error during financial analysis (Step 2): {error}"
+            
+            return analysis_result, None
+
+        else: # General Analysis
+            if estimate_tokens(report_text) > SINGLE_PASS_TOKEN_LIMIT:
+                # Too long for one prompt: summarize sections concurrently, then reduce
+                return _run_chunked_analysis(report_text, analysis_id, report_stage, on_chunk)
+            
+            report_stage('analyzing')
+            print(f"[{analysis_id}] Performing General Analysis...")
+            general_prompt = FINANCIAL_ANALYSIS_PROMPT.format(report_text=report_text)
+            analysis_result, error = _call_gemini_api(general_prompt, analysis_id, timeout_seconds=120,
+                                                      on_chunk=on_chunk, priority=PRIORITY_INTERACTIVE)
+            
+            if error:
+                return None, f"Error during general analysis: {error}"
+            
+            return analysis_result, None
+
+    except Exception as e:
+        print(f"[{analysis_id}] Analysis error in main function: {e}")
+        return None, f"Analysis failed due to a system error. Please try again. Error: {str(e)[:100]}"
+
+
+def run_incremental_analysis(report_text, prior_report_text, prior_analysis, analysis_id, analysis_type='general',
+                             report_stage=None, on_chunk=None):
+    """
+    Update an earlier analysis of the same company for its new filing: the model gets
+    the earlier analysis plus only the sections that changed (see analysis.incremental).
+    Falls back to a full run_analysis when too much has changed to save anything.
+    Returns an (analysis_result, error) tuple, like run_analysis.
+    """
+    report_stage = report_stage or (lambda stage: None)
+    report_stage('comparing')
+    with COMPACTION_SECONDS.time(stage='compaction'):
+        new_text, _ = compact_report_text(report_text)
+        old_text, _ = compact_report_text(prior_report_text)
+    diff_start = time.perf_counter()
+    diff = diff_reports(old_text, new_text)
+    record_timing('diff', time.perf_counter() - diff_start)
+    print(f"[{analysis_id}] Compared with the prior filing: {diff['changed']} changed, {diff['added']} new, "
+          f"{diff['removed']} removed, {diff['unchanged']} unchanged sections "
+          f"(~{diff['change_tokens']} tokens of changes, {diff['changed_ratio']:.0%} of the new text)")
+
+    if not diff['changes']:
+        print(f"[{analysis_id}] The new filing's text is identical; reusing the prior analysis.")
+        return prior_analysis, None
+    if diff['changed_ratio'] > INCREMENTAL_MAX_CHANGED_RATIO or diff['change_tokens'] > SINGLE_PASS_TOKEN_LIMIT:
+        print(f"[{analysis_id}] Too much has changed for an incremental update; running a full analysis.")
+        return run_analysis(report_text, analysis_id, analysis_type, report_stage=report_stage, on_chunk=on_chunk)
+
+    report_stage('analyzing')
+    prompt = INCREMENTAL_ANALYSIS_PROMPT.format(
+        prior_analysis=prior_analysis, changes=diff['changes'], changed_sections=diff['changed'],
+        added_sections=diff['added'], removed_sections=diff['removed'], unchanged_sections=diff['unchanged'])
+    analysis_result, error = _call_gemini_api(prompt, analysis_id, timeout_seconds=120, on_chunk=on_chunk,
+                                              priority=PRIORITY_INTERACTIVE, stage=STAGE_UPDATE,
+                                              analysis_type=analysis_type)
+    if error:
+        return None, f"Error during incremental analysis: {error}"
+    return analysis_result, None
+
+
+def _run_chunked_analysis(report_text, analysis_id, report_stage, on_chunk=None):
+    """
+    Map-reduce general analysis for long reports: split the text on section
+    boundaries, summarize the chunks concurrently, then write the final report
+    from the section notes. Returns an (analysis_result, error) tuple.
+    """
+    chunks = split_into_chunks(report_text, CHUNK_TOKEN_BUDGET)
+    chunk_count = len(chunks)
+    report_stage('summarizing')
+    print(f"[{analysis_id}] Performing chunked General Analysis over {chunk_count} sections...")
+
+    def summarize(numbered_chunk):
+        number, chunk = numbered_chunk
+        prompt = CHUNK_SUMMARY_PROMPT.format(chunk_number=number, chunk_count=chunk_count, report_text=chunk)
+        return _call_gemini_api(prompt, f"{analysis_id}:{number}/{chunk_count}", timeout_seconds=120,
+                                priority=PRIORITY_BULK, stage=STAGE_SUMMARIZE)
+
+    with ThreadPoolExecutor(max_workers=min(CHUNK_CONCURRENCY, chunk_count)) as executor:
+        # Run each summary in a copy of this context so its timings reach the job's Server-Timing
+        futures = [executor.submit(contextvars.copy_context().run, summarize, numbered_chunk)
+                   for numbered_chunk in enumerate(chunks, start=1)]
+        summaries = [future.result() for future in futures]
+
+    section_notes = []
+    for number, (summary, error) in enumerate(summaries, start=1):
+        if error:
+            return None, f"Error during general analysis (section {number} of {chunk_count}): {error}"
+        if "NO_RELEVANT_CONTENT" not in summary:
+            section_notes.append(f"### Section {number} of {chunk_count}\n{summary.strip()}")
+
+    report_stage('analyzing')
+    reduce_prompt = CHUNK_REDUCE_PROMPT.format(section_notes="\n\n".join(section_notes))
+    analysis_result, error = _call_gemini_api(reduce_prompt, analysis_id, timeout_seconds=120, on_chunk=on_chunk,
+                                              priority=PRIORITY_INTERACTIVE, stage=STAGE_REDUCE)
+
+    if error:
+        return None, f"Error during general analysis: {error}"
+
+    return analysis_result, None
+
+
+def answer_followup_question(index, question, analysis_id, filename, analysis_type='general', top_k=None):
+    """
+    Answer a follow-up question about an analysed document from the chunks of its
+    retrieval index (analysis.retrieval.DocumentIndex) that best match the question.
+
+    Returns:
+        tuple: ({'answer', 'sources'}, None) on success or (None, error message) on failure
+    """
+    retrieve_start = time.perf_counter()
+    hits = index.search(question, top_k or RETRIEVAL_TOP_K)
+    record_timing('retrieve', time.perf_counter() - retrieve_start)
+    sources = [{'number': number, 'section': chunk['section'], 'offset': chunk['offset'], 'score': round(score, 3)}
+               for number, (score, chunk) in enumerate(hits, start=1)]
+    if not hits:
+        return {'answer': ("<p>No part of the report matches this question. "
+                           "Try rephrasing it with terms the report uses.</p>"),
+                'sources': []}, None
+
+    excerpts = "\n\n".join(f"[{number}] ({chunk['section'] or 'Untitled section'})\n{chunk['text']}"
+                            for number, (_score, chunk) in enumerate(hits, start=1))
+    prompt = ASK_PROMPT.format(filename=filename, question=question, excerpts=excerpts)
+    print(f"[{analysis_id}] Answering a follow-up question from {len(hits)} excerpts ({len(prompt)} chars)")
+    answer, error = _call_gemini_api(prompt, f"{analysis_id}:ask", timeout_seconds=60, on_chunk=None,
+                                     priority=PRIORITY_INTERACTIVE, stage=STAGE_ASK, analysis_type=analysis_type)
+    if error:
+        return None, f"Error while answering the question: {error}"
+    return {'answer': answer, 'sources': sources}, None
@@ -3,12 +3,18 @@ Prompt templates for Financial Analysis Co-Pilot
 Contains prompts for a two-step 10-K analysis process.
 """
 
+# Bump this whenever any template below changes. Cached analyses are keyed on it,
+# so stale results produced by an older prompt are never served.
+PROMPT_VERSION = "3.8"
+
 # ======================================================================================
 # STEP 1 PROMPT: Locate the beginning of the financial statements in a 10-K report
+# Only used when the local locator (analysis/locator.py) finds no headers; the model
+# returns an anchor line rather than echoing the document back.
 # ======================================================================================
 
 LOCATE_FINANCIALS_PROMPT = """
-You are an expert document analyst specializing in SEC filings. Your task is to intelligently locate and extract the complete financial statements section from a 10-K report.
+You are an expert document analyst specializing in SEC filings. Your task is to locate where the complete financial statements section begins in a 10-K report.
 
 **Primary Goal:** Find the beginning of the core financial statements. These almost always begin with one of the following exact phrases (case-insensitive). Find the **FIRST occurrence** of any of these headers:
 - "consolidated balance sheets"
@@ -21,11 +27,11 @@ You are an expert document analyst specializing in SEC filings. Your task is to
 
 **Secondary Strategy (if primary headers are not obvious):**
 - Look for a page titled "INDEX TO CONSOLIDATED FINANCIAL STATEMENTS". If you find this, the statements will begin shortly after.
-- Look for the "REPORT OF INDEPENDENT REGISTERED PUBLIC ACCOUNTING FIRM". The financial statements almost always begin immediately after this report. Find the accounting firm's report, and then start the extraction from the page *after* it ends.
+- Look for the "REPORT OF INDEPENDENT REGISTERED PUBLIC ACCOUNTING FIRM". The financial statements almost always begin immediately after this report.
 
 **Instructions:**
 1.  Analyze the entire document provided below to find the starting point using the strategies above.
-2.  Once you locate the starting point, return the **ENTIRE rest of the document's text starting from that point**. Do not omit anything. Your goal is to pass the full financial statements, including all subsequent tables and notes, to the next stage of analysis.
+2.  Return **only** the first line of text at that starting point, copied exactly as it appears in the document (at most 15 words). Do not return any other text, commentary or formatting. The document will be sliced locally at that line.
 3.  If, after using all strategies, you absolutely cannot find the financial statements, return the single phrase: "FINANCIAL_STATEMENTS_NOT_FOUND".
 
 **DOCUMENT TEXT:**
@@ -38,18 +44,8 @@ You are an expert document analyst specializing in SEC filings. Your task is to
 # STEP 2 PROMPT: Analyze the extracted financial statements with improved formatting
 # ======================================================================================
 
-TEN_K_ANALYSIS_PROMPT = """
-You are a top-tier financial analyst AI. Your task is to deliver a professional, clear, and visually appealing analysis of the provided financial statements.
-
-**OUTPUT INSTRUCTIONS:**
-- **Structure:** Present the entire analysis using self-contained HTML cards.
-- **Styling:** Use the provided CSS classes (`analysis-card`, `card-header`, `card-body`, `kpi-grid`, `kpi-item`).
-- **Clarity:** Be concise. Use bullet points (`<li>`) for lists and `<br>` for line breaks inside paragraphs. Avoid large empty spaces.
-- **Data First:** If you cannot find a specific number, **state "Not Found" and move on**. Do not stop the analysis. Generate the full report structure regardless.
-
----
-
-### Analysis Output BEGIN ###
+# Report layout shared by both Step 2 prompts
+TEN_K_REPORT_LAYOUT = """### Analysis Output BEGIN ###
 
 <div class="analysis-card">
   <div class="card-header">
@@ -117,7 +113,20 @@ You are a top-tier financial analyst AI. Your task is to deliver a professional,
   </div>
 </div>
 
-### Analysis Output END ###
+### Analysis Output END ###"""
+
+TEN_K_ANALYSIS_PROMPT = """
+You are a top-tier financial analyst AI. Your task is to deliver a professional, clear, and visually appealing analysis of the provided financial statements.
+
+**OUTPUT INSTRUCTIONS:**
+- **Structure:** Present the entire analysis using self-contained HTML cards.
+- **Styling:** Use the provided CSS classes (`analysis-card`, `card-header`, `card-body`, `kpi-grid`, `kpi-item`).
+- **Clarity:** Be concise. Use bullet points (`<li>`) for lists and `<br>` for line breaks inside paragraphs. Avoid large empty spaces.
+- **Data First:** If you cannot find a specific number, **state "Not Found" and move on**. Do not stop the analysis. Generate the full report structure regardless.
+
+---
+
+""" + TEN_K_REPORT_LAYOUT + """
 
 ---
 
@@ -125,6 +134,29 @@ You are a top-tier financial analyst AI. Your task is to deliver a professional,
 {report_text}
 """
 
+# Step 2 variant used when the statements were parsed locally (analysis/statements.py):
+# the model gets the computed line items and ratios instead of the raw statement text.
+TEN_K_METRICS_ANALYSIS_PROMPT = """
+You are a top-tier financial analyst AI. Your task is to deliver a professional, clear, and visually appealing analysis of a company's financial statements.
+
+The key line items and ratios below were extracted and computed directly from the statements. They are exact: **use these figures and ratios as given and do not recalculate them.** Where a calculation is requested in the layout, show it using these figures. Each figure is labelled with the period end dates of its columns; statements can cover different periods (e.g. a balance sheet dated at the fiscal year end next to prior-year quarter results), and a ratio is N/A where its inputs don't cover the same period, so don't fill those in. Growth rates compare the most recent period with the one before it; balance sheet changes are point-in-time differences between two balance sheet dates, not growth over a fiscal year.
+
+**OUTPUT INSTRUCTIONS:**
+- **Structure:** Present the entire analysis using self-contained HTML cards.
+- **Styling:** Use the provided CSS classes (`analysis-card`, `card-header`, `card-body`, `kpi-grid`, `kpi-item`).
+- **Clarity:** Be concise. Use bullet points (`<li>`) for lists and `<br>` for line breaks inside paragraphs. Avoid large empty spaces.
+- **Data First:** If a figure is not listed below, **state "Not Found" and move on**. Do not stop the analysis. Generate the full report structure regardless.
+
+---
+
+""" + TEN_K_REPORT_LAYOUT + """
+
+---
+
+**COMPUTED FINANCIAL METRICS:**
+{financial_metrics}
+"""
+
 # ======================================================================================
 # GENERAL PURPOSE PROMPT (For non-10K or simple analysis)
 # ======================================================================================
@@ -145,3 +177,89 @@ Use HTML formatting (`<strong>`, `<ul>`, `<li>`, `<br>`) to structure your respo
 {report_text}
 ---
 """
+
+# ======================================================================================
+# CHUNKED ANALYSIS PROMPTS (map-reduce for reports too long for a single prompt)
+# ======================================================================================
+
+CHUNK_SUMMARY_PROMPT = """
+You are a senior financial analyst reviewing one section of a longer financial report (part {chunk_number} of {chunk_count}).
+
+Extract everything from this section that matters for a financial analysis:
+- Key figures (revenue, costs, income, margins, cash flows, assets, liabilities, equity), with periods and units exactly as reported.
+- Notable changes and their stated drivers.
+- Risks, concerns, commitments or uncertainties mentioned.
+
+Be factual and compact. Use plain bullet points. Do not add an introduction or conclusion, and do not speculate about content from other sections.
+If the section contains nothing relevant, return the single phrase: "NO_RELEVANT_CONTENT".
+
+**REPORT SECTION:**
+---
+{report_text}
+---
+"""
+
+CHUNK_REDUCE_PROMPT = """
+You are a senior financial analyst. The notes below were extracted, section by section, from one complete financial report. Using only these notes, please provide a clear and concise analysis of the report.
+
+**Key areas to focus on:**
+1.  **Financial Health:** Identify key metrics like revenue, net income, and margins.
+2.  **Profitability:** Assess the company's ability to generate profit.
+3.  **Potential Risks:** Highlight any risks or concerns mentioned in the text.
+4.  **Overall Summary:** Provide a brief executive summary of the report's findings.
+
+Use HTML formatting (`<strong>`, `<ul>`, `<li>`, `<br>`) to structure your response.
+
+**SECTION NOTES:**
+---
+{section_notes}
+---
+"""
+
+# ======================================================================================
+# FOLLOW-UP QUESTION PROMPT (/ask): answers from the excerpts retrieved by
+# analysis/retrieval.py instead of the whole report
+# ======================================================================================
+
+ASK_PROMPT = """
+You are a senior financial analyst answering a follow-up question about a financial report ({filename}). You are given only the excerpts of the report most relevant to the question, each labelled with its number and the section it comes from.
+
+Answer using only these excerpts. Quote figures with their periods and units exactly as reported, and cite the excerpts you rely on as [1], [2], etc. If the excerpts do not contain the answer, say so plainly instead of guessing.
+
+Keep the answer short: a few sentences or bullet points. Use HTML formatting (`<strong>`, `<ul>`, `<li>`, `<br>`) to structure it.
+
+**QUESTION:**
+{question}
+
+**REPORT EXCERPTS:**
+---
+{excerpts}
+---
+"""
+
+# ======================================================================================
+# INCREMENTAL ANALYSIS PROMPT: update an earlier analysis of the same company from
+# the section-level changes between its filing and the new one (analysis/incremental.py)
+# ======================================================================================
+
+INCREMENTAL_ANALYSIS_PROMPT = """
+You are a senior financial analyst. Below is your earlier analysis of a company's previous financial report, followed by every change between that report and the company's new report. Sections that are not listed are unchanged, word for word.
+
+Write the updated analysis of the NEW report:
+- Keep the structure, headings and HTML formatting of the earlier analysis.
+- Revise every figure, trend, ratio and conclusion that the changes affect, and state the new reporting period.
+- Keep statements the changes do not affect, unless they refer to the old period and no longer hold.
+- Call out material new developments (new sections, risks, restatements, guidance changes) where they belong.
+
+Return only the updated analysis, not a description of the changes.
+
+**EARLIER ANALYSIS:**
+---
+{prior_analysis}
+---
+
+**CHANGES IN THE NEW REPORT ({changed_sections} changed, {added_sections} new and {removed_sections} removed sections; {unchanged_sections} unchanged):**
+---
+{changes}
+---
+"""
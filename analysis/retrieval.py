@@ -0,0 +1,183 @@
+"""
+Retrieval module for Financial Analysis Co-Pilot
+Splits an extracted report into small section-tagged chunks and indexes them
+with BM25, so a follow-up question can be answered from the few most relevant
+chunks instead of the whole document. Indexes are stored next to the
+extracted text in the extraction cache, and analyses are mapped to the
+document they were run on so /ask can find the index by analysis_id.
+"""
+
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+
+from analysis.cache import DiskCache, LRUCache, RESULT_CACHE_TTL
+from analysis.chunking import SECTION_BOUNDARY_RE, split_into_chunks
+
+# Bump when segmentation, tokenization or the stored layout changes; older indexes are rebuilt
+INDEX_VERSION = 1
+
+# Size of indexed chunks and how many are put into a follow-up prompt
+RETRIEVAL_CHUNK_TOKENS = int(os.environ.get('RETRIEVAL_CHUNK_TOKENS', 300))
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', 6))
+# Where analysis_id -> document references are kept, and for how long
+ANALYSIS_REFS_DIR = os.environ.get('ANALYSIS_REFS_DIR', os.path.join('cache', 'analyses'))
+ANALYSIS_REFS_TTL = int(os.environ.get('ANALYSIS_REFS_TTL', RESULT_CACHE_TTL))
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be by did do does for from had has have how in is it its of on or our that the their
+this to was were what when where which while who why will with
+""".split())
+
+
+def tokenize(text):
+    """Lowercased word and number terms without stopwords, with plural 's' stripped"""
+    terms = []
+    for term in TOKEN_RE.findall(text.lower()):
+        if term in STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith('s') and not term.endswith('ss') and term.isalpha():
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def _section_titles(text):
+    """(offset, title) of every section heading, in document order"""
+    titles = []
+    for match in SECTION_BOUNDARY_RE.finditer(text):
+        line_end = text.find("\n", match.start())
+        title = text[match.start():line_end if line_end != -1 else len(text)].strip()
+        titles.append((match.start(), title[:120]))
+    return titles
+
+
+class DocumentIndex:
+    """BM25 inverted index over the chunks of one document"""
+
+    def __init__(self, chunks, postings, lengths):
+        self.chunks = chunks
+        self.postings = postings
+        self.lengths = lengths
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def build(cls, text, chunk_tokens=RETRIEVAL_CHUNK_TOKENS):
+        """Segment text into chunks tagged with their section heading and index them"""
+        titles = _section_titles(text)
+        chunks, postings, lengths = [], {}, []
+        offset = 0
+        title_index = -1
+        for piece in split_into_chunks(text, chunk_tokens):
+            start = offset
+            offset += len(piece)
+            while title_index + 1 < len(titles) and titles[title_index + 1][0] <= start:
+                title_index += 1
+            terms = tokenize(piece)
+            if not terms:
+                continue
+            chunk_id = len(chunks)
+            chunks.append({'text': piece.strip(), 'offset': start,
+                           'section': titles[title_index][1] if title_index >= 0 else None})
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, []).append((chunk_id, count))
+        return cls(chunks, postings, lengths)
+
+    def search(self, query, top_k=RETRIEVAL_TOP_K):
+        """
+        Rank chunks against a query with BM25.
+
+        Returns:
+            list: up to top_k (score, chunk) pairs, best first, only chunks sharing a term with the query
+        """
+        scores = {}
+        chunk_count = len(self.chunks)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (chunk_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, count in postings:
+                length_norm = 1 - BM25_B + BM25_B * self.lengths[chunk_id] / self.average_length
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * count * (BM25_K1 + 1) / (
+                    count + BM25_K1 * length_norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in ranked]
+
+    def to_bytes(self):
+        """zlib-compressed JSON, for the extraction cache"""
+        data = {'version': INDEX_VERSION, 'chunks': self.chunks, 'postings': self.postings, 'lengths': self.lengths}
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 6)
+
+    @classmethod
+    def from_bytes(cls, raw):
+        """Load an index saved by to_bytes(); None if it is unreadable or from another INDEX_VERSION"""
+        try:
+            data = json.loads(zlib.decompress(raw).decode('utf-8'))
+        except (zlib.error, UnicodeDecodeError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return cls(data['chunks'], data['postings'], data['lengths'])
+
+
+class DocumentIndexStore:
+    """
+    Document indexes keyed like the extraction cache (and stored in it),
+    plus the analysis_id -> document references /ask resolves.
+    """
+
+    def __init__(self, extraction_cache, refs_directory=ANALYSIS_REFS_DIR, refs_ttl=ANALYSIS_REFS_TTL,
+                 memory_items=16):
+        self.extraction_cache = extraction_cache
+        self.refs = DiskCache(refs_directory, max_bytes=0, ttl_seconds=refs_ttl, suffix='.json')
+        self.memory = LRUCache(memory_items)
+
+    def build(self, extraction_key, text):
+        """Index a document's extracted text and persist the index"""
+        index = DocumentIndex.build(text)
+        self.extraction_cache.set_index(extraction_key, index.to_bytes())
+        self.memory.set(extraction_key, index)
+        return index
+
+    def load(self, extraction_key):
+        """
+        The document's index, rebuilt from the cached extracted text if it is missing.
+        None if neither is available any more.
+        """
+        index = self.memory.get(extraction_key)
+        if index is not None:
+            return index
+        raw = self.extraction_cache.get_index(extraction_key)
+        index = DocumentIndex.from_bytes(raw) if raw is not None else None
+        if index is not None:
+            self.memory.set(extraction_key, index)
+            return index
+        text = self.extraction_cache.get(extraction_key)
+        return self.build(extraction_key, text) if text else None
+
+    def remember(self, analysis_id, extraction_key, filename, analysis_type, result_key=None):
+        """Record which document an analysis was run on and, if given, the result cache key of its report"""
+        ref = {'extraction_key': extraction_key, 'filename': filename, 'analysis_type': analysis_type,
+               'result_key': result_key}
+        try:
+            self.refs.set(analysis_id, json.dumps(ref).encode('utf-8'))
+        except OSError as e:
+            print(f"⚠️ Could not record document of analysis {analysis_id}: {e}")
+
+    def lookup(self, analysis_id):
+        """The document reference of an analysis, or None"""
+        raw = self.refs.get(analysis_id)
+        try:
+            return json.loads(raw.decode('utf-8')) if raw is not None else None
+        except ValueError:
+            return None
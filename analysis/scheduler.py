@@ -0,0 +1,194 @@
+"""
+Outbound scheduler module for Financial Analysis Co-Pilot
+Decides when each model call may start: token buckets keep us under the
+requests-per-minute and tokens-per-minute quotas, a priority queue lets
+short interactive calls overtake bulk ones, and an AIMD limit on concurrent
+calls shrinks on quota and server errors and grows back on success.
+"""
+
+import os
+import threading
+import time
+
+from analysis.metrics import GEMINI_QUEUE_DEPTH, GEMINI_CONCURRENCY_LIMIT, GEMINI_QUEUE_WAIT_SECONDS, record_timing
+
+# Quotas of the Gemini project (0 disables a bucket). Defaults match the
+# paid tier 1 limits for gemini-2.5-flash.
+GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 1000))
+GEMINI_TOKENS_PER_MINUTE = int(os.environ.get('GEMINI_TOKENS_PER_MINUTE', 1000000))
+# Floor of the adaptive concurrency limit; the ceiling is GEMINI_MAX_CONCURRENCY
+GEMINI_MIN_CONCURRENCY = int(os.environ.get('GEMINI_MIN_CONCURRENCY', 1))
+# A call waiting this many seconds gains one priority level, so bulk work is never starved
+PRIORITY_AGING_SECONDS = float(os.environ.get('PRIORITY_AGING_SECONDS', 30))
+# Throttling errors within this window of a decrease count as the same congestion event
+AIMD_DECREASE_COOLDOWN = 5.0
+# Waiters re-check their place in the queue at least this often (aging can reorder it)
+QUEUE_POLL_SECONDS = 1.0
+
+# Call priorities, most urgent first
+PRIORITY_INTERACTIVE = 0  # general analyses and final report generation
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2  # 10-K statement location and chunk summaries
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_NORMAL: 'normal', PRIORITY_BULK: 'bulk'}
+
+
+class TokenBucket:
+    """
+    Refills continuously at per_minute / 60 units per second up to one minute's worth.
+    Not thread-safe on its own; OutboundScheduler serialises access.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until amount units are available (requests larger than the bucket wait for a full one)"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount, now):
+        """Spend amount units; the level may go negative (a debt later calls wait out)"""
+        self._refill(now)
+        self.level -= amount
+
+
+class OutboundScheduler:
+    """
+    Admits model calls one at a time in priority order (FIFO within a priority,
+    with aging) once a concurrency slot and enough request and token budget are free.
+
+    acquire() blocks until the call may start or its deadline passes;
+    every successful acquire() must be paired with release().
+    """
+
+    def __init__(self, max_concurrency, min_concurrency=GEMINI_MIN_CONCURRENCY,
+                 requests_per_minute=GEMINI_REQUESTS_PER_MINUTE, tokens_per_minute=GEMINI_TOKENS_PER_MINUTE,
+                 aging_seconds=PRIORITY_AGING_SECONDS, name='gemini'):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min(min_concurrency, max_concurrency))
+        self.aging_seconds = aging_seconds
+        self.limit = float(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = 0
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._stats = {'admitted': 0, 'expired': 0, 'throttled': 0, 'total_wait_seconds': 0.0,
+                       'max_wait_seconds': 0.0}
+        GEMINI_CONCURRENCY_LIMIT.set(max_concurrency, model=name)
+
+    def acquire(self, priority=PRIORITY_NORMAL, tokens=0, deadline=None):
+        """
+        Wait for the call's turn.
+
+        Args:
+            priority (int): PRIORITY_INTERACTIVE, PRIORITY_NORMAL or PRIORITY_BULK
+            tokens (int): Estimated prompt tokens, charged to the tokens-per-minute bucket
+            deadline (float): time.monotonic() value after which to give up
+
+        Returns:
+            float: Seconds waited, or None if the deadline passed first
+        """
+        start = time.monotonic()
+        with self._condition:
+            self._sequence += 1
+            entry = (priority, self._sequence, start)
+            self._waiting.append(entry)
+            GEMINI_QUEUE_DEPTH.set(len(self._waiting), model=self.name)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = QUEUE_POLL_SECONDS
+                    if self._next(now) == entry and self._in_flight < int(self.limit):
+                        wait = self._budget_delay(tokens, now)
+                        if wait == 0:
+                            self._admit(entry, tokens, now)
+                            break
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._stats['expired'] += 1
+                            return None
+                        wait = min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    GEMINI_QUEUE_DEPTH.set(len(self._waiting), model=self.name)
+                    # The next waiter may now be at the head
+                    self._condition.notify_all()
+
+        waited = time.monotonic() - start
+        GEMINI_QUEUE_WAIT_SECONDS.observe(waited, model=self.name, priority=PRIORITY_NAMES.get(priority, priority))
+        record_timing('queue', waited)
+        with self._condition:
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+        return waited
+
+    def release(self, outcome='ok', response_tokens=0):
+        """
+        Free the call's slot and adapt the concurrency limit: additive increase
+        after outcome 'ok', halve after 'throttled' (a quota or server error),
+        unchanged after any other outcome.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if self._tokens is not None and response_tokens:
+                self._tokens.take(response_tokens, now)
+            if outcome == 'throttled':
+                self._stats['throttled'] += 1
+                if now - self._last_decrease >= AIMD_DECREASE_COOLDOWN:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                    print(f"🚦 {self.name} throttling, concurrency limit lowered to {int(self.limit)}")
+            elif outcome == 'ok':
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            GEMINI_CONCURRENCY_LIMIT.set(int(self.limit), model=self.name)
+            self._condition.notify_all()
+
+    def _next(self, now):
+        """The waiter to admit next: lowest priority number after aging, then arrival order"""
+        return min(self._waiting, key=lambda entry: (entry[0] - (now - entry[2]) / self.aging_seconds, entry[1]))
+
+    def _budget_delay(self, tokens, now):
+        delays = [0.0]
+        if self._requests is not None:
+            delays.append(self._requests.delay(1, now))
+        if self._tokens is not None:
+            delays.append(self._tokens.delay(tokens, now))
+        return max(delays)
+
+    def _admit(self, entry, tokens, now):
+        self._waiting.remove(entry)
+        GEMINI_QUEUE_DEPTH.set(len(self._waiting), model=self.name)
+        if self._requests is not None:
+            self._requests.take(1, now)
+        if self._tokens is not None:
+            self._tokens.take(tokens, now)
+        self._in_flight += 1
+        self._stats['admitted'] += 1
+        self._condition.notify_all()
+
+    def stats(self):
+        """Queue depth, adaptive limit and wait time statistics"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._waiting)
+            stats['in_flight'] = self._in_flight
+            stats['concurrency_limit'] = int(self.limit)
+        stats['avg_wait_seconds'] = stats['total_wait_seconds'] / stats['admitted'] if stats['admitted'] else 0.0
+        return stats
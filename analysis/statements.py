@@ -0,0 +1,344 @@
+"""
+Structured statement module for Financial Analysis Co-Pilot
+Parses line items and period columns out of extracted statement tables into
+pandas/NumPy arrays and computes a standard ratio set locally, so the model
+receives deterministic figures instead of doing the arithmetic itself.
+"""
+
+import calendar
+import re
+
+import numpy as np
+import pandas as pd
+
+from analysis.locator import STATEMENT_HEADER_RE
+
+MAX_PERIODS = 4
+
+# Canonical line items and the labels they appear under (matched against the whole label)
+LINE_ITEM_PATTERNS = {
+    'revenue': r"(?:total )?(?:net )?(?:sales|revenues?)|total net (?:sales|revenues?)",
+    'cost_of_revenue': r"(?:total )?cost of (?:sales|revenues?|goods sold)",
+    'gross_profit': r"gross (?:profit|margin)",
+    'operating_income': r"(?:total )?operating income(?: \(loss\))?|income from operations|operating profit",
+    'net_income': r"net (?:income|earnings)(?: \(loss\))?",
+    'operating_cash_flow': r"(?:net )?cash (?:generated by|provided by|from|provided by \(used in\)) operating activities",
+    'total_assets': r"total assets",
+    'total_liabilities': r"total liabilities",
+    'total_equity': r"total (?:shareholders'|stockholders'|shareholders|stockholders) equity|total equity",
+    'current_assets': r"total current assets",
+    'current_liabilities': r"total current liabilities",
+    'inventories': r"inventor(?:y|ies)(?:, net)?",
+    'cash': r"cash and cash equivalents",
+}
+LINE_ITEM_RES = {item: re.compile(pattern) for item, pattern in LINE_ITEM_PATTERNS.items()}
+
+# Items the ratio prompt can't do without; otherwise fall back to the full text
+CORE_ITEMS = ('revenue', 'net_income', 'total_assets', 'total_equity')
+
+# Percentages ("(3)%") are change columns in MD&A tables, never period values
+NUMBER_RE = re.compile(r"^(\()?-?\$?(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?(\))?$")
+FOOTNOTE_RE = re.compile(r"^\(\d\)$")
+NIL_TOKENS = {'—', '–', '-'}
+CURRENCY_TOKENS = {'$', '!'}  # pdfplumber sometimes decodes the dollar glyph as '!'
+YEAR_RE = re.compile(r"^(?:19|20)\d{2}$")
+SCALE_RE = re.compile(r"\bin (millions|thousands|billions)\b", re.IGNORECASE)
+SCALES = {'thousands': 1e3, 'millions': 1e6, 'billions': 1e9}
+
+# Column headers such as "December 30, September 30," (years on the next line) or
+# "September 30, 2023 September 24, 2022"
+PERIOD_DATE_RE = re.compile(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{1,2}),?(?:\s+((?:19|20)\d{2}))?",
+                            re.IGNORECASE)
+MONTH_NUMBERS = {calendar.month_abbr[number].lower(): number for number in range(1, 13)}
+
+# Point-in-time items: their period-over-period change is a difference between two
+# balance sheet dates, not growth over a fiscal period
+BALANCE_SHEET_ITEMS = {'total_assets', 'total_liabilities', 'total_equity', 'current_assets',
+                       'current_liabilities', 'inventories', 'cash'}
+
+
+def parse_number(token):
+    """Parse a statement figure: '(1,234)' -> -1234.0, '$5.2' -> 5.2. Returns None if not a number."""
+    token = token.strip().lstrip('$')
+    if token in NIL_TOKENS:
+        return 0.0
+    if FOOTNOTE_RE.match(token):
+        return None
+    match = NUMBER_RE.match(token)
+    if not match:
+        return None
+    value = float(match.group(2).replace(',', '') + (match.group(3) or ''))
+    negative = bool(match.group(1) and match.group(4)) or token.startswith('-')
+    return -value if negative else value
+
+
+def _normalize_label(label):
+    label = label.lower().replace('’', "'").strip()
+    label = FOOTNOTE_RE.sub('', label)
+    label = re.sub(r"\s*\(\d\)", "", label)
+    return re.sub(r"\s+", " ", label).strip(' :')
+
+
+def _parse_period_dates(line):
+    """'December 30, September 30,' -> [(12, 30, None), (9, 30, None)]; None unless the line holds only dates"""
+    line = line.replace('|', ' ').strip()
+    matches = list(PERIOD_DATE_RE.finditer(line))
+    if not matches or PERIOD_DATE_RE.sub('', line).strip(' ,'):
+        return None
+    return [(MONTH_NUMBERS[match.group(1).lower()], int(match.group(2)), match.group(3)) for match in matches]
+
+
+def _period(month, day, year):
+    """A (label, end date) pair for a statement column"""
+    return f"{calendar.month_name[month]} {day}, {year}", f"{year}-{month:02d}-{day:02d}"
+
+
+def parse_statement_rows(text):
+    """
+    Extract rows from statement text.
+    Works on pdfplumber text lines, ' | '-separated table rows and padded
+    spreadsheet renderings alike: a row is a label followed by numeric columns.
+
+    Each row is a dict with its label, values and scale, 'in_statement' (the row
+    follows a statement header and its scale caption) and 'periods' (the
+    (label, end date) pairs of its statement's columns, or None if none were
+    seen). Each statement keeps its own periods: a 10-Q balance sheet compares
+    with the fiscal year end while the income statement compares with the
+    prior year's quarter.
+
+    Returns:
+        list of rows
+    """
+    rows = []
+    scale = 1.0
+    in_header = in_statement = False
+    periods = pending_dates = None
+    for line in text.splitlines():
+        if len(line) < 200 and STATEMENT_HEADER_RE.search(line):
+            # A new statement: wait for its scale caption and period columns
+            in_header, in_statement = True, False
+            periods = pending_dates = None
+        scale_match = SCALE_RE.search(line)
+        if scale_match and len(line) < 200:
+            scale = SCALES[scale_match.group(1).lower()]
+            in_statement = in_header
+
+        dates = _parse_period_dates(line) if len(line) < 200 else None
+        if dates:
+            if all(year for _, _, year in dates):
+                periods = [_period(month, day, int(year)) for month, day, year in dates[:MAX_PERIODS]]
+            else:
+                pending_dates = dates
+            continue
+
+        tokens = [token for token in line.replace('|', ' ').split() if token not in CURRENCY_TOKENS]
+        if not tokens:
+            continue
+        if len(tokens) >= 2 and all(YEAR_RE.match(token) for token in tokens):
+            years = tokens[:MAX_PERIODS]
+            if pending_dates and len(pending_dates) >= len(years):
+                periods = [_period(month, day, int(year)) for (month, day, _), year in zip(pending_dates, years)]
+            else:
+                periods = [(year, year) for year in years]
+            pending_dates = None
+            continue
+
+        values = []
+        while tokens:
+            value = parse_number(tokens[-1])
+            if value is None:
+                break
+            values.insert(0, value)
+            tokens.pop()
+        label = _normalize_label(" ".join(tokens))
+        if values and re.search(r"[a-z]", label):
+            rows.append({'label': label, 'values': values[:MAX_PERIODS], 'scale': scale,
+                         'in_statement': in_statement, 'periods': periods})
+    return rows
+
+
+def build_line_items(text):
+    """
+    Map statement rows onto canonical line items.
+
+    Returns:
+        tuple: (DataFrame of absolute amounts indexed by line item with one
+        column per period position, the scale the statements were reported in,
+        dict of line item -> (label, end date) pairs of its columns)
+    """
+    rows = parse_statement_rows(text)
+    if not rows:
+        return None, 1.0, {}
+
+    # Rows under a statement header and scale caption win over mentions elsewhere (e.g. MD&A tables)
+    statement_rows = [row for row in rows if row['in_statement']]
+    rows = statement_rows + [row for row in rows if not row['in_statement']]
+
+    # The most common number of value columns is the number of periods
+    counts = pd.Series([len(row['values']) for row in statement_rows or rows])
+    period_count = int(counts.mode().iloc[0])
+    columns = ['current', 'prior', 'prior_2', 'prior_3'][:period_count]
+    # Without column headers the periods are unknown; their end dates never match anything dated
+    unlabelled = [(column, None) for column in columns]
+
+    found = {}
+    item_periods = {}
+    scale = 1.0
+    for row in rows:
+        values, row_scale = row['values'], row['scale']
+        periods = row['periods'] or unlabelled
+        # A row with another number of columns than its statement has is not a clean period row
+        if len(values) != (len(row['periods']) if row['periods'] else period_count):
+            continue
+        for item, pattern in LINE_ITEM_RES.items():
+            if item not in found and pattern.fullmatch(row['label']):
+                # Normalize "in millions" etc. to absolute amounts
+                padded = ([value * row_scale for value in values] + [np.nan] * period_count)[:period_count]
+                found[item] = padded
+                item_periods[item] = periods[:period_count]
+                scale = row_scale if item == 'revenue' else scale
+                break
+    if not found:
+        return None, 1.0, {}
+
+    frame = pd.DataFrame.from_dict(found, orient='index', columns=columns, dtype=float)
+    return frame, scale, item_periods
+
+
+def _ratio(numerator, denominator):
+    """Element-wise division that yields NaN instead of inf for zero/missing denominators"""
+    result = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=result, where=np.isfinite(denominator) & (denominator != 0))
+    return result
+
+
+def compute_ratios(line_items, item_periods):
+    """
+    Compute the standard ratio set for every period at once.
+
+    A ratio is only computed for columns where all of its inputs end on the same
+    date; e.g. a 10-Q's prior-year quarter has no matching balance sheet, so its
+    return on assets is N/A.
+
+    Returns:
+        tuple: (DataFrame indexed by ratio name with one column per period
+        position, dict of ratio name -> period labels of its columns)
+    """
+    columns = list(line_items.columns)
+    missing = np.full(len(columns), np.nan)
+
+    def item(name):
+        return line_items.loc[name].to_numpy(dtype=float) if name in line_items.index else missing
+
+    def labels(name):
+        return [label for label, _ in item_periods.get(name, [])]
+
+    def aligned(*names):
+        """Mask of the columns where every available input ends on the same date"""
+        ends = [[end for _, end in item_periods[name]] for name in names if name in item_periods]
+        return np.array([len({item_ends[index] for item_ends in ends}) <= 1 for index in range(len(columns))])
+
+    def ratio(numerator, denominator, *names):
+        result = _ratio(numerator, denominator)
+        result[~aligned(*names)] = np.nan
+        return result
+
+    revenue = item('revenue')
+    gross_profit = item('gross_profit')
+    gross_inputs = ('gross_profit', 'revenue')
+    if np.isnan(gross_profit).all():
+        gross_profit = revenue - item('cost_of_revenue')
+        gross_inputs = ('revenue', 'cost_of_revenue')
+    net_income = item('net_income')
+    total_equity = item('total_equity')
+    current_liabilities = item('current_liabilities')
+
+    # name -> (values, inputs); the first input's periods label the ratio
+    ratios = {
+        'gross_margin_pct': (100 * ratio(gross_profit, revenue, *gross_inputs), gross_inputs),
+        'operating_margin_pct': (100 * ratio(item('operating_income'), revenue, 'operating_income', 'revenue'),
+                                 ('operating_income', 'revenue')),
+        'net_margin_pct': (100 * ratio(net_income, revenue, 'net_income', 'revenue'), ('net_income', 'revenue')),
+        'return_on_assets_pct': (100 * ratio(net_income, item('total_assets'), 'net_income', 'total_assets'),
+                                 ('net_income', 'total_assets')),
+        'return_on_equity_pct': (100 * ratio(net_income, total_equity, 'net_income', 'total_equity'),
+                                 ('net_income', 'total_equity')),
+        'debt_to_equity': (ratio(item('total_liabilities'), total_equity, 'total_liabilities', 'total_equity'),
+                           ('total_liabilities', 'total_equity')),
+        'current_ratio': (ratio(item('current_assets'), current_liabilities, 'current_assets', 'current_liabilities'),
+                          ('current_assets', 'current_liabilities')),
+        'quick_ratio': (ratio(item('current_assets') - np.nan_to_num(item('inventories')), current_liabilities,
+                              'current_assets', 'inventories', 'current_liabilities'),
+                        ('current_assets', 'current_liabilities')),
+        'operating_cash_flow_to_net_income': (ratio(item('operating_cash_flow'), net_income,
+                                                    'operating_cash_flow', 'net_income'),
+                                              ('operating_cash_flow', 'net_income')),
+    }
+    frame = pd.DataFrame.from_dict({name: values for name, (values, _) in ratios.items()},
+                                   orient='index', columns=columns)
+    ratio_periods = {name: labels(inputs[0]) for name, (_, inputs) in ratios.items()}
+
+    # Period-over-period change of every line item, newest column vs the next one.
+    # Balance sheet items compare two dates, so they are changes rather than growth.
+    if len(columns) >= 2:
+        values = line_items.to_numpy(dtype=float)
+        growth = 100 * _ratio(values[:, 0] - values[:, 1], np.abs(values[:, 1]))
+        names = [f"{name}_change_pct" if name in BALANCE_SHEET_ITEMS else f"{name}_growth_pct"
+                 for name in line_items.index]
+        frame = pd.concat([frame, pd.DataFrame({columns[0]: growth}, index=names)])
+        for name, growth_name in zip(line_items.index, names):
+            ratio_periods[growth_name] = labels(name)[:2]
+    return frame, ratio_periods
+
+
+def build_financial_summary(text):
+    """
+    Parse statements and compute ratios for a report excerpt.
+
+    Returns:
+        dict with scale, line_items, item_periods, ratios and ratio_periods, or
+        None when the core line items (revenue, net income, total assets, total
+        equity) are missing
+    """
+    line_items, scale, item_periods = build_line_items(text)
+    if line_items is None or not all(name in line_items.index for name in CORE_ITEMS):
+        return None
+    ratios, ratio_periods = compute_ratios(line_items, item_periods)
+    return {
+        'scale': scale,
+        'line_items': line_items,
+        'item_periods': item_periods,
+        'ratios': ratios,
+        'ratio_periods': ratio_periods,
+    }
+
+
+def _format_value(value, decimals=0):
+    if value is None or not np.isfinite(value):
+        return "N/A"
+    return f"{value:,.{decimals}f}"
+
+
+def format_financial_summary(summary):
+    """Render a financial summary as a compact text block for a prompt"""
+    scale_name = {1e3: 'thousands', 1e6: 'millions', 1e9: 'billions'}.get(summary['scale'], 'units as reported')
+    lines = [f"KEY LINE ITEMS (in {scale_name}; each item lists the period ends of its columns)"]
+    for name, row in summary['line_items'].iterrows():
+        values = row.to_numpy(dtype=float) / summary['scale']
+        periods = [label for label, _ in summary['item_periods'].get(name, [])]
+        lines.append(f"- {name} ({' | '.join(periods)}): " + " | ".join(_format_value(value) for value in values))
+
+    lines.append("")
+    lines.append("COMPUTED RATIOS (N/A where the inputs cover different periods)")
+    for name, row in summary['ratios'].iterrows():
+        values = row.to_numpy(dtype=float)
+        if np.isnan(values).all():
+            continue
+        periods = summary['ratio_periods'].get(name, [])
+        if name.endswith('_growth_pct') or name.endswith('_change_pct'):
+            # Defined for the newest period only, against the one before it
+            kind = "point-in-time difference" if name.endswith('_change_pct') else "growth"
+            lines.append(f"- {name} ({kind}, {' vs '.join(periods)}): {_format_value(values[0], 2)}")
+            continue
+        lines.append(f"- {name} ({' | '.join(periods)}): " + " | ".join(_format_value(value, 2) for value in values))
+    return "\n".join(lines)
@@ -0,0 +1,106 @@
+"""
+Upload store module for Financial Analysis Co-Pilot
+Holds uploaded files between the request and the background job that reads
+them. Small and medium uploads stay in memory and are parsed straight from
+their bytes; large ones spill to a file. A background reaper expires
+anything a job never collected.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+# Uploads up to this size are kept in memory; larger ones spill to UPLOAD_SPILL_DIR
+UPLOAD_MEMORY_MAX_BYTES = int(os.environ.get('UPLOAD_MEMORY_MAX_BYTES', 4 * 1024 * 1024))
+UPLOAD_SPILL_DIR = os.environ.get('UPLOAD_SPILL_DIR', 'uploads')
+# Uploads not collected by a job within this many seconds are removed by the reaper
+UPLOAD_MAX_AGE = int(os.environ.get('UPLOAD_MAX_AGE', 3600))
+UPLOAD_REAP_INTERVAL = int(os.environ.get('UPLOAD_REAP_INTERVAL', 300))
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadStore:
+    """
+    In-memory store for pending uploads with file spill for large ones.
+    save() returns a small JSON-serialisable handle for the job payload;
+    load() turns it back into bytes or a file path for read_report.
+    """
+
+    def __init__(self, spill_dir=UPLOAD_SPILL_DIR, memory_max_bytes=UPLOAD_MEMORY_MAX_BYTES,
+                 max_age=UPLOAD_MAX_AGE):
+        self.spill_dir = spill_dir
+        self.memory_max_bytes = memory_max_bytes
+        self.max_age = max_age
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def save(self, upload_id, stream, filename, size):
+        """Keep an upload stream's contents for a job; returns the upload handle"""
+        stream.seek(0)
+        if size <= self.memory_max_bytes:
+            with self._lock:
+                self._memory[upload_id] = (stream.read(), time.time())
+            return {'id': upload_id, 'filepath': None, 'size': size}
+
+        filepath = os.path.join(self.spill_dir, f"{upload_id}_{filename}")
+        with open(filepath, 'wb') as file:
+            shutil.copyfileobj(stream, file, COPY_CHUNK_BYTES)
+        return {'id': upload_id, 'filepath': filepath, 'size': size}
+
+    def load(self, upload):
+        """The upload's bytes or spill file path, or None if it is gone (e.g. after a restart)"""
+        if upload['filepath']:
+            return upload['filepath'] if os.path.exists(upload['filepath']) else None
+        with self._lock:
+            entry = self._memory.get(upload['id'])
+        return entry[0] if entry else None
+
+    def discard(self, upload):
+        """Release an upload once its job has read it"""
+        with self._lock:
+            self._memory.pop(upload['id'], None)
+        if upload['filepath'] and os.path.exists(upload['filepath']):
+            os.remove(upload['filepath'])
+
+    def pending(self):
+        """Number of uploads held in memory and their total size"""
+        with self._lock:
+            return len(self._memory), sum(len(data) for data, _ in self._memory.values())
+
+    def reap(self):
+        """Remove uploads older than max_age from memory and the spill directory; returns how many"""
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            expired = [upload_id for upload_id, (_, stored_at) in self._memory.items() if stored_at < cutoff]
+            for upload_id in expired:
+                del self._memory[upload_id]
+        removed = len(expired)
+
+        try:
+            for entry in os.scandir(self.spill_dir):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        except OSError as e:
+            print(f"⚠️ Error reaping old uploads: {e}")
+
+        if removed:
+            print(f"🧹 Removed {removed} expired uploads")
+        return removed
+
+    def start_reaper(self, interval=UPLOAD_REAP_INTERVAL):
+        """Run reap() every interval seconds on a daemon thread"""
+        if self._reaper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reap()
+
+        self._reaper = threading.Thread(target=run, name='upload-reaper', daemon=True)
+        self._reaper.start()
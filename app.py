@@ -8,34 +8,67 @@ Purpose: University project - Web-based financial statement analysis
 """
 
 import os
+import re
 import json
 import uuid
 import time
+import threading
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import (Flask, Response, g, render_template, request, jsonify, make_response, send_from_directory,
+                   stream_with_context)
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
-import signal
 
 # Import our existing analysis modules
-from analysis.config import gemini_model
-from analysis.prompts import FINANCIAL_ANALYSIS_PROMPT, TEN_K_ANALYSIS_PROMPT, LOCATE_FINANCIALS_PROMPT
+from analysis.config import gemini_client, model_registry, MODEL_NAME, MODEL_BACKEND
+from analysis.prompts import PROMPT_VERSION
+from analysis import file_reader
 from analysis.file_reader import read_report
+from analysis.cache import ResultCache, stream_digest
+from analysis.jobs import JobManager, QueueFullError
+from analysis.uploads import UploadStore
+from analysis.pipeline import run_analysis, run_incremental_analysis, answer_followup_question
+from analysis.metrics import (REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, REQUEST_SECONDS, UPLOAD_SAVE_SECONDS,
+                              ANALYSIS_SECONDS, COALESCED_UPLOADS, collect_timings, record_timing, server_timing_header)
 
 app = Flask(__name__)
 
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 
+# Seconds between keepalive comments on idle Server-Sent Events streams
+SSE_KEEPALIVE_SECONDS = 15
+# Each open event stream holds a server thread for a whole analysis. Beyond this many,
+# clients are sent to poll /jobs/<id> instead; keep it well below the server's thread count
+# (GUNICORN_THREADS in the Dockerfile) so uploads and /health are still served.
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 8))
+
+# Create the model client and import the file format libraries in a background
+# thread at startup, so the first upload doesn't pay for them. /health never waits on it.
+STARTUP_WARMUP = os.environ.get('STARTUP_WARMUP', 'true').lower() == 'true'
+
+# Follow-up questions (/ask): longest question accepted, most excerpts a caller may request
+MAX_QUESTION_CHARS = 1000
+MAX_ASK_TOP_K = 20
+ANALYSIS_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
 # Supported file extensions
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx', 'xlsx', 'xls', 'csv'}
 
 # Create directories if they don't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs('analysis', exist_ok=True)
 
+# Finished analyses keyed by file content + analysis type + prompt/model version
+result_cache = ResultCache()
+
+# Uploads waiting for their analysis job: kept in memory, large ones spilled to
+# disk. Uploads no job collected are removed by a background reaper.
+upload_store = UploadStore()
+
+# Free slots for open /jobs/<id>/events streams
+sse_slots = threading.BoundedSemaphore(SSE_MAX_SUBSCRIBERS)
+
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension"""
     return '.' in filename and \
@@ -45,36 +78,37 @@ def generate_analysis_id():
     """Generate a unique analysis ID"""
     return str(uuid.uuid4())[:8]
 
-def clean_old_files():
-    """Clean up old uploaded files (older than 1 hour)"""
-    try:
-        upload_dir = app.config['UPLOAD_FOLDER']
-        current_time = datetime.now().timestamp()
-        
-        for filename in os.listdir(upload_dir):
-            file_path = os.path.join(upload_dir, filename)
-            if os.path.isfile(file_path):
-                file_time = os.path.getmtime(file_path)
-                # Delete files older than 1 hour (3600 seconds)
-                if current_time - file_time > 3600:
-                    os.remove(file_path)
-    except Exception as e:
-        print(f"Error cleaning old files: {e}")
-
 @app.route('/')
 def index():
     """Main page with file upload interface"""
     return render_template('index.html')
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    """Record every request in the request latency histogram"""
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=request.endpoint or 'unmatched',
+                                method=request.method, status=response.status_code)
+    return response
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload and return analysis results"""
+    """Handle file upload and queue an analysis job, reporting stage timings in a Server-Timing header"""
+    with collect_timings() as timings:
+        response = make_response(handle_upload())
+    timings['total'] = time.perf_counter() - g.request_start
+    response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+def handle_upload():
+    """Validate the upload, answer from the result cache or queue an analysis job"""
     start_time = time.time()
     
     try:
-        # Clean old files periodically
-        clean_old_files()
-        
         # Check if file was uploaded
         if 'file' not in request.files:
             return jsonify({
@@ -101,57 +135,108 @@ def upload_file():
         # Get analysis type
         analysis_type = request.form.get('analysisType', 'general')
         
+        # An earlier analysis of the same company's previous filing, to update instead of starting over
+        prior_analysis_id = request.form.get('priorAnalysisId', '').strip()
+        prior = None
+        if prior_analysis_id:
+            prior = (file_reader.get_index_store().lookup(prior_analysis_id)
+                     if ANALYSIS_ID_RE.match(prior_analysis_id) else None)
+            if prior is None or not prior.get('result_key'):
+                return jsonify({
+                    'success': False,
+                    'error': 'Unknown or expired prior analysis ID. Please analyse the previous filing again.'
+                }), 404
+            if prior['analysis_type'] != analysis_type:
+                return jsonify({
+                    'success': False,
+                    'error': f"The prior analysis is a {prior['analysis_type']} analysis; "
+                             f"choose the same analysis type to update it."
+                }), 400
+        
         # Generate unique filename
         analysis_id = generate_analysis_id()
         original_filename = secure_filename(file.filename)
         file_extension = original_filename.rsplit('.', 1)[1].lower()
-        filename = f"{analysis_id}_{original_filename}"
-        
-        # Save file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        print(f"[{analysis_id}] File saved: {original_filename}")
-        
-        # Read file content
-        file_content = read_report(filepath)
         
-        if file_content is None or not file_content.strip():
-            os.remove(filepath)
+        # Serve repeat uploads of the same document from the result cache
+        stage_start = time.perf_counter()
+        file_digest, file_size = stream_digest(file.stream)
+        document_key = file_reader.extraction_key(file_digest, '.' + file_extension)
+        if prior is not None and prior['extraction_key'] == document_key:
+            # Same document as the prior analysis: nothing to update
+            prior = None
+        # An update depends on the analysis it started from, so it is cached separately
+        cache_variant = analysis_type if prior is None else f"{analysis_type}+update:{prior['result_key']}"
+        # Results depend on the extracted text too, so a reader change invalidates them
+        cache_key = ResultCache.make_key(file_digest, cache_variant,
+                                         PROMPT_VERSION, MODEL_NAME, file_reader.READER_VERSION)
+        record_timing('hash', time.perf_counter() - stage_start)
+        stage_start = time.perf_counter()
+        cached = result_cache.get(cache_key)
+        record_timing('cache', time.perf_counter() - stage_start)
+        if cached is not None:
+            processing_time = time.time() - start_time
+            print(f"[{analysis_id}] Result cache hit for {original_filename} ({processing_time:.3f}s)")
+            file_reader.get_index_store().remember(analysis_id, document_key, original_filename, analysis_type,
+                                                   cache_key)
             return jsonify({
-                'success': False,
-                'error': 'Unable to read the uploaded file or the file is empty. Please check the file format.'
-            }), 400
+                'success': True,
+                'data': {
+                    'analysis_id': analysis_id,
+                    'filename': original_filename,
+                    'file_type': file_extension.upper(),
+                    'content_length': cached['content_length'],
+                    'processing_time': round(processing_time, 2),
+                    'analysis_result': cached['analysis_result'],
+                    'timestamp': datetime.now().isoformat(),
+                    'cached': True
+                }
+            })
         
-        print(f"[{analysis_id}] Read {len(file_content)} characters from file.")
-
-        # Perform analysis with raw content
-        analysis_result = analyze_financial_report(file_content, analysis_id, analysis_type)
+        # Hand the upload to the background job, which parses it and discards it when done
+        with UPLOAD_SAVE_SECONDS.time(stage='save'):
+            upload = upload_store.save(analysis_id, file.stream, original_filename, file_size)
         
-        # Clean up the uploaded file after analysis
-        os.remove(filepath)
+        print(f"[{analysis_id}] File stored {'on disk' if upload['filepath'] else 'in memory'}: "
+              f"{original_filename} ({file_size} bytes)")
         
-        if analysis_result is None:
+        stage_start = time.perf_counter()
+        try:
+            # Identical uploads arriving while one is being analysed share its job
+            job, joined = job_manager.submit_or_join({
+                'analysis_id': analysis_id,
+                'upload': upload,
+                'filename': original_filename,
+                'file_type': file_extension.upper(),
+                'analysis_type': analysis_type,
+                'cache_key': cache_key,
+                'document_key': document_key,
+                'prior': prior and {'analysis_id': prior_analysis_id, 'extraction_key': prior['extraction_key'],
+                                    'result_key': prior['result_key']},
+                'submitted_at': start_time
+            })
+        except QueueFullError:
+            upload_store.discard(upload)
             return jsonify({
                 'success': False,
-                'error': 'Analysis failed. This might be due to API rate limits or quota exceeded. Please try again later.'
-            }), 500
+                'error': 'The server is busy with other analyses. Please try again in a few minutes.'
+            }), 503
         
-        processing_time = time.time() - start_time
-        print(f"[{analysis_id}] Total processing time: {processing_time:.2f}s")
+        record_timing('enqueue', time.perf_counter() - stage_start)
+        if joined:
+            upload_store.discard(upload)
+            COALESCED_UPLOADS.inc(analysis_type=analysis_type)
+            print(f"[{analysis_id}] Joined in-flight job {job['id']} analysing the same document")
+        else:
+            print(f"[{analysis_id}] Queued as job {job['id']}")
         
         return jsonify({
             'success': True,
-            'data': {
-                'analysis_id': analysis_id,
-                'filename': original_filename,
-                'file_type': file_extension.upper(),
-                'content_length': len(file_content),
-                'processing_time': round(processing_time, 2),
-                'analysis_result': analysis_result,
-                'timestamp': datetime.now().isoformat()
-            }
-        })
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': f"/jobs/{job['id']}",
+            'coalesced': joined
+        }), 202
         
     except RequestEntityTooLarge:
         return jsonify({
@@ -166,119 +251,267 @@ def upload_file():
             'error': f'An unexpected error occurred: {str(e)}'
         }), 500
 
-def _call_gemini_api(prompt, analysis_id, timeout_seconds=180): # Increased timeout for long docs
+def process_analysis_job(job_id, payload, report_stage, report_chunk):
     """
-    A helper function to call the Gemini API with a given prompt and timeout.
+    Background job handler: read the stored upload, run the analysis and cache the result.
+    Returns a (data, error) tuple as expected by JobManager. Stage timings are
+    added to the result and served as Server-Timing by /jobs/<job_id>.
     """
-    if gemini_model is None:
-        print(f"[{analysis_id}] Gemini model not initialized")
-        return None, "Gemini model not initialized. Check API key."
-
-    print(f"[{analysis_id}] Calling Gemini API... (prompt length: {len(prompt)} chars)")
-    start_time = time.time()
+    with collect_timings() as timings:
+        data, error = run_analysis_job(payload, report_stage, report_chunk)
+    ANALYSIS_SECONDS.observe(time.time() - payload['submitted_at'], analysis_type=payload['analysis_type'],
+                             outcome='ok' if error is None else 'error')
+    if data is not None:
+        data['timings'] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    return data, error
+
+def run_analysis_job(payload, report_stage, report_chunk):
+    """Read the stored upload, run the analysis and cache the result; returns (data, error)"""
+    analysis_id = payload['analysis_id']
+    # Jobs queued before uploads were kept in memory carry only a file path
+    upload = payload.get('upload') or {'id': analysis_id, 'filepath': payload['filepath']}
+    
+    try:
+        report_stage('reading')
+        source = upload_store.load(upload)
+        if source is None:
+            # In-memory uploads don't survive a restart
+            return None, 'The uploaded file is no longer available. Please upload it again.'
+        file_content = read_report(source, filename=payload['filename'])
+        
+        if file_content is None or not file_content.strip():
+            return None, 'Unable to read the uploaded file or the file is empty. Please check the file format.'
+        
+        print(f"[{analysis_id}] Read {len(file_content)} characters from file.")
+        
+        prior = payload.get('prior')
+        prior_text = prior_result = None
+        if prior:
+            prior_text = file_reader.get_extraction_cache().get(prior['extraction_key'])
+            prior_result = result_cache.get(prior['result_key'])
+            if prior_text is None or prior_result is None:
+                print(f"[{analysis_id}] Prior analysis {prior['analysis_id']} has expired, running a full analysis.")
+        
+        if prior_text is not None and prior_result is not None:
+            print(f"[{analysis_id}] Updating prior analysis {prior['analysis_id']}")
+            analysis_result, analysis_error = run_incremental_analysis(
+                file_content, prior_text, prior_result['analysis_result'], analysis_id, payload['analysis_type'],
+                report_stage=report_stage, on_chunk=report_chunk)
+        else:
+            analysis_result, analysis_error = run_analysis(file_content, analysis_id, payload['analysis_type'],
+                                                           report_stage=report_stage, on_chunk=report_chunk)
+        if analysis_error is not None:
+            # Errors are reported to the client but never cached
+            return None, analysis_error
+        if analysis_result is None:
+            return None, 'Analysis failed. This might be due to API rate limits or quota exceeded. Please try again later.'
+        
+        result_cache.set(payload['cache_key'], {
+            'analysis_result': analysis_result,
+            'content_length': len(file_content)
+        })
+        if payload.get('document_key'):
+            # Lets /ask find this document's retrieval index by analysis_id
+            file_reader.get_index_store().remember(analysis_id, payload['document_key'], payload['filename'],
+                                                   payload['analysis_type'], payload['cache_key'])
+        
+        processing_time = time.time() - payload['submitted_at']
+        print(f"[{analysis_id}] Total processing time: {processing_time:.2f}s")
+        
+        return {
+            'analysis_id': analysis_id,
+            'filename': payload['filename'],
+            'file_type': payload['file_type'],
+            'content_length': len(file_content),
+            'processing_time': round(processing_time, 2),
+            'analysis_result': analysis_result,
+            'timestamp': datetime.now().isoformat(),
+            'cached': False
+        }, None
+    finally:
+        # Release the upload after analysis
+        upload_store.discard(upload)
+
+
+@app.route('/ask', methods=['POST'])
+def ask_question():
+    """Answer a follow-up question about an analysed document, reporting stage timings in a Server-Timing header"""
+    with collect_timings() as timings:
+        response = make_response(handle_question())
+    timings['total'] = time.perf_counter() - g.request_start
+    response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+def handle_question():
+    """Validate the question, find the analysis' document index and answer from its most relevant excerpts"""
+    params = request.get_json(silent=True) or request.form
+    analysis_id = str(params.get('analysis_id', '')).strip()
+    question = str(params.get('question', '')).strip()
+    
+    if not question:
+        return jsonify({
+            'success': False,
+            'error': 'Please enter a question.'
+        }), 400
+    if len(question) > MAX_QUESTION_CHARS:
+        return jsonify({
+            'success': False,
+            'error': f'Questions are limited to {MAX_QUESTION_CHARS} characters.'
+        }), 400
+    try:
+        top_k = min(max(int(params.get('top_k') or 0), 0), MAX_ASK_TOP_K) or None
+    except (TypeError, ValueError):
+        top_k = None
+    
+    index_store = file_reader.get_index_store()
+    document = index_store.lookup(analysis_id) if ANALYSIS_ID_RE.match(analysis_id) else None
+    if document is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown or expired analysis ID. Please upload the document again.'
+        }), 404
+    
+    stage_start = time.perf_counter()
+    index = index_store.load(document['extraction_key'])
+    record_timing('index', time.perf_counter() - stage_start)
+    if index is None:
+        return jsonify({
+            'success': False,
+            'error': 'The document of this analysis is no longer available. Please upload it again.'
+        }), 404
+    
+    answer, error = answer_followup_question(index, question, analysis_id, document['filename'],
+                                             document['analysis_type'], top_k)
+    if error is not None:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 503
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'analysis_id': analysis_id,
+            'question': question,
+            'answer': answer['answer'],
+            'sources': answer['sources'],
+            'timestamp': datetime.now().isoformat()
+        }
+    })
 
-    generation_config = {
-        'temperature': 0.3,
-        'top_p': 0.9,
-        'top_k': 20,
-        'max_output_tokens': 8000,
-    }
 
-    def timeout_handler(signum, frame):
-        raise TimeoutError(f"API call timed out after {timeout_seconds} seconds")
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report status, per-stage progress and, once finished, the result of an analysis job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job ID.'
+        }), 404
+    
+    response = jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'data': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    })
+    if job['result'] and job['result'].get('timings'):
+        response.headers['Server-Timing'] = server_timing_header(job['result']['timings'])
+    return response
 
-    signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(timeout_seconds)
 
-    try:
-        response = gemini_model.generate_content(
-            prompt,
-            generation_config=generation_config
-        )
-        signal.alarm(0)  # Cancel the alarm
-        api_time = time.time() - start_time
-        print(f"[{analysis_id}] API response time: {api_time:.2f}s")
-
-        if response.text:
-            return response.text, None
-        else:
-            error_message = "API returned an empty response. The model may be unable to process the request."
-            print(f"[{analysis_id}] {error_message}")
-            return None, error_message
-
-    except TimeoutError as e:
-        signal.alarm(0)
-        print(f"[{analysis_id}] {e}")
-        return None, str(e)
-    except Exception as api_error:
-        signal.alarm(0)
-        print(f"[{analysis_id}] API error: {api_error}")
-        error_str = str(api_error)
-        if "quota" in error_str.lower():
-            return None, "Analysis temporarily unavailable due to API quota limits."
-        return None, f"API error: {error_str[:150]}"
-
-
-def analyze_financial_report(report_text, analysis_id, analysis_type='general'):
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
     """
-    Analyze financial report using a two-step process for 10-K reports.
+    Server-Sent Events stream of a job: stage changes, generated text chunks as
+    the model produces them, and a final done/error event.
     """
-    try:
-        if analysis_type == '10k':
-            # --- STEP 1: LOCATE AND EXTRACT FINANCIAL STATEMENTS ---
-            # We now pass the ENTIRE document text to the AI, trusting it to find the statements.
-            print(f"[{analysis_id}] 10-K Analysis Step 1: Locating financials in the full document...")
-            locate_prompt = LOCATE_FINANCIALS_PROMPT.format(report_text=report_text)
-            # Use a longer timeout for the location step as it now processes the full document
-            extracted_text, error = _call_gemini_api(locate_prompt, analysis_id, timeout_seconds=120)
-
-            if error:
-                return f"Error during financial statement location (Step 1): {error}"
-
-            # --- DIAGNOSTIC LOGGING ---
-            print("\n" + "="*80)
-            print(f"[{analysis_id}] [DIAGNOSTIC LOG] Start of Extracted Text from Step 1:")
-            print("-" * 80)
-            print(extracted_text[:3000] if extracted_text else "No text was extracted.")
-            print("-" * 80)
-            print(f"[{analysis_id}] [DIAGNOSTIC LOG] End of Extracted Text. Total length: {len(extracted_text) if extracted_text else 0} chars.")
-            print("="*80 + "\n")
-            # --- END DIAGNOSTIC LOGGING ---
-
-            if not extracted_text or len(extracted_text) < 200 or "FINANCIAL_STATEMENTS_NOT_FOUND" in extracted_text:
-                print(f"[{analysis_id}] Location failed or returned minimal/no content. Unable to perform analysis.")
-                return ("<h3>Analysis Failed: Could Not Locate Financial Statements</h3>"
-                        "<p>The AI was unable to locate the core financial statements within the document. "
-                        "This can happen with non-standard 10-K formats or scanned documents. "
-                        "Please try a different file.</p>")
-            
-            print(f"[{analysis_id}] Successfully extracted financial data for Step 2.")
-            final_analysis_text = extracted_text
-
-            # --- STEP 2: ANALYZE THE EXTRACTED FINANCIAL DATA ---
-            print(f"[{analysis_id}] 10-K Analysis Step 2: Analyzing extracted financial data...")
-            analysis_prompt = TEN_K_ANALYSIS_PROMPT.format(report_text=final_analysis_text)
-            analysis_result, error = _call_gemini_api(analysis_prompt, analysis_id, timeout_seconds=120)
-
-            if error:
-                return f"Error during financial analysis (Step 2): {error}"
-            
-            return analysis_result
-
-        else: # General Analysis
-            print(f"[{analysis_id}] Performing General Analysis...")
-            # Truncate for general analysis to keep it quick
-            general_prompt = FINANCIAL_ANALYSIS_PROMPT.format(report_text=report_text[:150000])
-            analysis_result, error = _call_gemini_api(general_prompt, analysis_id, timeout_seconds=120)
-            
-            if error:
-                return f"Error during general analysis: {error}"
-            
-            return analysis_result
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job ID.'
+        }), 404
+    if not sse_slots.acquire(blocking=False):
+        return jsonify({
+            'success': False,
+            'error': 'Too many open event streams. Poll the status URL instead.',
+            'status_url': f"/jobs/{job_id}"
+        }), 503
+
+    def format_event(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def generate():
+        events = job_manager.events(job_id)
+        if events is None:
+            # Finished long ago (or before a restart): replay the stored outcome
+            finished = job_manager.get(job_id)
+            yield format_event('stage', {'stage': finished['stage']})
+            if finished['status'] == 'completed':
+                yield format_event('done', {'data': finished['result']})
+            elif finished['status'] == 'failed':
+                yield format_event('error', {'error': finished['error']})
+            return
+
+        index = 0
+        while True:
+            new_events, closed = events.wait(index, timeout=SSE_KEEPALIVE_SECONDS)
+            for event, data in new_events:
+                yield format_event(event, data)
+            index += len(new_events)
+            if closed and not new_events:
+                return
+            if not new_events:
+                # Comment line keeps proxies and Cloud Run from closing an idle stream
+                yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the stream ends or the client goes away
+    response.call_on_close(sse_slots.release)
+    return response
 
-    except Exception as e:
-        print(f"[{analysis_id}] Analysis error in main function: {e}")
-        return f"Analysis failed due to a system error. Please try again. Error: {str(e)[:100]}"
+
+# Background worker pool for /upload. Jobs left unfinished by a previous
+# process are picked up again (run a single app process per job database).
+# Jobs with the same result cache key are coalesced into one.
+job_manager = JobManager(process_analysis_job, coalesce_key=lambda payload: payload.get('cache_key'))
+
+
+def warmup():
+    """Initialize the model clients of the routed profiles and load the file format libraries"""
+    start_time = time.time()
+    model_registry.warmup()
+    file_reader.warmup()
+    print(f"🔥 Warmup finished in {time.time() - start_time:.2f}s")
+
+def start_background_services():
+    """Start the upload reaper and the warmup thread, and resume unfinished jobs"""
+    upload_store.start_reaper()
+    job_manager.recover()
+    if STARTUP_WARMUP:
+        threading.Thread(target=warmup, name='warmup', daemon=True).start()
+
+# Spawned worker processes (the PDF extraction pool) re-import the main module as
+# __mp_main__; only the serving process may start these, or a worker would recover
+# and re-run the jobs in progress
+if __name__ != '__mp_main__':
+    start_background_services()
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for this process"""
+    return Response(REGISTRY.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
 
 
 @app.route('/health')
@@ -286,7 +519,13 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'gemini_model': 'available' if gemini_model else 'unavailable',
+        # Reported without initializing the model, so /health stays instant during startup
+        'gemini_model': ('available' if gemini_client.available else 'unavailable')
+                        if gemini_client.initialized else 'not_initialized',
+        'model_backend': MODEL_BACKEND,
+        'gemini_client': gemini_client.stats(),
+        'model_profiles': model_registry.stats(),
+        'jobs': {'pending': job_manager.pending_count(), 'in_flight': job_manager.inflight_count()},
         'timestamp': datetime.now().isoformat(),
         'version': '3.0.0' # Final version with full text processing
     })
@@ -313,7 +552,7 @@ def internal_error(e):
     }), 500
 
 if __name__ == '__main__':
-    if gemini_model is None:
+    if not gemini_client.available:
         print("⚠️ Warning: Gemini model not initialized. Check your .env configuration.")
     else:
         print("✅ Gemini model ready for analysis")
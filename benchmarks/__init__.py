@@ -0,0 +1 @@
+# Benchmark suite for Financial Statement Analysis Co-Pilot
@@ -0,0 +1,310 @@
+"""
+Synthetic corpus module for Financial Analysis Co-Pilot benchmarks
+Generates deterministic 10-K-like documents in every supported format and
+size, so reader and pipeline timings are comparable between runs.
+"""
+
+import csv
+import os
+import random
+
+CORPUS_VERSION = "1"
+CORPUS_DIR = os.environ.get('BENCHMARK_CORPUS_DIR', os.path.join(os.path.dirname(__file__), 'corpus'))
+SEED = 2024
+
+LINES_PER_PAGE = 58
+YEARS = ['2024', '2023', '2022']
+
+# Document sizes per format: pages for text formats, rows for tabular ones
+SIZES = {
+    'txt': {'small': 10, 'medium': 60, 'large': 300},
+    'pdf': {'small': 10, 'medium': 60, 'large': 300},
+    'docx': {'small': 10, 'medium': 60, 'large': 200},
+    'xlsx': {'small': 1000, 'medium': 10000, 'large': 50000},
+    'csv': {'small': 5000, 'medium': 100000, 'large': 500000},
+}
+
+SECTIONS = [
+    "Item 1. Business", "Item 1A. Risk Factors", "Item 1B. Unresolved Staff Comments",
+    "Item 2. Properties", "Item 3. Legal Proceedings",
+    "Item 5. Market for Registrant's Common Equity, Related Stockholder Matters",
+    "Item 7. Management's Discussion and Analysis of Financial Condition and Results of Operations",
+    "Item 7A. Quantitative and Qualitative Disclosures About Market Risk",
+]
+
+WORDS = (
+    "the company revenue growth fiscal year net sales increased decreased compared primarily due "
+    "to higher lower demand products services segment operating expenses margin customers market "
+    "risk foreign currency exchange rates interest supply chain manufacturing regulatory "
+    "competition capital expenditures liquidity cash flows investments debt obligations "
+    "management believes future results could differ materially from estimates"
+).split()
+
+# (label, base amount in millions) for each statement; negative amounts print in parentheses
+STATEMENTS = [
+    ("CONSOLIDATED STATEMENTS OF OPERATIONS", [
+        ("Net sales", 383285), ("Cost of sales", 214137), ("Gross margin", 169148),
+        ("Research and development", 29915), ("Selling, general and administrative", 24932),
+        ("Total operating expenses", 54847), ("Operating income", 114301),
+        ("Other income/(expense), net", -565), ("Income before provision for income taxes", 113736),
+        ("Provision for income taxes", 16741), ("Net income", 96995),
+    ]),
+    ("CONSOLIDATED BALANCE SHEETS", [
+        ("Cash and cash equivalents", 29965), ("Accounts receivable, net", 29508),
+        ("Inventories", 6331), ("Total current assets", 143566), ("Property, plant and equipment, net", 43715),
+        ("Total assets", 352583), ("Accounts payable", 62611), ("Total current liabilities", 145308),
+        ("Term debt", 95281), ("Total liabilities", 290437), ("Total shareholders' equity", 62146),
+    ]),
+    ("CONSOLIDATED STATEMENTS OF CASH FLOWS", [
+        ("Net income", 96995), ("Depreciation and amortization", 11519),
+        ("Share-based compensation expense", 10833), ("Cash generated by operating activities", 110543),
+        ("Payments for acquisition of property, plant and equipment", -10959),
+        ("Cash used in investing activities", 3705), ("Cash used in financing activities", -108488),
+    ]),
+]
+
+
+def _paragraph(rng, sentences=5):
+    text = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(12, 24))]
+        text.append(" ".join(words).capitalize() + ".")
+    return " ".join(text)
+
+
+def _wrap(text, width=95):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _format_amount(value):
+    return f"({abs(value):,})" if value < 0 else f"{value:,}"
+
+
+def _statement_rows(rng, items):
+    """Rows of (label, [amount per year]) with a plausible year-over-year drift"""
+    rows = []
+    for label, base in items:
+        amounts = [base]
+        for _ in YEARS[1:]:
+            amounts.append(int(amounts[-1] * rng.uniform(0.85, 1.02)))
+        rows.append((label, amounts))
+    return rows
+
+
+def statement_pages(rng, company="Example Holdings Inc."):
+    """One page of lines per statement, laid out like a filed 10-K"""
+    pages = []
+    for title, items in STATEMENTS:
+        lines = [company, title, "(In millions, except number of shares and per-share amounts)", "",
+                 f"{'':60}" + "".join(f"{year:>14}" for year in YEARS)]
+        for label, amounts in _statement_rows(rng, items):
+            lines.append(f"{label:60}" + "".join(f"{_format_amount(amount):>14}" for amount in amounts))
+        pages.append(lines)
+    return pages
+
+
+def ten_k_pages(page_count, seed=SEED):
+    """
+    Lines for a 10-K-like document of page_count pages: narrative items with
+    running headers and page numbers, then the financial statements near the end.
+    """
+    rng = random.Random(seed + page_count)
+    statements = statement_pages(rng)
+    narrative_pages = max(1, page_count - len(statements) - 2)
+
+    pages = []
+    body = []
+    for page_number in range(narrative_pages):
+        if page_number % max(1, narrative_pages // len(SECTIONS)) == 0:
+            section = SECTIONS[min(len(SECTIONS) - 1, page_number * len(SECTIONS) // narrative_pages)]
+            body.extend(["", section, ""])
+        while len(body) < LINES_PER_PAGE - 4:
+            body.extend(_wrap(_paragraph(rng)) + [""])
+        pages.append(["Example Holdings Inc. | 2024 Form 10-K", ""] + body[:LINES_PER_PAGE - 4]
+                     + ["", str(page_number + 1)])
+        body = body[LINES_PER_PAGE - 4:]
+
+    pages.append(["Item 8. Financial Statements and Supplementary Data", "",
+                  "Report of Independent Registered Public Accounting Firm", ""]
+                 + _wrap(_paragraph(rng, 8)))
+    pages.extend(statements)
+    pages.append(["Notes to Consolidated Financial Statements", ""] + _wrap(_paragraph(rng, 10)))
+    return pages[:page_count] if len(pages) > page_count else pages
+
+
+def write_txt(path, page_count):
+    with open(path, 'w', encoding='utf-8') as file:
+        for lines in ten_k_pages(page_count):
+            file.write("\n".join(lines) + "\n\f\n")
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages, ruled_pages=()):
+    """
+    Write a minimal text PDF (one Courier content stream per page).
+    Pages whose index is in ruled_pages get horizontal rules between lines,
+    like the ruled statement tables of a real filing.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_root = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+
+    page_ids = []
+    for index, lines in enumerate(pages):
+        ops = ["BT", "/F1 8 Tf", "10 TL", "36 756 Td"]
+        for line in lines:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        if index in ruled_pages:
+            ops.append("0.5 w")
+            for row in range(len(lines)):
+                y = 756 - 10 * row - 3
+                ops.append(f"36 {y} m 576 {y} l S")
+        stream = "\n".join(ops).encode('latin-1', 'replace')
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_root} 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>".encode()))
+
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_root} 0 R >>".encode()
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[pages_root - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref_offset)
+
+    with open(path, 'wb') as file:
+        file.write(output)
+
+
+def write_ten_k_pdf(path, page_count):
+    pages = ten_k_pages(page_count)
+    ruled = {index for index, lines in enumerate(pages)
+             if any(title for title, _ in STATEMENTS if title in lines)}
+    write_pdf(path, pages, ruled)
+
+
+def write_docx(path, page_count):
+    import docx
+
+    document = docx.Document()
+    rng = random.Random(SEED + page_count)
+    for lines in ten_k_pages(page_count)[:-len(STATEMENTS) - 1]:
+        document.add_paragraph("\n".join(line for line in lines if line))
+    for title, items in STATEMENTS:
+        document.add_paragraph(title)
+        rows = _statement_rows(rng, items)
+        table = document.add_table(rows=len(rows) + 1, cols=len(YEARS) + 1)
+        for column, year in enumerate(YEARS, start=1):
+            table.cell(0, column).text = year
+        for row_index, (label, amounts) in enumerate(rows, start=1):
+            table.cell(row_index, 0).text = label
+            for column, amount in enumerate(amounts, start=1):
+                table.cell(row_index, column).text = _format_amount(amount)
+    document.save(path)
+
+
+def _ledger_rows(row_count, seed):
+    """General-ledger style rows for the tabular formats"""
+    rng = random.Random(seed + row_count)
+    accounts = [label for _, items in STATEMENTS for label, _ in items]
+    for index in range(row_count):
+        yield [
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            f"JE-{index:07d}",
+            rng.choice(accounts),
+            rng.choice(['Americas', 'Europe', 'Greater China', 'Japan', 'Rest of Asia Pacific']),
+            round(rng.uniform(-50000, 250000), 2),
+            round(rng.uniform(0, 5000), 2),
+            rng.choice(['USD', 'EUR', 'JPY', 'CNY']),
+            rng.choice(['posted', 'reconciled', 'pending']),
+        ]
+
+
+LEDGER_HEADER = ['date', 'entry_id', 'account', 'region', 'amount', 'tax', 'currency', 'status']
+
+
+def write_csv(path, row_count):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(LEDGER_HEADER)
+        writer.writerows(_ledger_rows(row_count, SEED))
+
+
+def write_xlsx(path, row_count):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    ledger = workbook.create_sheet("Ledger")
+    ledger.append(LEDGER_HEADER)
+    for row in _ledger_rows(row_count, SEED):
+        ledger.append(row)
+
+    rng = random.Random(SEED)
+    for title, items in STATEMENTS:
+        sheet = workbook.create_sheet(title.title()[:31])
+        sheet.append(["(In millions)"] + YEARS)
+        for label, amounts in _statement_rows(rng, items):
+            sheet.append([label] + amounts)
+    workbook.save(path)
+
+
+WRITERS = {
+    'txt': write_txt,
+    'pdf': write_ten_k_pdf,
+    'docx': write_docx,
+    'xlsx': write_xlsx,
+    'csv': write_csv,
+}
+
+
+def build_corpus(formats=None, sizes=None, directory=CORPUS_DIR):
+    """
+    Generate (or reuse) the synthetic corpus.
+
+    Returns:
+        list: (case name, format, size, path) for every document
+    """
+    os.makedirs(directory, exist_ok=True)
+    documents = []
+    for file_format, size_map in SIZES.items():
+        if formats and file_format not in formats:
+            continue
+        for size, amount in size_map.items():
+            if sizes and size not in sizes:
+                continue
+            path = os.path.join(directory, f"v{CORPUS_VERSION}_{size}_{amount}.{file_format}")
+            if not os.path.exists(path):
+                print(f"📝 Generating {path}")
+                tmp_path = path + '.tmp'
+                WRITERS[file_format](tmp_path, amount)
+                os.replace(tmp_path, path)
+            documents.append((f"{file_format}_{size}", file_format, size, path))
+    return documents
@@ -0,0 +1,267 @@
+"""
+Load generator for Financial Analysis Co-Pilot
+Drives /upload with N concurrent clients, follows each job to completion and
+reports upload and end-to-end latency percentiles and throughput.
+
+Run it against a deployed or local server, or pass --serve to start the app
+in-process on the fake model backend (no network or API quota needed):
+
+    python -m benchmarks.load_test --serve --clients 8 --requests 80
+    python -m benchmarks.load_test --url http://localhost:8080 --clients 4 --duration 120
+"""
+
+import argparse
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sample_report.txt')
+# Text formats can be made unique per request so the result cache doesn't answer them
+VARIABLE_EXTENSIONS = ('.txt', '.csv')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'p50': _round(percentile(values, 0.50)),
+        'p95': _round(percentile(values, 0.95)),
+        'p99': _round(percentile(values, 0.99)),
+        'max': _round(max(values) if values else None),
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def _multipart(file_name, file_bytes, fields):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode())
+    parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{file_name}\"\r\n"
+                 f"Content-Type: application/octet-stream\r\n\r\n".encode() + file_bytes + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _request(url, data=None, headers=None, timeout=60):
+    """Returns (status code, parsed JSON body or None)"""
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        try:
+            return e.code, json.loads(e.read() or b"null")
+        except ValueError:
+            return e.code, None
+
+
+class LoadTest:
+    """Runs the clients and collects one record per upload"""
+
+    def __init__(self, base_url, file_path, analysis_type='general', clients=4, requests=None, duration=None,
+                 poll_interval=0.5, job_timeout=600, vary=True):
+        self.base_url = base_url.rstrip('/')
+        self.file_name = os.path.basename(file_path)
+        with open(file_path, 'rb') as file:
+            self.file_bytes = file.read()
+        self.analysis_type = analysis_type
+        self.clients = clients
+        self.requests = requests
+        self.duration = duration
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.vary = vary and os.path.splitext(file_path)[1].lower() in VARIABLE_EXTENSIONS
+        self.records = []
+        self._lock = threading.Lock()
+        self._issued = 0
+
+    def _next_request(self, deadline):
+        with self._lock:
+            if self.requests is not None and self._issued >= self.requests:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            self._issued += 1
+            return self._issued
+
+    def _one_upload(self, number):
+        file_bytes = self.file_bytes
+        if self.vary:
+            file_bytes += f"\nLoad test request {number} {uuid.uuid4().hex}\n".encode()
+        body, content_type = _multipart(self.file_name, file_bytes, {'analysisType': self.analysis_type})
+
+        record = {'request': number, 'outcome': None, 'upload_seconds': None, 'total_seconds': None, 'status': None}
+        start = time.monotonic()
+        try:
+            status, payload = _request(f"{self.base_url}/upload", body, {'Content-Type': content_type})
+        except OSError as e:
+            record.update(outcome='connection_error', error=str(e)[:200])
+            return record
+        record['upload_seconds'] = time.monotonic() - start
+        record['status'] = status
+
+        if status == 200 and payload and payload.get('success'):
+            record.update(outcome='cached' if payload['data'].get('cached') else 'completed',
+                          total_seconds=record['upload_seconds'])
+            return record
+        if status != 202:
+            record.update(outcome='busy' if status == 503 else 'rejected',
+                          error=(payload or {}).get('error'))
+            return record
+
+        status_url = f"{self.base_url}{payload['status_url']}"
+        while time.monotonic() - start < self.job_timeout:
+            time.sleep(self.poll_interval)
+            try:
+                _, job = _request(status_url)
+            except OSError:
+                continue
+            if job and job.get('status') in ('completed', 'failed'):
+                record['total_seconds'] = time.monotonic() - start
+                record['outcome'] = job['status']
+                if job['status'] == 'failed':
+                    record['error'] = job.get('error')
+                return record
+        record.update(outcome='timeout', total_seconds=time.monotonic() - start)
+        return record
+
+    def _client(self, deadline):
+        while True:
+            number = self._next_request(deadline)
+            if number is None:
+                return
+            record = self._one_upload(number)
+            with self._lock:
+                self.records.append(record)
+
+    def run(self):
+        """Run all clients to completion and return the report"""
+        deadline = time.monotonic() + self.duration if self.duration else None
+        start = time.monotonic()
+        threads = [threading.Thread(target=self._client, args=(deadline,), daemon=True)
+                   for _ in range(self.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        outcomes = {}
+        for record in self.records:
+            outcomes[record['outcome']] = outcomes.get(record['outcome'], 0) + 1
+        finished = [record for record in self.records if record['outcome'] in ('completed', 'cached')]
+        errors = {}
+        for record in self.records:
+            if record.get('error'):
+                errors[record['error']] = errors.get(record['error'], 0) + 1
+
+        try:
+            _, health = _request(f"{self.base_url}/health", timeout=10)
+        except OSError:
+            health = None
+
+        return {
+            'created_at': datetime.now().isoformat(),
+            'base_url': self.base_url,
+            'file': self.file_name,
+            'file_bytes': len(self.file_bytes),
+            'analysis_type': self.analysis_type,
+            'clients': self.clients,
+            'requests': len(self.records),
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_per_second': round(len(finished) / elapsed, 3) if elapsed else None,
+            'outcomes': outcomes,
+            'upload_latency': summarize([r['upload_seconds'] for r in self.records if r['upload_seconds'] is not None]),
+            'end_to_end_latency': summarize([r['total_seconds'] for r in finished]),
+            'errors': errors,
+            'server_health': health,
+        }
+
+
+def serve_in_process():
+    """
+    Start the app on the fake model backend in a background thread, with its
+    job database, caches and upload spill files in a temporary directory.
+    Returns the base URL.
+    """
+    from werkzeug.serving import make_server
+
+    work_dir = tempfile.mkdtemp(prefix='copilot-load-')
+    os.environ.setdefault('MODEL_BACKEND', 'fake')
+    os.environ.setdefault('JOB_DB_PATH', os.path.join(work_dir, 'jobs.sqlite3'))
+    os.environ.setdefault('RESULT_CACHE_DIR', os.path.join(work_dir, 'results'))
+    os.environ.setdefault('EXTRACTION_CACHE_DIR', os.path.join(work_dir, 'extractions'))
+    os.environ.setdefault('PDF_PAGE_CACHE_DIR', os.path.join(work_dir, 'pdf_pages'))
+    os.environ.setdefault('ANALYSIS_REFS_DIR', os.path.join(work_dir, 'analyses'))
+    os.environ.setdefault('UPLOAD_SPILL_DIR', os.path.join(work_dir, 'uploads'))
+    import app as web_app
+
+    server = make_server('127.0.0.1', 0, web_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🧪 Serving the app on the {os.environ['MODEL_BACKEND']} backend at http://127.0.0.1:{server.server_port}")
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /upload endpoint.")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="Base URL of the app")
+    parser.add_argument('--serve', action='store_true', help="Start the app in-process on the fake model backend")
+    parser.add_argument('--file', default=DEFAULT_FILE, help="Document to upload")
+    parser.add_argument('--analysis-type', choices=['general', '10k'], default='general')
+    parser.add_argument('--clients', type=int, default=4, help="Concurrent clients")
+    parser.add_argument('--requests', type=int, help="Total uploads (default: 10 per client unless --duration)")
+    parser.add_argument('--duration', type=float, help="Keep uploading for this many seconds")
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="Seconds between job status polls")
+    parser.add_argument('--no-vary', action='store_true',
+                        help="Upload identical bytes every time (lets the result cache answer repeats)")
+    parser.add_argument('--output', help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    requests = args.requests
+    if requests is None and args.duration is None:
+        requests = args.clients * 10
+
+    base_url = serve_in_process() if args.serve else args.url
+    load_test = LoadTest(base_url, args.file, args.analysis_type, args.clients, requests, args.duration,
+                         args.poll_interval, vary=not args.no_vary)
+    print(f"🚀 {args.clients} clients uploading {load_test.file_name} to {base_url}/upload")
+    report = load_test.run()
+
+    upload, end_to_end = report['upload_latency'], report['end_to_end_latency']
+    print("-" * 60)
+    print(f"Requests: {report['requests']} in {report['elapsed_seconds']}s, outcomes: {report['outcomes']}")
+    print(f"Throughput: {report['throughput_per_second']} analyses/s")
+    print(f"Upload latency     p50 {upload['p50']}s  p95 {upload['p95']}s  p99 {upload['p99']}s")
+    print(f"End-to-end latency p50 {end_to_end['p50']}s  p95 {end_to_end['p95']}s  p99 {end_to_end['p99']}s")
+    for error, count in report['errors'].items():
+        print(f"⚠️ {count}x {error}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"📄 Report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark runner for Financial Analysis Co-Pilot
+Times every analysis.file_reader function and the end-to-end
+analyze_financial_report (with the fake model backend) over the synthetic corpus,
+recording wall time, throughput, peak RSS and output size. Results are
+written as JSON and can be compared against a baseline run.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--sizes small medium] [--formats pdf csv]
+                                        [--repeat 3] [--output results.json]
+                                        [--baseline baseline.json] [--threshold 0.2]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from benchmarks import corpus
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                          'FY24_Q1_Consolidated_Financial_Statements.pdf')
+
+READERS = {
+    'txt': 'read_txt_file',
+    'pdf': 'read_pdf_file',
+    'docx': 'read_docx_file',
+    'xlsx': 'read_excel_file',
+    'csv': 'read_csv_file',
+}
+
+# Pipeline cases: (case name, corpus case or 'sample_pdf', analysis type)
+PIPELINE_CASES = [
+    ('pipeline_10k_sample_pdf', 'sample_pdf', '10k'),
+    ('pipeline_10k_pdf_large', 'pdf_large', '10k'),
+    ('pipeline_general_pdf_large', 'pdf_large', 'general'),
+    ('pipeline_general_txt_medium', 'txt_medium', 'general'),
+    ('pipeline_general_csv_medium', 'csv_medium', 'general'),
+]
+
+# Metrics compared against the baseline; higher is worse for all of them
+COMPARED_METRICS = ('seconds', 'peak_rss_mb')
+
+STUB_RESPONSE = "<div class='analysis-section'><h3>Benchmark</h3><p>" + "Stubbed analysis. " * 200 + "</p></div>"
+
+
+def _rss_mb(usage):
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _run_case(kind, target, path, analysis_type, repeat, model_latency):
+    """
+    Run one case in a fresh process so peak RSS is the case's own.
+    Returns a dict of measurements.
+    """
+    from analysis import file_reader
+
+    sink = io.StringIO()
+    timings = []
+    output_chars = 0
+    extra = {}
+    baseline_rss = _rss_mb(resource.getrusage(resource.RUSAGE_SELF))
+
+    if kind == 'reader':
+        reader = getattr(file_reader, target)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sink):
+                content = reader(path)
+            timings.append(time.perf_counter() - start)
+            output_chars = len(content or "")
+    else:
+        # No API key needed: the config module starts on the fake backend
+        os.environ['MODEL_BACKEND'] = 'fake'
+        import analysis.config
+        from analysis.fake_model import FakeModel
+        from analysis.pipeline import analyze_financial_report
+
+        model = FakeModel(latency=model_latency, default_response=STUB_RESPONSE)
+        analysis.config.gemini_client.model = model
+        for _ in range(repeat):
+            model.calls = model.prompt_chars = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sink):
+                content = file_reader.read_report(path, use_cache=False)
+                result = analyze_financial_report(content, 'benchmark', analysis_type)
+            timings.append(time.perf_counter() - start)
+            output_chars = len(result or "")
+        extra = {'model_calls': model.calls, 'prompt_chars': model.prompt_chars, 'input_chars': len(content or "")}
+
+    # Shut the PDF pool down so its workers count towards RUSAGE_CHILDREN
+    if file_reader._pdf_pool is not None:
+        file_reader._pdf_pool.shutdown(wait=True)
+
+    size_bytes = os.path.getsize(path)
+    seconds = statistics.median(timings)
+    return dict(extra, **{
+        'seconds': round(seconds, 4),
+        'seconds_min': round(min(timings), 4),
+        'seconds_max': round(max(timings), 4),
+        'input_bytes': size_bytes,
+        'throughput_mb_s': round(size_bytes / (1024 * 1024) / seconds, 3) if seconds else None,
+        'output_chars': output_chars,
+        'peak_rss_mb': round(_rss_mb(resource.getrusage(resource.RUSAGE_SELF)), 1),
+        'import_rss_mb': round(baseline_rss, 1),
+        'children_peak_rss_mb': round(_rss_mb(resource.getrusage(resource.RUSAGE_CHILDREN)), 1),
+    })
+
+
+def _run_isolated(*args):
+    # ProcessPoolExecutor workers aren't daemonic, so the PDF reader can start its own pool
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_run_case, *args).result()
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(formats=None, sizes=None, repeat=3, model_latency=0.0, include_pipeline=True):
+    """
+    Build the corpus and run every reader and pipeline case.
+
+    Returns:
+        dict: Run metadata plus a 'cases' mapping of case name to measurements
+    """
+    documents = corpus.build_corpus(formats, sizes)
+    paths = {name: path for name, _, _, path in documents}
+    paths['sample_pdf'] = SAMPLE_PDF
+
+    cases = []
+    for name, file_format, size, path in documents:
+        cases.append((f"reader_{name}", 'reader', READERS[file_format], path, None))
+    if os.path.exists(SAMPLE_PDF) and (not formats or 'pdf' in formats):
+        cases.append(('reader_pdf_sample', 'reader', 'read_pdf_file', SAMPLE_PDF, None))
+    if include_pipeline:
+        for name, source, analysis_type in PIPELINE_CASES:
+            if source in paths and os.path.exists(paths[source]):
+                cases.append((name, 'pipeline', None, paths[source], analysis_type))
+
+    results = {}
+    for name, kind, target, path, analysis_type in cases:
+        print(f"⏱️ {name} ...", end=" ", flush=True)
+        measurements = _run_isolated(kind, target, path, analysis_type, repeat, model_latency)
+        results[name] = measurements
+        print(f"{measurements['seconds']:.3f}s, {measurements['throughput_mb_s']} MB/s, "
+              f"peak RSS {measurements['peak_rss_mb']} MB, {measurements['output_chars']} chars")
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus_version': corpus.CORPUS_VERSION,
+        'repeat': repeat,
+        'model_latency': model_latency,
+        'cases': results,
+    }
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Compare each case against the baseline run.
+
+    Returns:
+        list: (case, metric, baseline value, current value, ratio) for every regression
+    """
+    regressions = []
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            marker = "🔴" if ratio > 1 + threshold else ("🟢" if ratio < 1 - threshold else "  ")
+            print(f"{marker} {name:36} {metric:12} {before:>10} -> {after:>10} ({ratio:.2f}x)")
+            if ratio > 1 + threshold:
+                regressions.append((name, metric, before, after, ratio))
+        if previous.get('output_chars') != current.get('output_chars'):
+            print(f"⚠️ {name}: output size changed {previous.get('output_chars')} -> {current.get('output_chars')}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the file readers and the analysis pipeline.")
+    parser.add_argument('--formats', nargs='*', choices=sorted(corpus.SIZES), help="Formats to run (default: all)")
+    parser.add_argument('--sizes', nargs='*', choices=['small', 'medium', 'large'], help="Sizes to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case; the median is reported")
+    parser.add_argument('--model-latency', type=float, default=0.0, help="Seconds the stub model waits per call")
+    parser.add_argument('--no-pipeline', action='store_true', help="Only benchmark the readers")
+    parser.add_argument('--output', help="Results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help="Results JSON of a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown/growth counted as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.formats, args.sizes, args.repeat, args.model_latency, not args.no_pipeline)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"📄 Results: {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%} against {args.baseline}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Startup profiler for Financial Analysis Co-Pilot
+Measures cold-start cost in fresh interpreters: time until the app is
+imported and has answered /health, and the import cost of each module
+(from python -X importtime).
+
+Usage:
+    python -m benchmarks.startup [--top 25] [--runs 3] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter; prints seconds until import and first /health response
+HEALTH_PROBE = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+response = app.app.test_client().get('/health')
+print('STARTUP', imported, time.perf_counter() - start, response.status_code)
+"""
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _environment():
+    # Measure the app itself: no model warmup thread competing for the interpreter
+    env = dict(os.environ, STARTUP_WARMUP=os.environ.get('STARTUP_WARMUP', 'false'))
+    env.setdefault('PYTHONDONTWRITEBYTECODE', '1')
+    return env
+
+
+def measure_health(runs=3):
+    """
+    Time a cold import of app and its first /health response.
+
+    Returns:
+        dict: median import and ready seconds over runs
+    """
+    imported, ready = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', HEALTH_PROBE], cwd=ROOT, env=_environment(),
+                                capture_output=True, text=True, check=True).stdout
+        line = next(line for line in output.splitlines() if line.startswith('STARTUP'))
+        _, import_seconds, ready_seconds, status = line.split()
+        if status != '200':
+            raise RuntimeError(f"/health returned {status}")
+        imported.append(float(import_seconds))
+        ready.append(float(ready_seconds))
+    return {'import_seconds': round(statistics.median(imported), 4),
+            'health_ready_seconds': round(statistics.median(ready), 4)}
+
+
+def measure_imports(target='app'):
+    """
+    Per-module import cost of importing target, from python -X importtime.
+
+    Returns:
+        list: dicts of module, depth, self and cumulative milliseconds, in import order
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {target}'], cwd=ROOT,
+                            env=_environment(), capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append({'module': module, 'depth': len(indent) // 2,
+                            'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    return modules
+
+
+def package_totals(modules):
+    """Self time summed per top-level package"""
+    totals = {}
+    for entry in modules:
+        package = entry['module'].split('.')[0]
+        totals[package] = totals.get(package, 0.0) + entry['self_ms']
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app cold-start and per-module import cost.")
+    parser.add_argument('--runs', type=int, default=3, help="Cold starts to time (median is reported)")
+    parser.add_argument('--top', type=int, default=25, help="Modules/packages to list")
+    parser.add_argument('--output', help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    health = measure_health(args.runs)
+    modules = measure_imports()
+    packages = package_totals(modules)
+
+    print(f"🚀 import app: {health['import_seconds'] * 1000:.0f} ms, "
+          f"first /health answered after {health['health_ready_seconds'] * 1000:.0f} ms")
+    print("-" * 60)
+    print("Slowest imports (cumulative):")
+    for entry in sorted(modules, key=lambda entry: entry['cumulative_ms'], reverse=True)[:args.top]:
+        print(f"  {entry['cumulative_ms']:9.1f} ms  {'  ' * entry['depth']}{entry['module']}")
+    print("-" * 60)
+    print("Self time per top-level package:")
+    for package, milliseconds in list(packages.items())[:args.top]:
+        print(f"  {milliseconds:9.1f} ms  {package}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'health': health, 'packages': packages, 'modules': modules}, file, indent=2)
+        print(f"📄 Report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
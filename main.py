@@ -1,240 +1,289 @@
 """
 Financial Statement Analysis Co-Pilot
-Main application script for analyzing financial reports using Google Gemini Pro API
+Batch runner: analyzes every financial report under a directory using Google Gemini
 Supports multiple file formats: TXT, PDF, DOCX, XLSX, CSV
 
+Files are parsed in a process pool and analyzed with a bounded number of
+concurrent API calls. Results go to a JSONL or SQLite file, and a manifest
+next to it records finished files so an interrupted run resumes where it stopped.
+
+Usage:
+    python main.py [input_dir] [--output results.jsonl] [--analysis-type general|10k]
+                   [--parse-workers N] [--api-workers N] [--retry-failed]
+
 Author: [Your Name]
 Date: [Current Date]
 Purpose: University project for automated financial statement analysis
 """
 
+import argparse
+import json
 import os
+import sqlite3
 import sys
-import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
 from pathlib import Path
-from config import gemini_model
-from prompts import FINANCIAL_ANALYSIS_PROMPT
-
-# Import libraries for different file formats
-try:
-    import PyPDF2
-    import docx
-    from openpyxl import load_workbook
-except ImportError as e:
-    print(f"⚠️ Some file format libraries are missing: {e}")
-    print("Install with: pip install -r requirements.txt")
-
-def read_txt_file(filepath):
-    """Read content from a TXT file"""
-    with open(filepath, 'r', encoding='utf-8') as file:
-        return file.read()
-
-def read_pdf_file(filepath):
-    """Read content from a PDF file"""
-    try:
-        import PyPDF2
-        content = ""
-        with open(filepath, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                content += page.extract_text() + "\n"
-        return content
-    except ImportError:
-        raise ImportError("PyPDF2 is required for PDF files. Install with: pip install PyPDF2")
-
-def read_docx_file(filepath):
-    """Read content from a Word document"""
-    try:
-        import docx
-        doc = docx.Document(filepath)
-        content = ""
-        for paragraph in doc.paragraphs:
-            content += paragraph.text + "\n"
-        return content
-    except ImportError:
-        raise ImportError("python-docx is required for Word files. Install with: pip install python-docx")
-
-def read_excel_file(filepath):
-    """Read content from an Excel file"""
-    try:
-        # Read all sheets and combine content
-        excel_file = pd.ExcelFile(filepath)
-        content = ""
-        
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(filepath, sheet_name=sheet_name)
-            content += f"\n--- SHEET: {sheet_name} ---\n"
-            content += df.to_string(index=False) + "\n"
-        
-        return content
-    except ImportError:
-        raise ImportError("pandas and openpyxl are required for Excel files. Install with: pip install pandas openpyxl")
-
-def read_csv_file(filepath):
-    """Read content from a CSV file"""
-    try:
-        df = pd.read_csv(filepath)
-        return df.to_string(index=False)
-    except ImportError:
-        raise ImportError("pandas is required for CSV files. Install with: pip install pandas")
 
-def read_report(filepath):
+from analysis import file_reader
+from analysis.cache import content_digest
+
+# Supported file extensions
+SUPPORTED_EXTENSIONS = ['.txt', '.pdf', '.docx', '.xlsx', '.xls', '.csv']
+
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+def find_financial_files(input_dir):
     """
-    Read financial report content from various file formats
-    Supports: TXT, PDF, DOCX, XLSX, CSV
-    
-    Args:
-        filepath (str): Path to the financial report file
-        
-    Returns:
-        str: Content of the financial report
+    Find every supported financial report file under input_dir (recursively)
+    Returns a sorted list of paths
     """
-    try:
-        # Check if file exists
-        if not os.path.exists(filepath):
-            print(f"❌ Error: File not found at {filepath}")
-            return None
-        
-        # Get file extension
-        file_extension = Path(filepath).suffix.lower()
-        
-        # Read based on file type
-        if file_extension == '.txt':
-            content = read_txt_file(filepath)
-        elif file_extension == '.pdf':
-            content = read_pdf_file(filepath)
-        elif file_extension == '.docx':
-            content = read_docx_file(filepath)
-        elif file_extension in ['.xlsx', '.xls']:
-            content = read_excel_file(filepath)
-        elif file_extension == '.csv':
-            content = read_csv_file(filepath)
+    found = []
+    for root, _dirs, files in os.walk(input_dir):
+        for name in files:
+            if Path(name).suffix.lower() in SUPPORTED_EXTENSIONS:
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def file_digest(filepath):
+    """SHA-256 of a file's contents, used to tell changed files apart in the manifest"""
+    with open(filepath, 'rb') as file:
+        return content_digest(file.read())
+
+
+class Manifest:
+    """
+    Append-only JSONL record of finished files. Each line is written and flushed
+    as soon as a file finishes, so an interrupted run loses at most in-flight work.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partial line from an interrupted write
+                    self.entries[self._key(entry['path'], entry['sha256'], entry['analysis_type'])] = entry
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _key(path, digest, analysis_type):
+        return (path, digest, analysis_type)
+
+    def status(self, path, digest, analysis_type):
+        entry = self.entries.get(self._key(path, digest, analysis_type))
+        return entry['status'] if entry else None
+
+    def record(self, path, digest, analysis_type, status):
+        entry = {'path': path, 'sha256': digest, 'analysis_type': analysis_type,
+                 'status': status, 'finished_at': datetime.now().isoformat()}
+        self.entries[self._key(path, digest, analysis_type)] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ResultWriter:
+    """Writes one result record per file to a JSONL file or a SQLite database"""
+
+    def __init__(self, path):
+        self.path = path
+        self.use_sqlite = Path(path).suffix.lower() in ('.db', '.sqlite', '.sqlite3')
+        if self.use_sqlite:
+            self._conn = sqlite3.connect(path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    path TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    analysis_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    analysis_result TEXT,
+                    error TEXT,
+                    content_length INTEGER,
+                    parse_seconds REAL,
+                    analysis_seconds REAL,
+                    finished_at TEXT NOT NULL,
+                    PRIMARY KEY (path, sha256, analysis_type)
+                )
+            """)
+            self._conn.commit()
+        else:
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        if self.use_sqlite:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (path, sha256, analysis_type, status, analysis_result, error, "
+                "content_length, parse_seconds, analysis_seconds, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record['path'], record['sha256'], record['analysis_type'], record['status'],
+                 record['analysis_result'], record['error'], record['content_length'],
+                 record['parse_seconds'], record['analysis_seconds'], record['finished_at']))
+            self._conn.commit()
         else:
-            print(f"❌ Unsupported file format: {file_extension}")
-            print("📁 Supported formats: .txt, .pdf, .docx, .xlsx, .xls, .csv")
-            return None
-        
-        print(f"✅ Successfully loaded {file_extension.upper()} report from: {filepath}")
-        print(f"📄 Content length: {len(content)} characters")
-        return content
-        
-    except Exception as e:
-        print(f"❌ Error reading file: {e}")
-        return None
-
-def find_financial_file():
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self.use_sqlite:
+            self._conn.close()
+        else:
+            self._file.close()
+
+
+def parse_file(filepath):
     """
-    Look for financial report files in the data directory
-    Returns the first found file or None
+    Read one report (runs in a parse worker process)
+    Returns (content, parse_seconds)
     """
-    data_dir = "data"
-    if not os.path.exists(data_dir):
-        return None
-    
-    # Supported file extensions
-    supported_extensions = ['.txt', '.pdf', '.docx', '.xlsx', '.xls', '.csv']
-    
-    for file in os.listdir(data_dir):
-        file_path = os.path.join(data_dir, file)
-        if os.path.isfile(file_path) and Path(file).suffix.lower() in supported_extensions:
-            return file_path
-    
-    return None
-
-def analyze_financial_report(report_text):
+    # Parse workers already run in parallel; don't nest a PDF process pool inside each
+    file_reader.PDF_WORKERS = 1
+    start_time = time.time()
+    content = file_reader.read_report(filepath)
+    return content, time.time() - start_time
+
+
+def analyze_file(filepath, content, analysis_type):
     """
-    Send the financial report to Gemini for analysis
-    
-    Args:
-        report_text (str): The financial report content to analyze
-        
-    Returns:
-        str: AI-generated analysis or None if error occurred
+    Analyze parsed report text (runs in an API worker thread)
+    Returns (analysis_result, error, analysis_seconds)
     """
-    try:
-        # Check if model is available
-        if gemini_model is None:
-            print("❌ Gemini model not initialized. Check your API key configuration.")
-            return None
-        
-        # Format the prompt with the report text
-        formatted_prompt = FINANCIAL_ANALYSIS_PROMPT.format(report_text=report_text)
-        
-        print("🔄 Sending report to Gemini for analysis...")
-        
-        # Generate analysis using Gemini
-        response = gemini_model.generate_content(formatted_prompt)
-        
-        print("✅ Analysis completed successfully!")
-        return response.text
-        
-    except Exception as e:
-        print(f"❌ Error during analysis: {e}")
-        if "quota" in str(e).lower():
-            print("💡 Tip: Try again in a few minutes or use gemini-1.5-flash for better rate limits")
-        return None
-
-def display_analysis(analysis):
+    from analysis.pipeline import run_analysis
+
+    start_time = time.time()
+    label = Path(filepath).name
+    analysis_result, error = run_analysis(content, label, analysis_type)
+    return analysis_result, error, time.time() - start_time
+
+
+def run_batch(input_dir, output_path, analysis_type='general', parse_workers=2, api_workers=4,
+              retry_failed=False):
     """
-    Display the analysis results in a formatted way
-    
-    Args:
-        analysis (str): The AI-generated analysis to display
+    Analyze every supported file under input_dir, skipping files the manifest
+    already records as finished. Returns (completed, failed, skipped) counts.
     """
-    print("\n" + "="*80)
-    print("FINANCIAL STATEMENT ANALYSIS RESULTS")
-    print("="*80)
-    print(analysis)
-    print("="*80)
+    files = find_financial_files(input_dir)
+    manifest = Manifest(output_path + '.manifest.jsonl')
+    writer = ResultWriter(output_path)
+
+    pending = []
+    skipped = 0
+    for filepath in files:
+        digest = file_digest(filepath)
+        status = manifest.status(filepath, digest, analysis_type)
+        if status == COMPLETED or (status == FAILED and not retry_failed):
+            skipped += 1
+            continue
+        pending.append((filepath, digest))
+
+    print(f"📁 Found {len(files)} files in {input_dir}: {len(pending)} to analyze, {skipped} already done")
+    completed = failed = 0
+
+    def finish(filepath, digest, content, parse_seconds, analysis_result, error, analysis_seconds):
+        nonlocal completed, failed
+        status = COMPLETED if error is None and analysis_result else FAILED
+        writer.write({
+            'path': filepath,
+            'sha256': digest,
+            'analysis_type': analysis_type,
+            'status': status,
+            'analysis_result': analysis_result,
+            'error': error,
+            'content_length': len(content) if content else 0,
+            'parse_seconds': round(parse_seconds, 3),
+            'analysis_seconds': round(analysis_seconds, 3),
+            'finished_at': datetime.now().isoformat()
+        })
+        manifest.record(filepath, digest, analysis_type, status)
+        if status == COMPLETED:
+            completed += 1
+            print(f"✅ [{completed + failed}/{len(pending)}] {filepath} "
+                  f"(parse {parse_seconds:.1f}s, analysis {analysis_seconds:.1f}s)")
+        else:
+            failed += 1
+            print(f"❌ [{completed + failed}/{len(pending)}] {filepath}: {error}")
+
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+                ThreadPoolExecutor(max_workers=api_workers) as api_pool:
+            queue = list(pending)
+            in_flight = {}
+            # Keep a bounded number of parses ahead of the API stage so parsed text
+            # doesn't pile up in memory while waiting for API slots
+            max_in_flight = parse_workers + api_workers * 2
+
+            while queue or in_flight:
+                while queue and len(in_flight) < max_in_flight:
+                    filepath, digest = queue.pop(0)
+                    future = parse_pool.submit(parse_file, filepath)
+                    in_flight[future] = ('parse', filepath, digest, None, 0.0)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, filepath, digest, content, parse_seconds = in_flight.pop(future)
+                    try:
+                        if stage == 'parse':
+                            content, parse_seconds = future.result()
+                            if content is None or not content.strip():
+                                finish(filepath, digest, content, parse_seconds, None,
+                                       'Unable to read the file or the file is empty.', 0.0)
+                                continue
+                            analysis_future = api_pool.submit(analyze_file, filepath, content, analysis_type)
+                            in_flight[analysis_future] = ('analyze', filepath, digest, content, parse_seconds)
+                        else:
+                            analysis_result, error, analysis_seconds = future.result()
+                            finish(filepath, digest, content, parse_seconds, analysis_result, error, analysis_seconds)
+                    except Exception as e:
+                        finish(filepath, digest, content, parse_seconds, None, f"{stage} failed: {e}", 0.0)
+    finally:
+        writer.close()
+        manifest.close()
+
+    return completed, failed, skipped
+
 
 def main():
     """
-    Main function to orchestrate the financial analysis process
+    Main function to orchestrate the batch analysis
     """
-    print("🚀 Financial Statement Analysis Co-Pilot Starting...")
+    parser = argparse.ArgumentParser(description="Analyze every financial report under a directory.")
+    parser.add_argument('input_dir', nargs='?', default='data', help="Directory of filings (default: data)")
+    parser.add_argument('--output', default='batch_results.jsonl',
+                        help="Results file: .jsonl, or .db/.sqlite/.sqlite3 for SQLite (default: batch_results.jsonl)")
+    parser.add_argument('--analysis-type', choices=['general', '10k'], default='general')
+    parser.add_argument('--parse-workers', type=int, default=2, help="Parallel file parsing processes")
+    parser.add_argument('--api-workers', type=int, default=4, help="Concurrent analyses in flight")
+    parser.add_argument('--retry-failed', action='store_true', help="Re-run files that failed in a previous run")
+    args = parser.parse_args()
+
+    print("🚀 Financial Statement Analysis Co-Pilot Batch Runner Starting...")
     print("-" * 60)
-    
-    # Step 1: Look for financial report file
-    print("📁 Looking for financial report files...")
-    
-    # First try the default sample file
-    report_filepath = os.path.join("data", "sample_report.txt")
-    
-    # If not found, look for any supported file
-    if not os.path.exists(report_filepath):
-        found_file = find_financial_file()
-        if found_file:
-            report_filepath = found_file
-            print(f"📄 Found financial report: {report_filepath}")
-        else:
-            print("❌ No financial report files found in data/ directory")
-            print("📁 Please add a file in one of these formats: .txt, .pdf, .docx, .xlsx, .csv")
-            sys.exit(1)
-    
-    # Step 2: Read the financial report content
-    print("📖 Reading financial report...")
-    report_content = read_report(report_filepath)
-    
-    if report_content is None:
-        print("❌ Cannot proceed without report content. Exiting.")
+
+    if not os.path.isdir(args.input_dir):
+        print(f"❌ Input directory not found: {args.input_dir}")
         sys.exit(1)
-    
-    # Step 3: Analyze the report using Gemini AI
-    print("🤖 Analyzing financial report with AI...")
-    analysis_result = analyze_financial_report(report_content)
-    
-    if analysis_result is None:
-        print("❌ Analysis failed. Please check your configuration and try again.")
+
+    start_time = time.time()
+    completed, failed, skipped = run_batch(args.input_dir, args.output, args.analysis_type,
+                                           args.parse_workers, args.api_workers, args.retry_failed)
+
+    print("-" * 60)
+    print(f"🏁 Finished in {time.time() - start_time:.1f}s: {completed} completed, {failed} failed, "
+          f"{skipped} skipped (already done)")
+    print(f"📄 Results: {args.output}")
+    if failed:
         sys.exit(1)
-    
-    # Step 4: Display the results
-    display_analysis(analysis_result)
-    
-    print("\n✅ Financial analysis completed successfully!")
-    print("💡 Tips:")
-    print("   • Place your financial reports in the 'data/' folder")
-    print("   • Supported formats: TXT, PDF, DOCX, XLSX, CSV")
-    print("   • The app will automatically detect and process the file")
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -5,6 +5,7 @@ class FinancialAnalysisApp {
     constructor() {
         this.currentFile = null;
         this.analysisInProgress = false;
+        this.pollInterval = 2000;
         this.init();
     }
 
@@ -189,9 +190,6 @@ class FinancialAnalysisApp {
         formData.append('analysisType', analysisType);
 
         try {
-            // Simulate loading steps
-            await this.simulateLoadingSteps();
-
             const response = await fetch('/upload', {
                 method: 'POST',
                 body: formData
@@ -199,10 +197,20 @@ class FinancialAnalysisApp {
 
             const result = await response.json();
 
-            if (result.success) {
+            if (!result.success) {
+                this.showError(result.error || 'Analysis failed. Please try again.');
+            } else if (result.data) {
+                // Served straight from the result cache
                 this.showResults(result.data);
             } else {
-                this.showError(result.error || 'Analysis failed. Please try again.');
+                const job = window.EventSource
+                    ? await this.streamJob(`${result.status_url}/events`, result.status_url)
+                    : await this.pollJob(result.status_url);
+                if (job.status === 'completed') {
+                    this.showResults(job.data);
+                } else {
+                    this.showError(job.error || 'Analysis failed. Please try again.');
+                }
             }
         } catch (error) {
             console.error('Analysis error:', error);
@@ -212,12 +220,86 @@ class FinancialAnalysisApp {
         }
     }
 
-    async simulateLoadingSteps() {
+    streamJob(eventsUrl, statusUrl) {
+        // Subscribe to the job's Server-Sent Events and render the report as it is generated.
+        // If the stream can't be opened (e.g. the server's stream limit is reached) or drops, poll instead.
+        return new Promise((resolve) => {
+            const source = new EventSource(eventsUrl);
+            let streamedText = '';
+
+            source.addEventListener('stage', (e) => {
+                this.showJobStage(JSON.parse(e.data).stage);
+            });
+
+            source.addEventListener('chunk', (e) => {
+                streamedText += JSON.parse(e.data).text;
+                this.showPartialResult(streamedText);
+            });
+
+            source.addEventListener('done', (e) => {
+                source.close();
+                resolve({ status: 'completed', data: JSON.parse(e.data).data });
+            });
+
+            source.addEventListener('error', (e) => {
+                source.close();
+                // Server-sent error events carry a payload; connection failures do not
+                if (e.data) {
+                    resolve({ status: 'failed', error: JSON.parse(e.data).error });
+                } else {
+                    resolve(this.pollJob(statusUrl));
+                }
+            });
+        });
+    }
+
+    showPartialResult(html) {
+        const resultsSection = document.getElementById('resultsSection');
+        if (resultsSection.style.display !== 'block') {
+            this.hideAllSections();
+            resultsSection.style.display = 'block';
+        }
+        document.getElementById('analysisText').innerHTML = html;
+    }
+
+    async pollJob(statusUrl) {
+        // Poll the background job until it finishes, updating the loading steps as stages complete
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, this.pollInterval));
+
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+
+            if (!job.success) {
+                return { status: 'failed', error: job.error };
+            }
+
+            this.showJobStage(job.stage);
+
+            if (job.status === 'completed' || job.status === 'failed') {
+                return job;
+            }
+        }
+    }
+
+    showJobStage(stage) {
+        const stageSteps = {
+            queued: 'step1',
+            running: 'step1',
+            reading: 'step2',
+            locating: 'step3',
+            summarizing: 'step3',
+            comparing: 'step3',
+            calculating: 'step3',
+            analyzing: 'step4',
+            completed: 'step4'
+        };
+        const lastStep = stageSteps[stage];
+        if (!lastStep) return;
+
         const steps = ['step1', 'step2', 'step3', 'step4'];
-        
-        for (let i = 0; i < steps.length; i++) {
-            await new Promise(resolve => setTimeout(resolve, 500));
-            const step = document.getElementById(steps[i]);
+        for (const stepId of steps.slice(0, steps.indexOf(lastStep) + 1)) {
+            const step = document.getElementById(stepId);
             if (step) {
                 step.classList.add('active');
             }